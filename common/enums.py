@@ -22,3 +22,14 @@ class StreetNinjaEnumMeta(EnumMeta):
 
 class StreetNinjaEnum(Enum, metaclass=StreetNinjaEnumMeta):
     pass
+
+
+class StageEnum(StreetNinjaEnum):
+    """Stages of handling an SMS that are timed separately."""
+    MODEL_LOAD = "model_load"
+    INFERENCE = "inference"
+    INFERENCE_BATCH = "inference_batch"  # one `nlp.pipe()` pass over a batch
+    CACHE_LOOKUP = "cache_lookup"
+    PERSIST = "persist"
+    PERSIST_BATCH = "persist_batch"  # one `bulk_create` of queued predictions
+    RESPONSE_BUILD = "response_build"
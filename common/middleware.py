@@ -0,0 +1,119 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+import hmac
+import json
+import logging
+import time
+from typing import Awaitable, Callable
+from .utils.metrics import error_count, metrics
+from .utils.tracing import SpanRecorder, record_span, recording
+
+logger = logging.getLogger(__name__)
+
+request_duration = metrics.histogram(
+    "ninja_brain_request_duration_seconds",
+    "Time from the request reaching Django to the response leaving it.",
+    label_names=("method", "route", "status"),
+)
+
+
+class MetricsMiddleware:
+    """
+    Times every request into `request_duration`, labelled by the matched URL
+    pattern rather than the raw path so unmatched paths cannot add series, and
+    counts exceptions that escape the view in `error_count`.
+
+    Runs in whichever mode the rest of the stack does, so async views under ASGI
+    are not pushed onto a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse | Awaitable[HttpResponse]]):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self._observe(request, response, start)
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        start = time.perf_counter()
+        response = await self.get_response(request)  # type: ignore[misc]
+        self._observe(request, response, start)
+        return response
+
+    def process_exception(self, request: HttpRequest, exception: Exception):
+        error_count.inc(exception.__class__.__name__)
+        return None
+
+    @staticmethod
+    def _observe(request: HttpRequest, response: HttpResponse, start: float):
+        resolver_match = request.resolver_match
+        request_duration.observe(
+            time.perf_counter() - start,
+            request.method or "",
+            resolver_match.route if resolver_match is not None else "unmatched",
+            str(response.status_code),
+        )
+
+
+class ServerTimingMiddleware:
+    """
+    Makes a SpanRecorder current for each request, so the spans the services
+    record nest under one `total` span. Their summed durations are sent back in a
+    `Server-Timing` header (when `SERVER_TIMING_ENABLED`, or to a request carrying
+    the profiling `X-Profile` token), and a request slower
+    than `SLOW_REQUEST_THRESHOLD_MS` is logged with every span as one JSON line.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse | Awaitable[HttpResponse]]):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with recording() as recorder:
+            with record_span("total") as total:
+                response = self.get_response(request)
+        self._report(request, response, recorder, total.elapsed_ms)
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        with recording() as recorder:
+            with record_span("total") as total:
+                response = await self.get_response(request)  # type: ignore[misc]
+        self._report(request, response, recorder, total.elapsed_ms)
+        return response
+
+    @staticmethod
+    def _report(request: HttpRequest, response: HttpResponse, recorder: SpanRecorder, elapsed_ms: float):
+        if settings.SERVER_TIMING_ENABLED or ServerTimingMiddleware._has_profile_token(request):
+            response["Server-Timing"] = recorder.server_timing()
+        threshold_ms = settings.SLOW_REQUEST_THRESHOLD_MS
+        if threshold_ms > 0 and elapsed_ms >= threshold_ms:
+            record = {
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "elapsed_ms": round(elapsed_ms, 3),
+                "threshold_ms": threshold_ms,
+                "spans": recorder.records(),
+            }
+            logger.warning(f"Slow request: {json.dumps(record)}")
+
+    @staticmethod
+    def _has_profile_token(request: HttpRequest) -> bool:
+        token = request.headers.get("X-Profile", "")
+        expected = settings.PROFILING_HEADER_TOKEN
+        return bool(token and expected and hmac.compare_digest(token, expected))
@@ -1,6 +1,10 @@
+from django.http import HttpResponse
 from http import HTTPStatus
 import logging
-from typing import Generic, TypeVar
+from typing import Any, Generic, TypeVar
+from ..enums import StageEnum
+from ..utils.tracing import record_span, record_stage
+from .encoders import dumps
 from .errors import ApiPayloadBuilderError, ApiResponseBuilderError
 from .schemas import ApiPayload, ApiErrorPayload, ApiResponse
 
@@ -21,20 +25,23 @@ class ApiResponseBuilder(Generic[T]):
 
     @classmethod
     def from_data(cls, data: T, status: HTTPStatus = HTTPStatus.OK) -> "ApiResponse[T]":
-        payload = cls._build_payload(data=data, error=None)
-        response_builder = cls(payload=payload, status=status)
-        return response_builder._build_response()
+        with record_stage(StageEnum.RESPONSE_BUILD):
+            payload = cls._build_payload(data=data, error=None)
+            response_builder = cls(payload=payload, status=status)
+            return response_builder._build_response()
     
     @classmethod
     def from_error(cls, e: Exception, status: HTTPStatus) -> "ApiResponse[T]":
-        payload = cls._build_payload(data=None, error=e)
-        response_builder = cls(payload=payload, status=status)
-        return response_builder._build_response()
+        with record_stage(StageEnum.RESPONSE_BUILD):
+            payload = cls._build_payload(data=None, error=e)
+            response_builder = cls(payload=payload, status=status)
+            return response_builder._build_response()
 
     @staticmethod
     def _build_payload(data: T | None, error: Exception | None) -> "ApiPayload[T]":
-        payload_builder = ApiPayloadBuilder(data=data, error=error)
-        return payload_builder.build_payload()    
+        with record_span("payload_build"):
+            payload_builder = ApiPayloadBuilder(data=data, error=error)
+            return payload_builder.build_payload()    
     
     def _build_response(self) -> ApiResponse:
         try:
@@ -50,6 +57,46 @@ class ApiResponseBuilder(Generic[T]):
             logger.debug(f"Succesfully created ApiResponse object with status `{self.status}`")
             return api_response
 
+
+
+class JsonApiResponseBuilder(Generic[T]):
+    """
+    Writes the same wire shape as ApiResponseBuilder straight to JSON bytes.
+
+    The ApiPayload and ApiResponse models are never constructed, so `data` is not
+    validated again, and the returned HttpResponse skips Ninja's renderer. The
+    bytes match `ApiResponse.model_dump_json()` for the same payload.
+    """
+    CONTENT_TYPE = "application/json"
+
+    @classmethod
+    def from_data(cls, data: T, status: HTTPStatus = HTTPStatus.OK) -> HttpResponse:
+        with record_stage(StageEnum.RESPONSE_BUILD):
+            return cls._build_response(
+                {"success": True, "data": data, "error": None},
+                status,
+            )
+
+    @classmethod
+    def from_error(cls, e: Exception, status: HTTPStatus) -> HttpResponse:
+        with record_stage(StageEnum.RESPONSE_BUILD):
+            return cls._build_response(
+                {"success": False, "data": None, "error": {"type": e.__class__.__name__, "msg": str(e)}},
+                status,
+            )
+
+    @classmethod
+    def _build_response(cls, payload: dict[str, Any], status: HTTPStatus) -> HttpResponse:
+        try:
+            content = dumps({"payload": payload, "status": status})
+        except Exception as e:
+            msg = f"Failed to serialize ApiResponse due to an unexpected error: {e.__class__.__name__}"
+            logger.error(msg, exc_info=True)
+            raise ApiResponseBuilderError(msg) from e
+        logger.debug(f"Serialized ApiResponse with status `{status}` to {len(content)} bytes")
+        return HttpResponse(content, content_type=cls.CONTENT_TYPE, status=status)
+
+
 class ApiPayloadBuilder(Generic[T]):
     """
     Builds an ApiPayload object from either a success payload or an exception.
@@ -0,0 +1,36 @@
+from dataclasses import asdict, is_dataclass
+from enum import Enum
+import json
+from pydantic import BaseModel
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """
+    Encodes what the JSON encoder cannot: pydantic models through their own
+    serializer in JSON mode, so aliases and custom serializers apply as in
+    `model_dump_json()`, and (for the stdlib fallback) dataclasses and enums.
+    """
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if is_dataclass(obj) and not isinstance(obj, type):
+        return asdict(obj)
+    if isinstance(obj, Enum):
+        return obj.value
+    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Serializes `obj` to compact JSON bytes with orjson when it is installed,
+    otherwise with the stdlib encoder. EntitySpan and other dataclasses are
+    written natively by orjson, so lists of them never go through dicts.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, default=_default, separators=(",", ":"), ensure_ascii=False).encode()
@@ -0,0 +1,94 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from django.test import SimpleTestCase, override_settings
+from enum import Enum
+from http import HTTPStatus
+import json
+from pydantic import BaseModel, ConfigDict, Field, field_serializer
+from typing import Any
+from unittest import mock
+from nlp.dataclasses import EntitySpan
+from .responses.builders import ApiResponseBuilder, JsonApiResponseBuilder
+
+
+@override_settings(SERVER_TIMING_ENABLED=False, PROFILING_HEADER_TOKEN="profile-token", SLOW_REQUEST_THRESHOLD_MS=0)
+class ServerTimingMiddlewareTests(SimpleTestCase):
+
+    def test_server_timing_is_only_sent_when_enabled_or_profiled(self):
+        self.assertNotIn("Server-Timing", self.client.get("/api/ping"))
+        self.assertNotIn("Server-Timing", self.client.get("/api/ping", headers={"X-Profile": "wrong-token"}))
+
+        response = self.client.get("/api/ping", headers={"X-Profile": "profile-token"})
+        self.assertRegex(response["Server-Timing"], r"^total;dur=\d+\.\d{3}")
+        with self.settings(SERVER_TIMING_ENABLED=True):
+            self.assertIn("total;dur=", self.client.get("/api/ping")["Server-Timing"])
+
+    @override_settings(PROFILING_HEADER_TOKEN="")
+    def test_an_empty_token_setting_disables_the_header(self):
+        self.assertNotIn("Server-Timing", self.client.get("/api/ping", headers={"X-Profile": ""}))
+
+    def test_slow_requests_are_logged_with_their_spans(self):
+        with self.settings(SLOW_REQUEST_THRESHOLD_MS=0.001), self.assertLogs("common.middleware", "WARNING") as logs:
+            self.client.get("/api/ping")
+        record = json.loads(logs.output[0].split("Slow request: ", 1)[1])
+        self.assertEqual((record["path"], record["status"]), ("/api/ping", 200))
+        self.assertEqual([span["name"] for span in record["spans"]], ["total"])
+
+
+class Label(Enum):
+    RESOURCE = "RESOURCE"
+
+
+@dataclass
+class Span:
+    label: Label
+    text: str
+    start: int
+    end: int
+
+
+class Inquiry(BaseModel):
+    model_config = ConfigDict(serialize_by_alias=True)
+
+    sms_id: int = Field(alias="smsId")
+    received: datetime
+    spans: list[Span]
+
+    @field_serializer("received")
+    def _serialize_received(self, received: datetime) -> str:
+        return received.date().isoformat()
+
+
+class JsonApiResponseBuilderTests(SimpleTestCase):
+
+    PAYLOADS: tuple[Any, ...] = (
+        {"entities": [{"label": "RESOURCE", "text": "café", "start": 0, "end": 4}]},
+        [
+            EntitySpan(label="RESOURCE", text="shelter", start=0, end=7),
+            EntitySpan(label="LOCATION", text="main st", start=13, end=20),
+        ],
+        Inquiry(smsId=7, received=datetime(2026, 1, 2, 3, 4, tzinfo=timezone.utc), spans=[Span(Label.RESOURCE, "bed", 0, 3)]),
+        [Span(Label.RESOURCE, "food", 0, 4)],
+    )
+
+    def assertParity(self):
+        for data in self.PAYLOADS:
+            with self.subTest(data=data):
+                response = JsonApiResponseBuilder.from_data(data)
+                self.assertEqual(response.content, ApiResponseBuilder.from_data(data).model_dump_json().encode())
+                self.assertEqual(response["Content-Type"], "application/json")
+
+        error = ValueError("bad input")
+        response = JsonApiResponseBuilder.from_error(error, HTTPStatus.BAD_REQUEST)
+        self.assertEqual(response.status_code, 400)
+        expected = ApiResponseBuilder.from_error(error, HTTPStatus.BAD_REQUEST).model_dump_json().encode()
+        self.assertEqual(response.content, expected)
+
+    def test_matches_the_pydantic_response(self):
+        self.assertParity()
+        data = json.loads(JsonApiResponseBuilder.from_data(self.PAYLOADS[2]).content)["payload"]["data"]
+        self.assertEqual((data["smsId"], data["received"]), (7, "2026-01-02"))
+
+    def test_matches_the_pydantic_response_without_orjson(self):
+        with mock.patch("common.responses.encoders.orjson", None):
+            self.assertParity()
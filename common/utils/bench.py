@@ -0,0 +1,42 @@
+import math
+import time
+from typing import Any, Callable, Iterable
+
+
+def measure_throughput(fn: Callable[[Any], Any], inputs: Iterable[Any], rounds: int = 5) -> dict[str, float]:
+    """
+    Calls `fn` once per input, `rounds` times over, and reports the best round as
+    calls per second and mean microseconds per call.
+    """
+    inputs = list(inputs)
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for item in inputs:
+            fn(item)
+        best = min(best, time.perf_counter() - start)
+    return {
+        "calls": len(inputs),
+        "per_second": len(inputs) / best if best else float("inf"),
+        "mean_us": best / len(inputs) * 1_000_000 if inputs else 0.0,
+    }
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of `values`; 0.0 when there are none."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize_ms(values: list[float]) -> dict[str, float]:
+    """Mean, p50, p95, p99 and max of a list of millisecond timings."""
+    return {
+        "mean": sum(values) / len(values) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values, default=0.0),
+    }
@@ -0,0 +1,249 @@
+from bisect import bisect_left
+from dataclasses import dataclass, field
+import math
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+# Upper bounds in seconds, from sub-millisecond cache hits to slow model loads.
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+@dataclass
+class Sample:
+    name: str
+    labels: dict[str, str]
+    value: float
+
+
+@dataclass
+class MetricFamily:
+    name: str
+    help: str
+    type: str  # "counter", "gauge" or "histogram"
+    samples: list[Sample] = field(default_factory=list)
+
+
+class Counter:
+    """A monotonically increasing count per combination of label values."""
+    def __init__(self, name: str, help: str, label_names: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0)
+
+    def collect(self) -> MetricFamily:
+        with self._lock:
+            values = list(self._values.items())
+        return MetricFamily(
+            name=f"{self.name}_total",
+            help=self.help,
+            type="counter",
+            samples=[
+                Sample(f"{self.name}_total", dict(zip(self.label_names, label_values)), value)
+                for label_values, value in values
+            ],
+        )
+
+
+class _HistogramSeries:
+    __slots__ = ("counts", "sum")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+
+
+class Histogram:
+    """
+    Counts observations into fixed buckets per combination of label values.
+
+    An observation is one binary search over the bucket bounds and an increment
+    under a lock; bucket counts are only made cumulative when collected.
+    """
+    def __init__(
+            self,
+            name: str,
+            help: str,
+            label_names: tuple[str, ...] = (),
+            buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple[str, ...], _HistogramSeries] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = _HistogramSeries(len(self.buckets) + 1)
+            series.counts[index] += 1
+            series.sum += value
+
+    def time(self, *label_values: str) -> "_HistogramTimer":
+        """Context manager that observes the seconds its block took."""
+        return _HistogramTimer(self, label_values)
+
+    def count(self, *label_values: str) -> int:
+        series = self._series.get(label_values)
+        return sum(series.counts) if series is not None else 0
+
+    def collect(self) -> MetricFamily:
+        with self._lock:
+            snapshot = [(label_values, list(series.counts), series.sum) for label_values, series in self._series.items()]
+        family = MetricFamily(name=self.name, help=self.help, type="histogram")
+        for label_values, counts, total in snapshot:
+            labels = dict(zip(self.label_names, label_values))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                family.samples.append(Sample(f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            family.samples.append(Sample(f"{self.name}_sum", labels, total))
+            family.samples.append(Sample(f"{self.name}_count", labels, cumulative))
+        return family
+
+
+class _HistogramTimer:
+    __slots__ = ("histogram", "label_values", "start")
+
+    def __init__(self, histogram: Histogram, label_values: tuple[str, ...]):
+        self.histogram = histogram
+        self.label_values = label_values
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, *self.label_values)
+        return False
+
+
+class MetricsRegistry:
+    """
+    Process-wide set of counters and histograms, plus collectors: callables that
+    turn counts kept elsewhere (e.g. a cache's `stats()`) into metric families
+    at scrape time, so the hot path does not update them twice.
+
+    `render()` writes everything in the Prometheus text exposition format.
+    """
+    def __init__(self):
+        self._metrics: dict[str, Counter | Histogram] = {}
+        self._collectors: list[Callable[[], Iterable[MetricFamily]]] = []
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str, label_names: tuple[str, ...] = ()) -> Counter:
+        return self._register(name, lambda: Counter(name, help, label_names))  # type: ignore[return-value]
+
+    def histogram(
+            self,
+            name: str,
+            help: str,
+            label_names: tuple[str, ...] = (),
+            buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(name, lambda: Histogram(name, help, label_names, buckets))  # type: ignore[return-value]
+
+    def register_collector(self, collector: Callable[[], Iterable[MetricFamily]]):
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def collect(self) -> list[MetricFamily]:
+        with self._lock:
+            metrics, collectors = list(self._metrics.values()), list(self._collectors)
+        families = [metric.collect() for metric in metrics]
+        for collector in collectors:
+            families.extend(collector())
+        return families
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for family in self.collect():
+            lines.append(f"# HELP {family.name} {_escape_help(family.help)}")
+            lines.append(f"# TYPE {family.name} {family.type}")
+            for sample in family.samples:
+                lines.append(f"{sample.name}{_format_labels(sample.labels)} {_format_value(sample.value)}")
+        return "\n".join(lines) + "\n"
+
+    def _register(self, name: str, factory: Callable[[], Counter | Histogram]) -> Counter | Histogram:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+
+def gauge_family(name: str, help: str, values: dict[tuple[tuple[str, str], ...], float]) -> MetricFamily:
+    """Builds a gauge family from `{((label, value), ...): sample value}`."""
+    return MetricFamily(
+        name=name,
+        help=help,
+        type="gauge",
+        samples=[Sample(name, dict(labels), value) for labels, value in values.items()],
+    )
+
+
+def counter_family(name: str, help: str, values: dict[tuple[tuple[str, str], ...], float]) -> MetricFamily:
+    """Builds a counter family from counts kept outside the registry."""
+    return MetricFamily(
+        name=f"{name}_total",
+        help=help,
+        type="counter",
+        samples=[Sample(f"{name}_total", dict(labels), value) for labels, value in values.items()],
+    )
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int) or (isinstance(value, float) and value.is_integer()):
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labels: Optional[dict[str, str]]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{name}="{_escape_label(str(value))}"' for name, value in labels.items())
+    return f"{{{pairs}}}"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _escape_help(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+metrics = MetricsRegistry()
+
+stage_duration = metrics.histogram(
+    "ninja_brain_stage_duration_seconds",
+    "Time spent in each stage of handling an SMS.",
+    label_names=("stage",),
+)
+error_count = metrics.counter(
+    "ninja_brain_errors",
+    "Errors raised while handling requests, by exception type.",
+    label_names=("type",),
+)
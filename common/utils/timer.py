@@ -1,13 +1,26 @@
-import time
-from typing import Callable, TypeVar, Tuple
+from typing import Awaitable, Callable, TypeVar, Tuple
+from .tracing import record_span
 
 T = TypeVar("T")
 
 def time_ms(fn: Callable[..., T], *args, **kwargs) -> Tuple[T, int]:
     """
     Times how long a function takes to execute and returns (result, elapsed_ms).
+    The call is recorded as a span named after `fn` in the current request's trace.
     """
-    start = time.perf_counter()
-    result = fn(*args, **kwargs)
-    elapsed_ms = int((time.perf_counter() - start) * 1000)
-    return result, elapsed_ms
+    with record_span(_span_name(fn)) as span:
+        result = fn(*args, **kwargs)
+    return result, int(span.elapsed_ms)
+
+
+async def atime_ms(fn: Callable[..., Awaitable[T]], *args, **kwargs) -> Tuple[T, int]:
+    """
+    Async counterpart of `time_ms`: awaits `fn` and returns (result, elapsed_ms).
+    """
+    with record_span(_span_name(fn)) as span:
+        result = await fn(*args, **kwargs)
+    return result, int(span.elapsed_ms)
+
+
+def _span_name(fn: Callable) -> str:
+    return getattr(fn, "__name__", "call").strip("_")
@@ -0,0 +1,125 @@
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
+import time
+from typing import Any, Optional
+from ..enums import StageEnum
+from .metrics import stage_duration
+
+
+@dataclass
+class Span:
+    name: str
+    depth: int
+    start_ns: int = 0
+    end_ns: int = 0
+
+    @property
+    def elapsed_ns(self) -> int:
+        return self.end_ns - self.start_ns
+
+    @property
+    def elapsed_ms(self) -> float:
+        return self.elapsed_ns / 1_000_000
+
+
+class SpanRecorder:
+    """
+    Collects the spans finished while it is the current recorder of a context,
+    e.g. everything one request did. Spans are appended as they finish, from
+    any thread that inherited the context.
+    """
+    def __init__(self):
+        self.start_ns = time.perf_counter_ns()
+        self.spans: list[Span] = []
+
+    def totals_ms(self) -> dict[str, float]:
+        """Milliseconds per span name, summed over repeats, in order of first start."""
+        totals: dict[str, float] = {}
+        for span in sorted(self.spans, key=lambda span: span.start_ns):
+            totals[span.name] = totals.get(span.name, 0.0) + span.elapsed_ms
+        return totals
+
+    def server_timing(self) -> str:
+        """The spans as a `Server-Timing` header value."""
+        return ", ".join(f"{name};dur={elapsed_ms:.3f}" for name, elapsed_ms in self.totals_ms().items())
+
+    def records(self) -> list[dict[str, Any]]:
+        """Every span with its depth and its offset from the start of recording."""
+        return [
+            {
+                "name": span.name,
+                "depth": span.depth,
+                "start_ms": round((span.start_ns - self.start_ns) / 1_000_000, 3),
+                "elapsed_ms": round(span.elapsed_ms, 3),
+            }
+            for span in sorted(self.spans, key=lambda span: span.start_ns)
+        ]
+
+
+_recorder: ContextVar[Optional[SpanRecorder]] = ContextVar("span_recorder", default=None)
+_depth: ContextVar[int] = ContextVar("span_depth", default=0)
+
+
+class _SpanContext:
+    __slots__ = ("span", "stage", "_depth_token")
+
+    def __init__(self, name: str, stage: Optional[StageEnum] = None):
+        self.span = Span(name=name, depth=0)
+        self.stage = stage
+        self._depth_token: Optional[Token[int]] = None
+
+    def __enter__(self) -> Span:
+        depth = _depth.get()
+        self.span.depth = depth
+        self._depth_token = _depth.set(depth + 1)
+        self.span.start_ns = time.perf_counter_ns()
+        return self.span
+
+    def __exit__(self, *exc_info) -> bool:
+        self.span.end_ns = time.perf_counter_ns()
+        _depth.reset(self._depth_token)  # type: ignore[arg-type]
+        recorder = _recorder.get()
+        if recorder is not None:
+            recorder.spans.append(self.span)
+        if self.stage is not None:
+            stage_duration.observe(self.span.elapsed_ns / 1_000_000_000, self.stage.value)
+        return False
+
+
+class _RecordingContext:
+    __slots__ = ("recorder", "_recorder_token", "_depth_token")
+
+    def __init__(self):
+        self.recorder = SpanRecorder()
+
+    def __enter__(self) -> SpanRecorder:
+        self._recorder_token = _recorder.set(self.recorder)
+        self._depth_token = _depth.set(0)
+        return self.recorder
+
+    def __exit__(self, *exc_info) -> bool:
+        _depth.reset(self._depth_token)
+        _recorder.reset(self._recorder_token)
+        return False
+
+
+def record_span(name: str) -> _SpanContext:
+    """
+    Times the block as a span nested under the enclosing one. The Span is
+    returned either way; it is only kept when a recorder is current.
+    """
+    return _SpanContext(name)
+
+
+def record_stage(stage: StageEnum) -> _SpanContext:
+    """`record_span` for a StageEnum, also observed into the stage histogram."""
+    return _SpanContext(stage.value, stage)
+
+
+def recording() -> _RecordingContext:
+    """Makes a new SpanRecorder current for the block, e.g. one request."""
+    return _RecordingContext()
+
+
+def current_recorder() -> Optional[SpanRecorder]:
+    return _recorder.get()
@@ -1,9 +1,30 @@
 # ninja_brain/ninja_brain/views.py
 from ninja import Router
-from django.http import HttpRequest
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+import hmac
+from common.utils.metrics import metrics
 
 router = Router()
 
+
+def metrics_auth(request: HttpRequest) -> bool:
+    """Lets scrapers from METRICS_ALLOWED_IPS, or with the METRICS_TOKEN bearer token, read the metrics."""
+    if request.META.get("REMOTE_ADDR") in settings.METRICS_ALLOWED_IPS:
+        return True
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    return bool(
+        settings.METRICS_TOKEN
+        and scheme.lower() == "bearer"
+        and hmac.compare_digest(token.strip(), settings.METRICS_TOKEN)
+    )
+
+
 @router.get("/ping")
 def ping(request: HttpRequest):
-    return {"ping": "PONG"}
\ No newline at end of file
+    return {"ping": "PONG"}
+
+
+@router.get("/metrics", include_in_schema=False, auth=metrics_auth)
+def metrics_view(request: HttpRequest):
+    return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
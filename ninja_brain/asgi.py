@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ninja_brain.settings")
+# Lets NlpConfig.ready() preload models only in processes that serve requests.
+os.environ.setdefault("NINJA_BRAIN_SERVING", "true")
 
 application = get_asgi_application()
@@ -9,6 +9,7 @@ https://docs.djangoproject.com/en/5.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
+import json
 import os
 from pathlib import Path
 from .logging_config import LOGGING
@@ -17,6 +18,8 @@ from .logging_config import LOGGING
 BASE_DIR = Path(__file__).resolve().parent.parent
 LOG_DIR = BASE_DIR / "log"
 os.makedirs(LOG_DIR, exist_ok=True)
+# Files the app generates from its bundled data at startup, e.g. the spatial index.
+DATA_DIR = Path(os.getenv("DATA_DIR", str(BASE_DIR / "var")))
 LOGGING = LOGGING
 LOGGING = LOGGING
 LOGGING["handlers"]["file"]["filename"] = f"{LOG_DIR}/error.log"
@@ -38,6 +41,73 @@ else:
 
 # Env Vars
 ML_MODEL = os.getenv("ML_MODEL", "en_streetninja")
+ML_MODEL_PRELOAD = os.getenv("ML_MODEL_PRELOAD", "true").lower() == "true"  # serving processes only, see nlp.apps
+
+# Components trimmed from each pipeline at load time. Only `doc.ents` is read, so
+# anything NER does not depend on is excluded (never loaded) or disabled (loaded, skipped).
+ML_MODEL_PIPELINE_PROFILES = {
+    "en_streetninja": {
+        "exclude": ["tagger", "parser", "attribute_ruler", "lemmatizer"],
+        "disable": [],
+    },
+}
+
+# LanguageEnum value -> MLModelEnum value, e.g. '{"fr": "fr_streetninja"}' once such a
+# model is added to MLModelEnum. Languages without an entry (and English) use ML_MODEL.
+# Non-default models load on first use.
+ML_LANGUAGE_MODELS = json.loads(os.getenv("ML_LANGUAGE_MODELS", "{}"))
+# An SMS leaves ML_MODEL only when its language is identified this confidently and it
+# has at least this many characters; short or mixed messages stay on the default model.
+ML_ROUTING_MIN_CONFIDENCE = float(os.getenv("ML_ROUTING_MIN_CONFIDENCE", "0.9"))
+ML_ROUTING_MIN_LENGTH = int(os.getenv("ML_ROUTING_MIN_LENGTH", "20"))
+ML_ROUTING_RETRY_SECONDS = float(os.getenv("ML_ROUTING_RETRY_SECONDS", "300"))  # after a failed load
+ML_MODEL_MEMORY_BUDGET_MB = int(os.getenv("ML_MODEL_MEMORY_BUDGET_MB", "0"))  # 0 = unlimited
+
+ML_INFERENCE_BACKEND = os.getenv("ML_INFERENCE_BACKEND", "local")  # "local" or "process"
+ML_PROCESS_POOL_SIZE = int(os.getenv("ML_PROCESS_POOL_SIZE", str(os.cpu_count() or 1)))
+ML_PROCESS_POOL_MAX_TASKS = int(os.getenv("ML_PROCESS_POOL_MAX_TASKS", "1000")) or None
+ML_PROCESS_POOL_TIMEOUT_S = float(os.getenv("ML_PROCESS_POOL_TIMEOUT_S", "30"))  # per call; the pool is rebuilt after
+ML_BATCH_SIZE = int(os.getenv("ML_BATCH_SIZE", "32"))
+ML_MICROBATCH_ENABLED = os.getenv("ML_MICROBATCH_ENABLED", "false").lower() == "true"
+ML_MICROBATCH_MAX_WAIT_MS = float(os.getenv("ML_MICROBATCH_MAX_WAIT_MS", "5"))
+ML_MICROBATCH_MAX_SIZE = int(os.getenv("ML_MICROBATCH_MAX_SIZE", "32"))
+ML_MICROBATCH_TIMEOUT_S = float(os.getenv("ML_MICROBATCH_TIMEOUT_S", "10"))  # a caller's wait for its batch
+ML_INFERENCE_EXECUTOR_WORKERS = int(os.getenv("ML_INFERENCE_EXECUTOR_WORKERS", "4"))
+ML_WRITE_BEHIND_ENABLED = os.getenv("ML_WRITE_BEHIND_ENABLED", "false").lower() == "true"
+ML_WRITE_BEHIND_MAX_QUEUE = int(os.getenv("ML_WRITE_BEHIND_MAX_QUEUE", "10000"))
+ML_WRITE_BEHIND_FLUSH_SIZE = int(os.getenv("ML_WRITE_BEHIND_FLUSH_SIZE", "200"))
+ML_WRITE_BEHIND_FLUSH_INTERVAL_MS = float(os.getenv("ML_WRITE_BEHIND_FLUSH_INTERVAL_MS", "500"))
+ML_WRITE_BEHIND_POLICY = os.getenv("ML_WRITE_BEHIND_POLICY", "sync")  # "block", "drop" or "sync"
+ML_WRITE_BEHIND_DRAIN_TIMEOUT_S = float(os.getenv("ML_WRITE_BEHIND_DRAIN_TIMEOUT_S", "10"))
+ML_RESULT_CACHE_ENABLED = os.getenv("ML_RESULT_CACHE_ENABLED", "false").lower() == "true"
+ML_RESULT_CACHE_BACKEND = os.getenv("ML_RESULT_CACHE_BACKEND", "local")  # "local" or "shared"
+ML_RESULT_CACHE_ALIAS = os.getenv("ML_RESULT_CACHE_ALIAS", "predictions")
+ML_RESULT_CACHE_MAX_BYTES = int(os.getenv("ML_RESULT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+ML_RESULT_CACHE_TTL_S = float(os.getenv("ML_RESULT_CACHE_TTL_S", "3600"))
+# Off until the shadow-rate agreement with the model has been measured in production.
+ML_FAST_PATH_ENABLED = os.getenv("ML_FAST_PATH_ENABLED", "false").lower() == "true"
+ML_FAST_PATH_SHADOW_RATE = float(os.getenv("ML_FAST_PATH_SHADOW_RATE", "0"))  # share of fast-path hits re-checked by the model
+# Server-Timing exposes internal stage timings, so it is sent to every client only when
+# enabled, and otherwise to requests with the profiling `X-Profile` token.
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+# GET /api/metrics answers clients whose REMOTE_ADDR is in METRICS_ALLOWED_IPS or that send
+# `Authorization: Bearer <METRICS_TOKEN>` (empty disables the token). Behind a proxy,
+# REMOTE_ADDR is the proxy's, so use the token.
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.getenv("METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(",") if ip.strip()]
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+SLOW_REQUEST_THRESHOLD_MS = float(os.getenv("SLOW_REQUEST_THRESHOLD_MS", "1000"))  # 0 disables the slow request log
+# Prediction requests run under cProfile when PROFILING_ENABLED, for a PROFILING_SAMPLE_RATE
+# share of them, or when they send `X-Profile: <PROFILING_HEADER_TOKEN>` (empty disables the header).
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_HEADER_TOKEN = os.getenv("PROFILING_HEADER_TOKEN", "")
+PROFILING_DIR = LOG_DIR / "profiles"
+PROFILING_MAX_FILES = int(os.getenv("PROFILING_MAX_FILES", "100"))  # newest captures kept
+SPATIAL_INDEX_PATH = DATA_DIR / "spatial.idx"
+# `resource,name,lat,lon` CSV of resource locations for nearest-resource lookups. None ship
+# with the repo; resolvers/fixtures/resources.csv is made-up test data.
+SPATIAL_RESOURCES_PATH = os.getenv("SPATIAL_RESOURCES_PATH", "")
+RESOLVER_MAX_EDIT_DISTANCE = int(os.getenv("RESOLVER_MAX_EDIT_DISTANCE", "2"))  # street-name spelling correction
 
 
 # Application definition
@@ -56,6 +126,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "common.middleware.MetricsMiddleware",
+    "common.middleware.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -96,6 +168,24 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# The `predictions` alias backs the shared prediction result cache. Point it at
+# FileBasedCache, DatabaseCache (run `createcachetable`) or RedisCache through
+# PREDICTION_CACHE_BACKEND / PREDICTION_CACHE_LOCATION to share it across workers.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "predictions": {
+        "BACKEND": os.getenv("PREDICTION_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("PREDICTION_CACHE_LOCATION", "predictions"),
+        "TIMEOUT": ML_RESULT_CACHE_TTL_S,
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -0,0 +1,25 @@
+from django.test import SimpleTestCase, override_settings
+
+
+@override_settings(METRICS_ALLOWED_IPS=["10.0.0.5"], METRICS_TOKEN="metrics-token")
+class MetricsAuthTests(SimpleTestCase):
+
+    def get_metrics(self, **kwargs):
+        return self.client.get("/api/metrics", **kwargs)
+
+    def test_anonymous_clients_are_refused(self):
+        self.assertEqual(self.get_metrics().status_code, 401)
+        for authorization in ("Bearer wrong-token", "Basic metrics-token", "metrics-token"):
+            with self.subTest(authorization=authorization):
+                self.assertEqual(self.get_metrics(headers={"Authorization": authorization}).status_code, 401)
+
+    def test_allowlisted_ips_and_the_token_are_let_in(self):
+        for kwargs in ({"REMOTE_ADDR": "10.0.0.5"}, {"headers": {"Authorization": "Bearer metrics-token"}}):
+            with self.subTest(kwargs=kwargs):
+                response = self.get_metrics(**kwargs)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn("ninja_brain_request_duration_seconds", response.content.decode())
+
+    @override_settings(METRICS_TOKEN="")
+    def test_an_empty_token_setting_disables_token_auth(self):
+        self.assertEqual(self.get_metrics(headers={"Authorization": "Bearer "}).status_code, 401)
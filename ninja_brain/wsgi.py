@@ -12,5 +12,7 @@ import os
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ninja_brain.settings")
+# Lets NlpConfig.ready() preload models only in processes that serve requests.
+os.environ.setdefault("NINJA_BRAIN_SERVING", "true")
 
 application = get_wsgi_application()
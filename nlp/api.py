@@ -2,20 +2,86 @@ from ninja import Router
 from ninja.responses import Response
 from django.http import HttpRequest
 import logging
+from typing import Any
 from .schemas import PredictionRequest
-from .services.predict import EntityPredictionService
-from common.responses.builders import ApiResponseBuilder
+from .services.predict import BatchEntityPredictionService, EntityPredictionService
+from .services.profiling import get_prediction_profiler
+from .services.registry import model_registry
+from .services.resolve import BatchSmsResolutionService, SmsResolutionService
+from .services.routing import get_language_router
+from common.responses.builders import ApiResponseBuilder, JsonApiResponseBuilder
 from common.responses.schemas import ApiResponse
-from nlp.schemas import PredictionResponse
+from nlp.schemas import BatchPredictionResponse, ModelsResponse, PredictionResponse
+from ninja_brain.api import metrics_auth
 
 logger = logging.getLogger(__name__)
 router = Router()
 
-@router.post("/predict")
-def predict(request: HttpRequest, data: PredictionRequest):
+# JsonApiResponseBuilder returns an HttpResponse, which Ninja passes through without
+# validating it against `response`; the schemas only document the endpoints.
+@router.post("/predict", response={200: ApiResponse[PredictionResponse]})
+async def predict(request: HttpRequest, data: PredictionRequest):
     
     prediction_service = EntityPredictionService(request_data=data)
-    prediction_response = prediction_service.predict()
+    profile = get_prediction_profiler().should_profile(request)
+    prediction_response = await prediction_service.apredict(profile=profile)
 
-    api_response = ApiResponseBuilder.from_data(data=prediction_response)
+    return JsonApiResponseBuilder.from_data(data=prediction_response)
+
+
+# Batch items are validated one by one by the services, so a malformed item gets an
+# error in its own result instead of a 422 for the whole batch.
+BATCH_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": {"type": "array", "items": PredictionRequest.model_json_schema()}}},
+    },
+}
+
+
+@router.post(
+    "/predict/batch",
+    response={200: ApiResponse[BatchPredictionResponse]},
+    openapi_extra=BATCH_REQUEST_BODY,
+)
+def predict_batch(request: HttpRequest, data: list[Any]):
+
+    prediction_service = BatchEntityPredictionService(request_data=data)
+    if get_prediction_profiler().should_profile(request):
+        batch_response = prediction_service.profiled(prediction_service.predict, "predict_batch")
+    else:
+        batch_response = prediction_service.predict()
+
+    return JsonApiResponseBuilder.from_data(data=batch_response)
+
+
+@router.post("/resolve")
+async def resolve(request: HttpRequest, data: PredictionRequest):
+
+    resolution_service = SmsResolutionService(request_data=data)
+    resolve_response = await resolution_service.aresolve()
+
+    api_response = ApiResponseBuilder.from_data(data=resolve_response)
+    return Response(api_response)
+
+
+@router.post("/resolve/batch", openapi_extra=BATCH_REQUEST_BODY)
+def resolve_batch(request: HttpRequest, data: list[Any]):
+
+    resolution_service = BatchSmsResolutionService(request_data=data)
+    batch_response = resolution_service.resolve()
+
+    api_response = ApiResponseBuilder.from_data(data=batch_response)
+    return Response(api_response)
+
+
+@router.get("/models", auth=metrics_auth)
+def models(request: HttpRequest):
+
+    models_response = ModelsResponse(
+        models=model_registry.stats(),
+        routing=get_language_router().stats(),
+    )
+
+    api_response = ApiResponseBuilder.from_data(data=models_response)
     return Response(api_response)
\ No newline at end of file
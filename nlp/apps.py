@@ -1,6 +1,53 @@
+import logging
+import os
 from django.apps import AppConfig
 
+logger = logging.getLogger(__name__)
+
+
+def serving_requests() -> bool:
+    """
+    True in processes started through the WSGI/ASGI entry points and in the child
+    process of `runserver` that actually serves. Other management commands
+    (`migrate`, `profiles`, ...) and runserver's reloader parent return False.
+    """
+    return os.environ.get("NINJA_BRAIN_SERVING") == "true" or os.environ.get("RUN_MAIN") == "true"
+
 
 class NlpConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "nlp"
+
+    def ready(self):
+        from django.conf import settings
+        from .enums import InferenceBackendEnum, MLModelEnum
+        from .errors.inference_errors import ModelLoadError
+        from .services.pool import get_process_pool
+        from .services.metrics import register_nlp_metrics
+        from .services.registry import model_registry
+        from . import receivers  # noqa: F401
+        from resolvers.resource.synonyms import get_phrase_matcher
+
+        register_nlp_metrics()
+        if not serving_requests():
+            return
+        # Built here rather than by the first request that needs the resource matcher.
+        get_phrase_matcher()
+        if not settings.ML_MODEL_PRELOAD:
+            return
+        try:
+            ml_model = MLModelEnum(settings.ML_MODEL)
+            model_registry.warm(ml_model)
+            if InferenceBackendEnum(settings.ML_INFERENCE_BACKEND) == InferenceBackendEnum.PROCESS:
+                # Fork the workers now, while the process is still single-threaded.
+                get_process_pool(
+                    ml_model,
+                    processes=settings.ML_PROCESS_POOL_SIZE,
+                    max_tasks_per_child=settings.ML_PROCESS_POOL_MAX_TASKS,
+                    timeout_s=settings.ML_PROCESS_POOL_TIMEOUT_S,
+                ).start()
+        except (ValueError, ModelLoadError):
+            logger.warning(
+                f"Could not preload spaCy model `{settings.ML_MODEL}` at startup; "
+                "it will be loaded on the first prediction instead."
+            )
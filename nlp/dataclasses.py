@@ -1,5 +1,9 @@
-from dataclasses import dataclass
-from .enums import MLModelEnum
+from dataclasses import dataclass, field
+from typing import Optional
+from spacy.tokens import Doc
+from resolvers.language.dataclasses import ResolvedLanguage
+from .enums import InferencePathEnum, MLModelEnum
+from .errors.request_errors import InvalidRequestError
 
 @dataclass
 class EntitySpan:
@@ -14,3 +18,15 @@ class InferredEntities:
     ml_model_enum: MLModelEnum
     version: str
     entities: list[EntitySpan]
+    inference_path: InferencePathEnum = InferencePathEnum.MODEL
+    # The language routing detected, so the SMS resolver does not detect it again.
+    language: Optional[ResolvedLanguage] = None
+    # The Doc the entities came from, when the model ran in this process, so the
+    # resolvers can reuse its tokens. None for fast-path, cached and pool results.
+    doc: Optional[Doc] = field(default=None, repr=False, compare=False)
+
+@dataclass
+class InvalidBatchItem:
+    """A batch request item that failed validation, with the id it was sent with if that was valid."""
+    id: Optional[int]
+    error: InvalidRequestError
@@ -3,4 +3,36 @@ from common.enums import StreetNinjaEnum
 
 class MLModelEnum(StreetNinjaEnum):
     
-    EN_STREETNINJA = "en_streetninja"
\ No newline at end of file
+    EN_STREETNINJA = "en_streetninja"
+
+class InferenceBackendEnum(StreetNinjaEnum):
+
+    LOCAL = "local"
+    PROCESS = "process"
+
+
+class BackpressurePolicyEnum(StreetNinjaEnum):
+
+    BLOCK = "block"  # wait for room in the queue
+    DROP = "drop"    # discard the prediction
+    SYNC = "sync"    # write the prediction inline instead
+
+
+
+class ResultCacheBackendEnum(StreetNinjaEnum):
+
+    LOCAL = "local"    # in-process LRU, per worker
+    SHARED = "shared"  # Django CACHES alias, shared across workers
+
+
+class InferencePathEnum(StreetNinjaEnum):
+
+    FAST_PATH = "fast_path"  # answered by the rule-based pre-classifier
+    MODEL = "model"          # sent to the spaCy model
+
+
+class EntityLabelEnum(StreetNinjaEnum):
+
+    LOCATION = "LOCATION"
+    RESOURCE = "RESOURCE"
+    QUALIFIER = "QUALIFIER"
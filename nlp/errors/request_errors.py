@@ -0,0 +1,6 @@
+from common.errors import NinjaBrainException
+
+
+class InvalidRequestError(NinjaBrainException):
+    """Raised when an item of a batch request fails validation."""
+    pass
@@ -0,0 +1,6 @@
+from common.errors import NinjaBrainException
+
+
+class ResolutionError(NinjaBrainException):
+    """Raised when the resolvers fail to turn inferred entities into a ResolvedSmsInquiry."""
+    pass
\ No newline at end of file
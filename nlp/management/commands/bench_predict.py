@@ -0,0 +1,343 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+from django.test import Client, override_settings
+from django.test.utils import setup_databases, teardown_databases
+import itertools
+import json
+import os
+from pathlib import Path
+import resource
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Optional
+import urllib.error
+import urllib.request
+from common.utils.bench import summarize_ms
+from common.utils.tracing import recording
+from nlp.schemas import PredictionRequest
+from nlp.services.predict import BatchEntityPredictionService, EntityPredictionService
+from nlp.services.resolve import BatchSmsResolutionService, SmsResolutionService
+from nlp.services.writebehind import get_write_behind_queue
+
+DEFAULT_CORPUS = Path(__file__).resolve().parents[2] / "data" / "bench_corpus.jsonl"
+API_PREFIX = "/api/nlp"
+MODES = ("service", "client", "http")
+ENDPOINTS = ("predict", "resolve")
+
+# Settings that change what is being measured; saved with every run so runs compare like for like.
+RECORDED_SETTINGS = (
+    "ML_MODEL",
+    "ML_LANGUAGE_MODELS",
+    "ML_INFERENCE_BACKEND",
+    "ML_PROCESS_POOL_SIZE",
+    "ML_MICROBATCH_ENABLED",
+    "ML_RESULT_CACHE_ENABLED",
+    "ML_RESULT_CACHE_BACKEND",
+    "ML_WRITE_BEHIND_ENABLED",
+    "ML_FAST_PATH_ENABLED",
+)
+
+# Result fields compared against a baseline, and whether a higher value is better.
+COMPARED_FIELDS = (
+    ("throughput_sms_per_s", True),
+    ("latency_ms.p50", False),
+    ("latency_ms.p95", False),
+    ("latency_ms.p99", False),
+    ("peak_rss_mb", False),
+)
+
+Sender = Callable[[list[PredictionRequest]], dict[str, float]]
+
+
+class Command(BaseCommand):
+    help = (
+        "Replays a JSONL corpus of SMS against the prediction stack, in-process through the "
+        "services, through Django's test client, or over HTTP against a running server. Reports "
+        "throughput, p50/p95/p99 latency, per-stage timings (in http mode only if the server sets "
+        "SERVER_TIMING_ENABLED) and peak RSS of this process (only the client's in http mode), and "
+        "can save the results "
+        "as JSON and compare them with an earlier run. Service and client modes save their "
+        "predictions to a throwaway test database unless --persist is given."
+    )
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS, help="JSONL file, one SMS per line.")
+        parser.add_argument("--field", default="text", help="Field of each JSONL record holding the SMS text.")
+        parser.add_argument("--mode", choices=MODES, default="service")
+        parser.add_argument("--endpoint", choices=ENDPOINTS, default="predict")
+        parser.add_argument("--url", default="http://127.0.0.1:8000", help="Server base URL for --mode http.")
+        parser.add_argument("--requests", type=int, default=500, help="SMS to send; the corpus is cycled.")
+        parser.add_argument("--concurrency", type=int, default=1)
+        parser.add_argument("--batch-size", type=int, default=0, help="Send SMS through the batch path in groups of this size.")
+        parser.add_argument("--warmup", type=int, default=10, help="Calls made before measuring, e.g. to load the model.")
+        parser.add_argument(
+            "--persist",
+            action="store_true",
+            help="In service and client modes, save predictions to the configured database instead of a test database.",
+        )
+        parser.add_argument("--output", type=Path, help="Write the results to this JSON file.")
+        parser.add_argument("--compare", type=Path, help="Compare the results with a JSON file from an earlier run.")
+        parser.add_argument(
+            "--max-regression-pct",
+            type=float,
+            help="With --compare, fail when a compared field is this much worse than the baseline.",
+        )
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1 or options["requests"] < 1:
+            raise CommandError("--concurrency and --requests must be at least 1")
+        items = self._load_corpus(Path(options["corpus"]), options["field"], options["requests"])
+        send = self._sender(options["mode"], options["endpoint"], options["url"], options["batch_size"])
+        calls = self._chunks(items, options["batch_size"])
+
+        # An http run writes to the server's database, which this process does not control.
+        test_databases = None
+        if options["mode"] != "http" and not options["persist"]:
+            test_databases = self._setup_test_database()
+        try:
+            # Client mode reads its stage timings from the Server-Timing header, which is off by default.
+            with override_settings(SERVER_TIMING_ENABLED=True):
+                outcomes, elapsed_s, started_at = self._run(send, calls, options["warmup"], options["concurrency"])
+        finally:
+            if test_databases is not None:
+                if settings.ML_WRITE_BEHIND_ENABLED:
+                    get_write_behind_queue().drain()
+                connections.close_all()
+                teardown_databases(test_databases, verbosity=0)
+
+        results = self._results(options, items, calls, outcomes, elapsed_s, started_at)
+        self._print_results(results)
+        if options["output"] is not None:
+            Path(options["output"]).write_text(json.dumps(results, indent=2) + "\n")
+            self.stdout.write(f"Saved results to {options['output']}")
+        if options["compare"] is not None:
+            self._compare(results, Path(options["compare"]), options["max_regression_pct"])
+
+    def _run(
+            self,
+            send: Sender,
+            calls: list[list[PredictionRequest]],
+            warmup: int,
+            concurrency: int,
+    ) -> tuple[list[tuple[Optional[float], dict[str, float], Optional[str]]], float, datetime]:
+        for call in calls[:warmup]:
+            self._call(send, call)
+
+        started_at = datetime.now(timezone.utc)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bench") as executor:
+            outcomes = list(executor.map(lambda call: self._call(send, call), calls))
+            elapsed_s = time.perf_counter() - start
+            self._close_worker_connections(executor, concurrency)
+        return outcomes, elapsed_s, started_at
+
+    @staticmethod
+    def _setup_test_database() -> list:
+        connection = connections[DEFAULT_DB_ALIAS]
+        if connection.vendor == "sqlite" and not connection.settings_dict["TEST"].get("NAME"):
+            # Concurrent writers lock SQLite's shared in-memory test database, so use a file.
+            test_name = Path(tempfile.gettempdir()) / f"bench_predict_{os.getpid()}.sqlite3"
+            connection.settings_dict["TEST"]["NAME"] = str(test_name)
+        return setup_databases(verbosity=0, interactive=False, aliases={DEFAULT_DB_ALIAS})
+
+    @staticmethod
+    def _close_worker_connections(executor: ThreadPoolExecutor, workers: int):
+        """Closes each worker thread's connection, so a test database can be dropped afterwards."""
+        barrier = threading.Barrier(workers)
+
+        def close():
+            barrier.wait()
+            connections.close_all()
+
+        list(executor.map(lambda _: close(), range(workers)))
+
+    def _load_corpus(self, path: Path, field: str, count: int) -> list[PredictionRequest]:
+        try:
+            with open(path, encoding="utf-8") as f:
+                records = [json.loads(line) for line in f if line.strip()]
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read corpus `{path}`: {e}") from e
+        texts = [record[field] for record in records if isinstance(record.get(field), str)]
+        if not texts:
+            raise CommandError(f"Corpus `{path}` has no records with a string `{field}` field")
+        return [
+            PredictionRequest(id=i, text=text)
+            for i, text in enumerate(itertools.islice(itertools.cycle(texts), count), start=1)
+        ]
+
+    @staticmethod
+    def _chunks(items: list[PredictionRequest], batch_size: int) -> list[list[PredictionRequest]]:
+        size = batch_size if batch_size > 0 else 1
+        return [items[i:i + size] for i in range(0, len(items), size)]
+
+    def _sender(self, mode: str, endpoint: str, url: str, batch_size: int) -> Sender:
+        batched = batch_size > 0
+        path = f"{API_PREFIX}/{endpoint}{'/batch' if batched else ''}"
+        if mode == "service":
+            return lambda items: self._send_service(endpoint, batched, items)
+        if mode == "client":
+            local = threading.local()
+            return lambda items: self._send_client(local, path, batched, items)
+        return lambda items: self._send_http(url.rstrip("/") + path, batched, items)
+
+    @staticmethod
+    def _send_service(endpoint: str, batched: bool, items: list[PredictionRequest]) -> dict[str, float]:
+        with recording() as recorder:
+            if endpoint == "predict" and batched:
+                BatchEntityPredictionService(request_data=items).predict()
+            elif endpoint == "predict":
+                EntityPredictionService(request_data=items[0]).predict()
+            elif batched:
+                BatchSmsResolutionService(request_data=items).resolve()
+            else:
+                SmsResolutionService(request_data=items[0]).resolve()
+        return recorder.totals_ms()
+
+    @staticmethod
+    def _send_client(local: threading.local, path: str, batched: bool, items: list[PredictionRequest]) -> dict[str, float]:
+        if not hasattr(local, "client"):
+            local.client = Client()
+        response = local.client.post(path, _request_body(batched, items), content_type="application/json")
+        if response.status_code >= 400:
+            raise CommandError(f"{path} returned {response.status_code}")
+        return _parse_server_timing(response.get("Server-Timing", ""))
+
+    @staticmethod
+    def _send_http(url: str, batched: bool, items: list[PredictionRequest]) -> dict[str, float]:
+        request = urllib.request.Request(
+            url,
+            data=_request_body(batched, items).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+                return _parse_server_timing(response.headers.get("Server-Timing", ""))
+        except urllib.error.HTTPError as e:
+            raise CommandError(f"{url} returned {e.code}") from e
+
+    @staticmethod
+    def _call(send: Sender, items: list[PredictionRequest]) -> tuple[Optional[float], dict[str, float], Optional[str]]:
+        """Returns (latency ms, stage ms, error) for one call; latency is None on failure."""
+        start = time.perf_counter_ns()
+        try:
+            stages = send(items)
+        except Exception as e:
+            return None, {}, f"{e.__class__.__name__}: {e}"
+        finally:
+            close_old_connections()
+        return (time.perf_counter_ns() - start) / 1_000_000, stages, None
+
+    def _results(
+            self,
+            options: dict[str, Any],
+            items: list[PredictionRequest],
+            calls: list[list[PredictionRequest]],
+            outcomes: list[tuple[Optional[float], dict[str, float], Optional[str]]],
+            elapsed_s: float,
+            started_at: datetime,
+    ) -> dict[str, Any]:
+        latencies = [latency for latency, _, _ in outcomes if latency is not None]
+        errors = [error for _, _, error in outcomes if error is not None]
+        succeeded_sms = sum(len(call) for call, (latency, _, _) in zip(calls, outcomes) if latency is not None)
+        stage_values: dict[str, list[float]] = {}
+        for _, stages, _ in outcomes:
+            for name, elapsed_ms in stages.items():
+                stage_values.setdefault(name, []).append(elapsed_ms)
+        return {
+            "started_at": started_at.isoformat(),
+            "mode": options["mode"],
+            "endpoint": options["endpoint"],
+            "corpus": str(options["corpus"]),
+            "sms": len(items),
+            "calls": len(calls),
+            "batch_size": options["batch_size"],
+            "concurrency": options["concurrency"],
+            "elapsed_s": elapsed_s,
+            "throughput_sms_per_s": succeeded_sms / elapsed_s if elapsed_s else 0.0,
+            "throughput_calls_per_s": len(latencies) / elapsed_s if elapsed_s else 0.0,
+            "errors": len(errors),
+            "error_samples": sorted(set(errors))[:5],
+            "latency_ms": summarize_ms(latencies),
+            "stages_ms": {name: summarize_ms(values) for name, values in stage_values.items()},
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "settings": {name: getattr(settings, name, None) for name in RECORDED_SETTINGS},
+        }
+
+    def _print_results(self, results: dict[str, Any]):
+        latency = results["latency_ms"]
+        self.stdout.write(
+            f"{results['mode']} /{results['endpoint']}: {results['sms']} SMS in {results['calls']} calls, "
+            f"concurrency {results['concurrency']}, {results['elapsed_s']:.2f}s"
+        )
+        self.stdout.write(
+            f"  throughput  {results['throughput_sms_per_s']:,.1f} SMS/s "
+            f"({results['throughput_calls_per_s']:,.1f} calls/s), {results['errors']} errors"
+        )
+        self.stdout.write(
+            f"  latency ms  p50 {latency['p50']:.2f}  p95 {latency['p95']:.2f}  "
+            f"p99 {latency['p99']:.2f}  max {latency['max']:.2f}"
+        )
+        if results["stages_ms"]:
+            self.stdout.write("  stages ms   (mean / p95 per call)")
+            for name, stage in results["stages_ms"].items():
+                self.stdout.write(f"    {name:<20} {stage['mean']:>9.3f} / {stage['p95']:.3f}")
+        self.stdout.write(f"  peak RSS    {results['peak_rss_mb']:.1f} MB")
+        for error in results["error_samples"]:
+            self.stderr.write(f"  error: {error}")
+
+    def _compare(self, results: dict[str, Any], path: Path, max_regression_pct: Optional[float]):
+        try:
+            baseline = json.loads(path.read_text())
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read baseline `{path}`: {e}") from e
+
+        fields = [*COMPARED_FIELDS, *((f"stages_ms.{name}.mean", False) for name in results["stages_ms"])]
+        regressions = []
+        self.stdout.write(f"Compared with {path} ({baseline.get('started_at', 'unknown date')}):")
+        for field, higher_is_better in fields:
+            before, after = _lookup(baseline, field), _lookup(results, field)
+            if before is None or after is None:
+                continue
+            change_pct = (after - before) / before * 100 if before else 0.0
+            worse_pct = -change_pct if higher_is_better else change_pct
+            self.stdout.write(f"  {field:<32} {before:>12.3f} -> {after:>12.3f}  {change_pct:+7.1f}%")
+            if max_regression_pct is not None and worse_pct > max_regression_pct and not field.startswith("stages_ms"):
+                regressions.append(f"{field} {change_pct:+.1f}%")
+        if regressions:
+            raise CommandError(f"Regressed by more than {max_regression_pct}%: {', '.join(regressions)}")
+
+
+def _request_body(batched: bool, items: list[PredictionRequest]) -> str:
+    if batched:
+        return json.dumps([item.model_dump() for item in items])
+    return items[0].model_dump_json()
+
+
+def _parse_server_timing(header: str) -> dict[str, float]:
+    """`total;dur=1.2, predict;dur=0.8` -> {"total": 1.2, "predict": 0.8}"""
+    stages: dict[str, float] = {}
+    for entry in header.split(","):
+        name, _, params = entry.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "dur" and name:
+                try:
+                    stages[name] = float(value)
+                except ValueError:
+                    pass
+    return stages
+
+
+def _lookup(results: dict[str, Any], field: str) -> Optional[float]:
+    value: Any = results
+    for key in field.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value if isinstance(value, (int, float)) else None
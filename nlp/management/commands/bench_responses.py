@@ -0,0 +1,81 @@
+from dataclasses import asdict
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from ninja.responses import Response
+import itertools
+import json
+from typing import Any, Callable
+from common.responses.builders import ApiResponseBuilder, JsonApiResponseBuilder
+from common.responses.encoders import orjson
+from common.utils.bench import measure_throughput
+from nlp.dataclasses import EntitySpan
+from nlp.enums import EntityLabelEnum
+from nlp.schemas import BatchPredictionItem, BatchPredictionResponse, PredictionResponse
+
+SAMPLE_TEXTS = ("shelter", "food bank", "main and hastings", "tonight", "women only", "downtown")
+
+
+class Command(BaseCommand):
+    help = (
+        "Times building a predict response through the pydantic builder chain and Ninja's "
+        "renderer against JsonApiResponseBuilder, for single and batch responses, and checks "
+        "that both produce the same JSON."
+    )
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument("--entities", type=int, default=4, help="Entities per SMS.")
+        parser.add_argument("--batch-size", type=int, default=32, help="Items per batch response.")
+        parser.add_argument("--iterations", type=int, default=2000, help="Responses built per round.")
+        parser.add_argument("--rounds", type=int, default=5, help="Rounds timed; the best is reported.")
+
+    def handle(self, *args, **options):
+        if options["entities"] < 0 or options["batch_size"] < 1 or options["iterations"] < 1:
+            raise CommandError("--entities must be >= 0, --batch-size and --iterations >= 1")
+        entities = self._entities(options["entities"])
+        inputs = range(options["iterations"])
+        rounds = options["rounds"]
+
+        self.stdout.write(f"Encoder: {'orjson' if orjson is not None else 'json'}")
+        cases: dict[str, tuple[Callable[[], Any], Callable[[], Any]]] = {
+            "single": (
+                lambda: PredictionResponse(entities=entities),
+                lambda: PredictionResponse.model_construct(entities=entities),
+            ),
+            "batch": (
+                lambda: self._batch(BatchPredictionResponse, BatchPredictionItem, entities, options["batch_size"]),
+                lambda: self._batch(
+                    BatchPredictionResponse.model_construct,
+                    BatchPredictionItem.model_construct,
+                    entities,
+                    options["batch_size"],
+                ),
+            ),
+        }
+        for name, (build_model, construct_model) in cases.items():
+            builder_chain = lambda _: Response(ApiResponseBuilder.from_data(data=build_model())).content
+            json_builder = lambda _: JsonApiResponseBuilder.from_data(data=construct_model()).content
+            if json.loads(builder_chain(None)) != json.loads(json_builder(None)):
+                raise CommandError(f"The {name} responses differ between the two builders")
+
+            before = measure_throughput(builder_chain, inputs, rounds=rounds)
+            after = measure_throughput(json_builder, inputs, rounds=rounds)
+            self.stdout.write(
+                f"{name:<7} builder chain {before['mean_us']:>9.1f}us  "
+                f"json builder {after['mean_us']:>9.1f}us  "
+                f"speedup {before['mean_us'] / after['mean_us']:.2f}x  "
+                f"({len(json_builder(None))} bytes)"
+            )
+
+    @staticmethod
+    def _entities(count: int) -> list[dict[str, Any]]:
+        """Entities shaped like `EntityPrediction.extracted_entities`."""
+        labels, texts = itertools.cycle(EntityLabelEnum), itertools.cycle(SAMPLE_TEXTS)
+        entities, start = [], 0
+        for _ in range(count):
+            text = next(texts)
+            entities.append(asdict(EntitySpan(label=next(labels).value, text=text, start=start, end=start + len(text))))
+            start += len(text) + 1
+        return entities
+
+    @staticmethod
+    def _batch(response_cls: Callable[..., Any], item_cls: Callable[..., Any], entities: list, size: int) -> Any:
+        return response_cls(results=[item_cls(id=i, success=True, entities=entities) for i in range(size)])
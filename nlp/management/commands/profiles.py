@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+import json
+from pathlib import Path
+import pstats
+from nlp.services.profiling import (
+    SUMMARY_SUFFIX,
+    get_prediction_profiler,
+    summarize_stats,
+)
+
+ACTIONS = ("list", "aggregate")
+
+
+class Command(BaseCommand):
+    help = (
+        "Lists the prediction requests captured by the profiler, or aggregates their .prof files "
+        "into one table of the functions with the most cumulative time."
+    )
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument("action", choices=ACTIONS)
+        parser.add_argument("--dir", type=Path, help="Profile directory; defaults to PROFILING_DIR.")
+        parser.add_argument("--label", help="Only captures with this label, e.g. predict or predict_batch.")
+        parser.add_argument("--last", type=int, default=0, help="Only the newest N captures.")
+        parser.add_argument("--limit", type=int, default=25, help="Functions shown by aggregate.")
+        parser.add_argument("--spacy", action="store_true", help="Only spaCy and thinc functions.")
+        parser.add_argument("--json", action="store_true", help="Print the aggregate as JSON.")
+
+    def handle(self, *args, **options):
+        profiler = get_prediction_profiler()
+        if options["dir"] is not None:
+            profiler.directory = Path(options["dir"])
+        captures = self._captures(profiler.captures(), options["label"], options["last"])
+        if not captures:
+            raise CommandError(f"No profiles found in `{profiler.directory}`")
+
+        if options["action"] == "list":
+            self._list(captures)
+        else:
+            self._aggregate(captures, options["limit"], options["spacy"], options["json"])
+
+    def _captures(self, captures: list[Path], label: str | None, last: int) -> list[Path]:
+        if label is not None:
+            captures = [path for path in captures if self._summary(path).get("label") == label]
+        return captures[-last:] if last > 0 else captures
+
+    def _summary(self, profile_path: Path) -> dict:
+        try:
+            return json.loads(profile_path.with_suffix(SUMMARY_SUFFIX).read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _list(self, captures: list[Path]):
+        for profile_path in captures:
+            summary = self._summary(profile_path)
+            spacy_ms = max((row["cumulative_ms"] for row in summary.get("spacy", [])), default=0.0)
+            self.stdout.write(
+                f"{profile_path.name}  label={summary.get('label', '?')}  "
+                f"elapsed={summary.get('elapsed_ms', 0.0):.1f}ms  spacy={spacy_ms:.1f}ms"
+            )
+
+    def _aggregate(self, captures: list[Path], limit: int, spacy_only: bool, as_json: bool):
+        stats = pstats.Stats(*(str(path) for path in captures))
+        rows = summarize_stats(stats, limit=limit, spacy_only=spacy_only)
+        if as_json:
+            self.stdout.write(json.dumps({"profiles": len(captures), "functions": rows}, indent=2))
+            return
+        self.stdout.write(f"{len(captures)} profiles, total {stats.total_tt * 1000:.1f}ms")  # type: ignore[attr-defined]
+        self.stdout.write(f"{'calls':>10} {'total_ms':>12} {'cumulative_ms':>14}  function")
+        for row in rows:
+            self.stdout.write(
+                f"{row['calls']:>10} {row['total_ms']:>12.3f} {row['cumulative_ms']:>14.3f}  {row['function']}"
+            )
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+OLD_NAME_PREFIX = "MLModelEnum."
+# MLModelEnum member names and their values when this migration was written, frozen
+# here so later changes to the enum cannot change what the migration does.
+ENUM_VALUES = {
+    "EN_STREETNINJA": "en_streetninja",
+}
+
+
+def rename_enum_names(apps, schema_editor):
+    """
+    Rows were saved with the enum's str(), e.g. `MLModelEnum.EN_STREETNINJA`, before
+    the name was written by value. Renames them to the value, or merges them into
+    the row already saved under the value for the same version. A name that is not
+    a known member fails the migration rather than being guessed at.
+    """
+    MLModel = apps.get_model("nlp", "MLModel")
+    EntityPrediction = apps.get_model("nlp", "EntityPrediction")
+    for old in MLModel.objects.filter(name__startswith=OLD_NAME_PREFIX):
+        member = old.name[len(OLD_NAME_PREFIX):]
+        if member not in ENUM_VALUES:
+            raise ValueError(f"MLModel `{old.pk}` is named `{old.name}`, which is not a known MLModelEnum member")
+        name = ENUM_VALUES[member]
+        current = MLModel.objects.filter(name=name, version=old.version).first()
+        if current is None:
+            old.name = name
+            old.save(update_fields=["name"])
+            continue
+        EntityPrediction.objects.filter(ml_model=old).update(ml_model=current)
+        old.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("nlp", "0008_entityprediction_ml_model"),
+    ]
+
+    operations = [
+        # `name` is no longer unique on its own so several versions of a model can
+        # be stored; the (name, version) pair stays unique through `unique_model_version`.
+        migrations.AlterField(
+            model_name="mlmodel",
+            name="name",
+            field=models.CharField(
+                choices=[("en_streetninja", "En Streetninja")], max_length=256
+            ),
+        ),
+        migrations.RunPython(rename_enum_names, migrations.RunPython.noop),
+    ]
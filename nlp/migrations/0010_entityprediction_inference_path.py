@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:02
+
+from django.db import migrations, models
+
+# Fast-path predictions used to be told apart by this MLModel version prefix.
+FAST_PATH_VERSION_PREFIX = "fast-path-"
+
+
+def mark_fast_path_predictions(apps, schema_editor):
+    EntityPrediction = apps.get_model("nlp", "EntityPrediction")
+    EntityPrediction.objects.filter(ml_model__version__startswith=FAST_PATH_VERSION_PREFIX).update(inference_path="fast_path")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("nlp", "0009_alter_mlmodel_name"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="entityprediction",
+            name="inference_path",
+            field=models.CharField(
+                choices=[("fast_path", "Fast Path"), ("model", "Model")],
+                default="model",
+                max_length=16,
+            ),
+        ),
+        migrations.RunPython(mark_fast_path_predictions, migrations.RunPython.noop),
+    ]
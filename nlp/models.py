@@ -1,10 +1,10 @@
 from django.db import models
-from .enums import MLModelEnum
+from .enums import InferencePathEnum, MLModelEnum
 
 
 class MLModel(models.Model):
     
-    name = models.CharField(max_length=256, unique=True, choices=MLModelEnum.choices)
+    name = models.CharField(max_length=256, choices=MLModelEnum.choices)
     version = models.CharField(max_length=24)
     created = models.DateTimeField(auto_now_add=True)
 
@@ -19,4 +19,5 @@ class EntityPrediction(models.Model):
     ml_model = models.ForeignKey(to=MLModel, on_delete=models.CASCADE, related_name="predictions")
     extracted_entities = models.JSONField()
     response_time_ms = models.IntegerField()
+    inference_path = models.CharField(max_length=16, choices=InferencePathEnum.choices, default=InferencePathEnum.MODEL.value)
     created = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
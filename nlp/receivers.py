@@ -0,0 +1,57 @@
+from django.apps import apps
+from django.core.exceptions import SynchronousOnlyOperation
+from django.dispatch import receiver
+import logging
+from .enums import MLModelEnum
+from .errors.persistence_errors import PersistenceError
+from .services.ml_model_cache import ml_model_cache
+from .services.persist import EntityPersistenceService
+from .services.pool import restart_process_pool
+from .services.result_cache import get_result_cache
+from .services.routing import get_language_router
+from .signals import model_evicted, model_loaded
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(model_loaded)
+def invalidate_result_cache_on_load(sender, ml_model: MLModelEnum, version: str, **kwargs):
+    # Entries are keyed on the version already; this just frees the memory they hold.
+    cache = get_result_cache()
+    if cache is not None:
+        cache.invalidate(ml_model)
+
+
+@receiver(model_loaded)
+def resolve_ml_model_on_load(sender, ml_model: MLModelEnum, version: str, **kwargs):
+    ml_model_cache.invalidate(ml_model)
+    if not apps.ready:
+        # Loaded while warming in AppConfig.ready(); the first save resolves it instead.
+        return
+    try:
+        EntityPersistenceService.resolve_ml_model_id(ml_model, version)
+    except (PersistenceError, SynchronousOnlyOperation):
+        logger.warning(
+            f"Could not resolve MLModel `{ml_model.value}` version `{version}` on load; "
+            "it will be resolved on the first save instead."
+        )
+
+
+@receiver(model_loaded)
+def route_to_model_on_load(sender, ml_model: MLModelEnum, version: str, **kwargs):
+    get_language_router().mark_available(ml_model)
+
+
+@receiver(model_loaded)
+def restart_process_pool_on_load(sender, ml_model: MLModelEnum, version: str, **kwargs):
+    # Running workers were forked with the previous pipeline; EntityInferenceService
+    # reports the parent's version, so the workers must be re-forked to match it.
+    restart_process_pool(ml_model)
+
+
+@receiver(model_evicted)
+def invalidate_ml_model_on_evict(sender, ml_model: MLModelEnum, **kwargs):
+    ml_model_cache.invalidate(ml_model)
+    cache = get_result_cache()
+    if cache is not None:
+        cache.invalidate(ml_model)
@@ -1,7 +1,9 @@
-from pydantic import BaseModel
-from typing import Any
+from pydantic import BaseModel, TypeAdapter, field_serializer
+from typing import Any, Optional
+from common.responses.schemas import ApiErrorPayload
 from nlp.dataclasses import EntitySpan
-from .enums import MLModelEnum
+from resolvers.sms.resolved_sms import ResolvedSmsInquiry
+from .enums import InferencePathEnum, MLModelEnum
 
 
 class EntityPredictionData(BaseModel):
@@ -10,6 +12,7 @@ class EntityPredictionData(BaseModel):
     version: str
     ml_model_enum: MLModelEnum
     entities: list[EntitySpan]
+    inference_path: InferencePathEnum = InferencePathEnum.MODEL
 
 
 class PredictionRequest(BaseModel):
@@ -18,4 +21,44 @@ class PredictionRequest(BaseModel):
     
     
 class PredictionResponse(BaseModel):
-    entities: list[dict[str, Any]]
\ No newline at end of file
+    entities: list[dict[str, Any]]
+
+
+class BatchPredictionItem(BaseModel):
+    id: Optional[int]  # None when the item was sent without a valid id
+    success: bool
+    entities: Optional[list[dict[str, Any]]] = None
+    error: Optional[ApiErrorPayload] = None
+
+
+class BatchPredictionResponse(BaseModel):
+    results: list[BatchPredictionItem]
+
+
+_inquiry_adapter = TypeAdapter(ResolvedSmsInquiry)
+
+
+class ResolveResponse(BaseModel):
+    entities: list[EntitySpan]
+    inquiry: ResolvedSmsInquiry
+    timings_ms: dict[str, float]
+
+    @field_serializer("inquiry")
+    def _serialize_inquiry(self, inquiry: ResolvedSmsInquiry) -> dict[str, Any]:
+        """Dumps the resolved dataclasses in JSON mode so their enums are written by value."""
+        return _inquiry_adapter.dump_python(inquiry, mode="json")
+
+
+class BatchResolveItem(BaseModel):
+    id: Optional[int]  # None when the item was sent without a valid id
+    success: bool
+    result: Optional[ResolveResponse] = None
+    error: Optional[ApiErrorPayload] = None
+
+
+class BatchResolveResponse(BaseModel):
+    results: list[BatchResolveItem]
+
+class ModelsResponse(BaseModel):
+    models: dict[str, dict[str, Any]]
+    routing: dict[str, Any]
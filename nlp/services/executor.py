@@ -0,0 +1,37 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import functools
+import threading
+from typing import Callable, TypeVar
+from django.conf import settings
+
+T = TypeVar("T")
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_inference_executor() -> ThreadPoolExecutor:
+    """
+    Returns the process-wide thread pool that CPU-bound inference is offloaded to
+    from async views. Its size bounds how many spaCy calls run at once, no matter
+    how many connections the event loop is holding open.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.ML_INFERENCE_EXECUTOR_WORKERS,
+                    thread_name_prefix="inference",
+                )
+    return _executor
+
+
+async def run_in_executor(fn: Callable[..., T], *args, **kwargs) -> T:
+    """Runs `fn` on the inference executor, carrying over the caller's contextvars."""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, fn, *args, **kwargs)
+    return await loop.run_in_executor(get_inference_executor(), call)
@@ -0,0 +1,143 @@
+import logging
+import random
+import re
+import threading
+from typing import Callable, Optional
+from resolvers.location.parser import parse_location
+from resolvers.location.streets import street_index
+from ..dataclasses import EntitySpan, InferredEntities
+from .registry import model_registry
+from ..enums import EntityLabelEnum, InferencePathEnum, MLModelEnum
+
+logger = logging.getLogger(__name__)
+
+# Resource keywords users text on their own or at the start of a template.
+KEYWORDS = (
+    "food", "meal", "meals", "shelter", "bed", "beds", "water", "toilet", "washroom",
+    "bathroom", "wifi", "wi-fi", "internet", "help",
+)
+_PREPOSITIONS = ("near", "at", "on", "by", "around", "in", "@")
+
+_KEYWORD = "|".join(re.escape(keyword) for keyword in sorted(KEYWORDS, key=len, reverse=True))
+_PREPOSITION = "|".join(re.escape(preposition) for preposition in _PREPOSITIONS)
+_LOCATION_WORD = r"[\w#&@'./-]+"
+
+TEMPLATE_PATTERN = re.compile(
+    rf"^\s*(?P<resource>{_KEYWORD})"
+    rf"(?:\s+(?:(?P<preposition>{_PREPOSITION})\s+)?(?P<location>{_LOCATION_WORD}(?:\s+{_LOCATION_WORD}){{0,5}}?))?"
+    r"\s*[.!?]*\s*$",
+    re.IGNORECASE,
+)
+
+
+class FastPathClassifier:
+    """
+    Rule-based pre-classifier for bare keywords ("FOOD") and fixed templates
+    ("SHELTER 222 Main St", "WIFI near library"). A recognized message gets its
+    EntitySpans straight from one compiled regex and never reaches spaCy;
+    anything else returns None and goes to the model.
+
+    A trailing location is only accepted when the location parser reads it as an
+    address, block, intersection or suffixed street and every street in it is a
+    known street name ("222 Main St", "main and hastings", "hastings st").
+    Anything else after the keyword ("food at 5pm", "shelter 4 women", "meals on
+    wheels") goes to the model.
+
+    Counts how many messages took each InferencePathEnum, and how often the model
+    agreed with a shadowed fast-path answer.
+    """
+    def __init__(self):
+        self.counts = {path: 0 for path in InferencePathEnum}
+        self.shadow_agreed = 0
+        self.shadow_disagreed = 0
+        self._lock = threading.Lock()
+
+    def classify(self, text: str, ml_model: MLModelEnum) -> Optional[InferredEntities]:
+        """
+        Returns the spans of a recognized message, attributed to the loaded version
+        of `ml_model` on the fast path, or None when the message has to go to the model.
+        """
+        entities = self._entity_spans(text) if isinstance(text, str) else None
+        self.count(InferencePathEnum.MODEL if entities is None else InferencePathEnum.FAST_PATH)
+        if entities is None:
+            return None
+        return InferredEntities(
+            text=text,
+            entities=entities,
+            version=model_registry.version(ml_model),
+            ml_model_enum=ml_model,
+            inference_path=InferencePathEnum.FAST_PATH,
+        )
+
+    def count(self, path: InferencePathEnum):
+        with self._lock:
+            self.counts[path] += 1
+
+    def should_shadow(self, rate: float) -> bool:
+        return rate > 0 and random.random() < rate
+
+    def shadow(self, inferred: InferredEntities, model_infer: Callable[[str], InferredEntities]):
+        """
+        Runs the model on a fast-path message and compares the two answers.
+        A disagreement is logged with both sets of spans so the rules can be tuned.
+        """
+        try:
+            expected = model_infer(inferred.text)
+        except Exception:
+            logger.warning(f"Fast-path shadow inference failed for text: `{inferred.text}`", exc_info=True)
+            return
+        agreed = self._span_keys(inferred.entities) == self._span_keys(expected.entities)
+        with self._lock:
+            if agreed:
+                self.shadow_agreed += 1
+            else:
+                self.shadow_disagreed += 1
+        if not agreed:
+            logger.warning(
+                f"Fast path disagrees with `{expected.ml_model_enum.value}` on `{inferred.text}`: "
+                f"fast path {self._span_keys(inferred.entities)}, model {self._span_keys(expected.entities)}"
+            )
+
+    def stats(self) -> dict[str, int]:
+        return {
+            **{path.value: count for path, count in self.counts.items()},
+            "shadow_agreed": self.shadow_agreed,
+            "shadow_disagreed": self.shadow_disagreed,
+        }
+
+    def _entity_spans(self, text: str) -> Optional[list[EntitySpan]]:
+        match = TEMPLATE_PATTERN.match(text)
+        if match is None:
+            return None
+        entities = [self._span(match, "resource", EntityLabelEnum.RESOURCE)]
+        location = match["location"]
+        if location is not None:
+            if not self._is_street_location(location):
+                return None
+            entities.append(self._span(match, "location", EntityLabelEnum.LOCATION))
+        return entities
+
+    @staticmethod
+    def _is_street_location(text: str) -> bool:
+        """True only for addresses, blocks, intersections and streets built from known street names."""
+        parsed = parse_location(text)
+        if parsed is None or not parsed.streets:
+            return False
+        # Numbered streets ("4th") are not in the street list; the parser only reads ordinals as names.
+        return all(street.name in street_index or street.name[0].isdigit() for street in parsed.streets)
+
+    @staticmethod
+    def _span(match: re.Match, group: str, label: EntityLabelEnum) -> EntitySpan:
+        return EntitySpan(
+            label=label.value,
+            text=match[group],
+            start=match.start(group),
+            end=match.end(group),
+        )
+
+    @staticmethod
+    def _span_keys(entities: list[EntitySpan]) -> list[tuple[str, int, int]]:
+        return sorted((entity.label, entity.start, entity.end) for entity in entities)
+
+
+fast_path = FastPathClassifier()
@@ -1,9 +1,15 @@
+from django.conf import settings
 import logging
-import spacy
 from spacy.tokens import Doc
-from ..enums import MLModelEnum
+from typing import Optional
+from common.enums import StageEnum
+from common.utils.tracing import record_stage
+from .pool import get_process_pool
+from .registry import model_registry
+from .result_cache import NormalizedText, get_result_cache
+from ..enums import InferenceBackendEnum, MLModelEnum
 from ..dataclasses import InferredEntities, EntitySpan
-from ..errors.inference_errors import ModelLoadError, InferenceError
+from ..errors.inference_errors import InferenceError
 
 logger = logging.getLogger(__name__)
 
@@ -11,24 +17,98 @@ logger = logging.getLogger(__name__)
 class EntityInferenceService:
     """
     Performs named entity recognition on input text using a pre-trained spaCy model.
+    The model is shared process-wide through the model registry, so constructing
+    the service per request is cheap. With the `process` backend the spaCy calls
+    are dispatched to the inference process pool instead of running in-thread.
+    When the result cache is enabled, a hit skips the spaCy call entirely.
 
     Raises:
-        ModelLoadError: If the spaCy model fails to load on initialization.
+        ModelLoadError: If the spaCy model is not loaded yet and fails to load.
         InferenceError: If input is invalid or the model fails during inference.
     """
-    def __init__(self, ml_model: MLModelEnum, **spacy_kwargs) -> None:
+    def __init__(
+            self,
+            ml_model: MLModelEnum,
+            backend: str = settings.ML_INFERENCE_BACKEND,
+    ) -> None:
         self.model_enum = ml_model
-        try:
-            self.model = spacy.load(self.model_enum.value, **spacy_kwargs)
-        except Exception as e:
-            msg = f"Failed to load spaCy model from path: `{self.model_enum.value}`"
-            logger.error(msg, exc_info=True)
-            raise ModelLoadError(msg) from e
+        self.backend = InferenceBackendEnum(backend)
+        self.model = model_registry.get(self.model_enum)
 
     def infer(self, text: str) -> InferredEntities:
         self._validate_input(text)
-        doc = self._run_model(text)
-        entities = [
+        cache = get_result_cache()
+        if cache is None:
+            return self._inferred_entities(text, *self._run(text))
+
+        normalized = NormalizedText.from_text(text)
+        with record_stage(StageEnum.CACHE_LOOKUP):
+            entities = cache.get(self.model_enum, self._version(), normalized)
+        doc = None
+        if entities is None:
+            entities, doc = self._run(text)
+            cache.set(self.model_enum, self._version(), normalized, entities)
+        return self._inferred_entities(text, entities, doc)
+
+    def infer_batch(self, texts: list[str], batch_size: int) -> list[InferredEntities | InferenceError]:
+        """
+        Runs `texts` through `nlp.pipe()` and returns one result per text, in input order.
+        An item that fails validation or inference is returned as its InferenceError
+        instead of failing the whole batch.
+        """
+        results: list[InferredEntities | InferenceError | None] = [None] * len(texts)
+        valid_indexes = []
+        for i, text in enumerate(texts):
+            try:
+                self._validate_input(text)
+            except InferenceError as e:
+                results[i] = e
+            else:
+                valid_indexes.append(i)
+
+        cache = get_result_cache()
+        normalized_texts: dict[int, NormalizedText] = {}
+        if cache is not None:
+            missed_indexes = []
+            for i in valid_indexes:
+                normalized_texts[i] = NormalizedText.from_text(texts[i])
+                with record_stage(StageEnum.CACHE_LOOKUP):
+                    entities = cache.get(self.model_enum, self._version(), normalized_texts[i])
+                if entities is None:
+                    missed_indexes.append(i)
+                else:
+                    results[i] = self._inferred_entities(texts[i], entities)
+            valid_indexes = missed_indexes
+
+        span_lists = self._run_model_batch([texts[i] for i in valid_indexes], batch_size)
+        for i, spans in zip(valid_indexes, span_lists):
+            if isinstance(spans, InferenceError):
+                results[i] = spans
+                continue
+            entities, doc = spans
+            if cache is not None:
+                cache.set(self.model_enum, self._version(), normalized_texts[i], entities)
+            results[i] = self._inferred_entities(texts[i], entities, doc)
+        return results  # type: ignore
+
+    def _run(self, text: str) -> tuple[list[EntitySpan], Optional[Doc]]:
+        with record_stage(StageEnum.INFERENCE):
+            if self.backend == InferenceBackendEnum.PROCESS:
+                return self._run_pool([text])[0], None
+            doc = self._run_model(text)
+            return self._entity_spans(doc), doc
+
+    def _inferred_entities(self, text: str, entities: list[EntitySpan], doc: Optional[Doc] = None) -> InferredEntities:
+        return InferredEntities(
+            text = text,
+            entities = entities,
+            version=self._version(),
+            ml_model_enum=self.model_enum,
+            doc=doc,
+        )
+
+    def _entity_spans(self, doc: Doc) -> list[EntitySpan]:
+        return [
             EntitySpan(
                 label=ent.label_,
                 text=ent.text,
@@ -36,12 +116,6 @@ class EntityInferenceService:
                 end=ent.end_char,
             ) for ent in doc.ents
         ]
-        return InferredEntities(
-            text = text,
-            entities = entities,
-            version=self._version(),
-            ml_model_enum=self.model_enum,
-        )
 
     def _version(self) -> str:
         return self.model.meta.get("version", "unknown")
@@ -51,11 +125,43 @@ class EntityInferenceService:
             msg = f"Expected 'text' parameter to be a string, got `{type(text)}`"
             logger.error(msg)
             raise InferenceError(msg)
-    
+
     def _run_model(self, text: str) -> Doc:
         try:
             return self.model(text)
         except Exception as e:
             msg = f"spaCy model failed to process text: `{text}`"
             logger.error(msg, exc_info=True)
-            raise InferenceError(msg) from e
\ No newline at end of file
+            raise InferenceError(msg) from e
+
+    def _run_model_batch(
+            self,
+            texts: list[str],
+            batch_size: int,
+    ) -> list[tuple[list[EntitySpan], Optional[Doc]] | InferenceError]:
+        try:
+            with record_stage(StageEnum.INFERENCE_BATCH):
+                if self.backend == InferenceBackendEnum.PROCESS:
+                    return [(spans, None) for spans in self._run_pool(texts)]
+                return [(self._entity_spans(doc), doc) for doc in self.model.pipe(texts, batch_size=batch_size)]
+        except Exception:
+            logger.warning(
+                f"spaCy model failed on a batch of {len(texts)} texts; retrying one at a time",
+                exc_info=True,
+            )
+        span_lists: list[tuple[list[EntitySpan], Optional[Doc]] | InferenceError] = []
+        for text in texts:
+            try:
+                span_lists.append(self._run(text))
+            except InferenceError as e:
+                span_lists.append(e)
+        return span_lists
+
+    def _run_pool(self, texts: list[str]) -> list[list[EntitySpan]]:
+        pool = get_process_pool(
+            self.model_enum,
+            processes=settings.ML_PROCESS_POOL_SIZE,
+            max_tasks_per_child=settings.ML_PROCESS_POOL_MAX_TASKS,
+            timeout_s=settings.ML_PROCESS_POOL_TIMEOUT_S,
+        )
+        return pool.entity_spans(texts)
@@ -0,0 +1,86 @@
+from django.conf import settings
+from typing import Iterator
+from common.utils.metrics import MetricFamily, counter_family, gauge_family, metrics
+from .fastpath import fast_path
+from .registry import model_registry
+from .result_cache import get_result_cache
+from .routing import get_language_router
+from .writebehind import get_write_behind_queue
+from ..enums import InferencePathEnum
+
+
+def collect_nlp_metrics() -> Iterator[MetricFamily]:
+    """
+    Reads the counts the prediction services already keep (fast path, result
+    cache, write-behind queue, model registry and language router) at scrape time.
+    Components that are disabled in settings are left out rather than created.
+    """
+    fast_path_stats = fast_path.stats()
+    yield counter_family(
+        "ninja_brain_inference_path",
+        "Messages answered by the fast path or sent to the model.",
+        {(("path", path.value),): fast_path_stats[path.value] for path in InferencePathEnum},
+    )
+    yield counter_family(
+        "ninja_brain_fast_path_shadow",
+        "Shadowed fast-path answers, by whether the model agreed.",
+        {
+            (("result", "agreed"),): fast_path_stats["shadow_agreed"],
+            (("result", "disagreed"),): fast_path_stats["shadow_disagreed"],
+        },
+    )
+
+    cache = get_result_cache()
+    if cache is not None:
+        cache_stats = cache.stats()
+        yield counter_family(
+            "ninja_brain_result_cache_lookups",
+            "Result cache lookups, by outcome.",
+            {(("result", "hit"),): cache_stats["hits"], (("result", "miss"),): cache_stats["misses"]},
+        )
+        yield gauge_family(
+            "ninja_brain_result_cache",
+            "Result cache size and error counts, by field of its stats.",
+            {(("field", name),): value for name, value in cache_stats.items() if name not in ("hits", "misses")},
+        )
+
+    if settings.ML_WRITE_BEHIND_ENABLED:
+        write_behind_stats = get_write_behind_queue().stats()
+        yield gauge_family(
+            "ninja_brain_write_behind_depth",
+            "Predictions waiting in the write-behind queue.",
+            {(): write_behind_stats.pop("depth")},
+        )
+        yield counter_family(
+            "ninja_brain_write_behind_predictions",
+            "Predictions that went through the write-behind queue, by event.",
+            {(("event", name),): value for name, value in write_behind_stats.items()},
+        )
+
+    model_stats = model_registry.stats()
+    yield gauge_family(
+        "ninja_brain_model_loaded",
+        "Whether each spaCy model is loaded in this process.",
+        {(("model", name),): stats["loaded"] for name, stats in model_stats.items()},
+    )
+    yield gauge_family(
+        "ninja_brain_model_size_bytes",
+        "Resident memory each loaded spaCy model added when it loaded.",
+        {(("model", name),): stats["size_mb"] * 1024 * 1024 for name, stats in model_stats.items()},
+    )
+    yield counter_family(
+        "ninja_brain_model_evictions",
+        "spaCy models evicted from the registry.",
+        {(("model", name),): stats["evictions"] for name, stats in model_stats.items()},
+    )
+
+    routing_stats = get_language_router().stats()
+    yield counter_family(
+        "ninja_brain_routed_messages",
+        "Messages routed by detected language.",
+        {(("language", language),): count for language, count in routing_stats["languages"].items()},  # type: ignore[union-attr]
+    )
+
+
+def register_nlp_metrics():
+    metrics.register_collector(collect_nlp_metrics)
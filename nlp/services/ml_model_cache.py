@@ -0,0 +1,34 @@
+import threading
+from ..enums import MLModelEnum
+
+
+class MLModelCache:
+    """
+    Per-process cache of MLModel primary keys keyed on (MLModelEnum, version).
+
+    The pair only changes when a new model is deployed, so once it is resolved a
+    prediction can be inserted by foreign key without touching the MLModel table.
+    Entries are invalidated whenever the model registry (re)loads or evicts a model.
+    """
+    def __init__(self):
+        self._pks: dict[tuple[MLModelEnum, str], int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, ml_model: MLModelEnum, version: str) -> int | None:
+        return self._pks.get((ml_model, version))
+
+    def set(self, ml_model: MLModelEnum, version: str, pk: int):
+        with self._lock:
+            self._pks[(ml_model, version)] = pk
+
+    def invalidate(self, ml_model: MLModelEnum):
+        with self._lock:
+            for key in [key for key in self._pks if key[0] == ml_model]:
+                del self._pks[key]
+
+    def clear(self):
+        with self._lock:
+            self._pks.clear()
+
+
+ml_model_cache = MLModelCache()
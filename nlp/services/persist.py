@@ -2,7 +2,11 @@ from dataclasses import asdict
 from django.db import transaction
 import logging
 from typing import Any
-from common.constants import DB_WRITE_EXCEPTIONS 
+from common.constants import DB_WRITE_EXCEPTIONS
+from common.enums import StageEnum
+from common.utils.tracing import record_stage
+from .ml_model_cache import ml_model_cache
+from ..enums import MLModelEnum
 from ..errors.persistence_errors import PersistenceError
 from ..models import EntityPrediction, MLModel
 from ..schemas import EntityPredictionData
@@ -11,49 +15,138 @@ logger = logging.getLogger(__name__)
 
 class EntityPersistenceService:
     """
-    Handles saving an EntityPrediction to the database
-    
+    Handles saving an EntityPrediction to the database.
+
+    The MLModel foreign key is resolved through the per-process MLModel cache, so
+    once a model version has been seen a save is a single INSERT.
+
     Raises:
         PersistenceError: If the database write fails.
     """
     def __init__(self, prediction_data: EntityPredictionData):
         self.data = prediction_data
 
-    def _get_or_create_ml_model(self) -> MLModel:
+    @classmethod
+    def resolve_ml_model_id(cls, ml_model_enum: MLModelEnum, version: str) -> int:
+        pk = ml_model_cache.get(ml_model_enum, version)
+        if pk is None:
+            pk = cls._get_or_create_ml_model(ml_model_enum, version).pk
+            ml_model_cache.set(ml_model_enum, version, pk)
+        return pk
+
+    @classmethod
+    async def aresolve_ml_model_id(cls, ml_model_enum: MLModelEnum, version: str) -> int:
+        pk = ml_model_cache.get(ml_model_enum, version)
+        if pk is None:
+            pk = (await cls._aget_or_create_ml_model(ml_model_enum, version)).pk
+            ml_model_cache.set(ml_model_enum, version, pk)
+        return pk
+
+    @staticmethod
+    def _get_or_create_ml_model(ml_model_enum: MLModelEnum, version: str) -> MLModel:
         try:
             ml_model, created = MLModel.objects.get_or_create(
-                name=self.data.ml_model_enum,
-                version=self.data.version
+                name=ml_model_enum.value,
+                version=version
+            )
+        except DB_WRITE_EXCEPTIONS as e:
+            msg = f"Failed to get or create MLModel instance with name `{ml_model_enum}` and version `{version}`"
+            logger.error(msg, exc_info=True)
+            raise PersistenceError(msg) from e
+        else:
+            logger.debug(f"Retrieved MLModel object: `{ml_model}`, created: `{created}`")
+            return ml_model
+
+    @staticmethod
+    async def _aget_or_create_ml_model(ml_model_enum: MLModelEnum, version: str) -> MLModel:
+        try:
+            ml_model, created = await MLModel.objects.aget_or_create(
+                name=ml_model_enum.value,
+                version=version
             )
         except DB_WRITE_EXCEPTIONS as e:
-            msg = f"Failed to get or create MLModel instance with name `{self.data.ml_model_enum}` and version `{self.data.version}`"
+            msg = f"Failed to get or create MLModel instance with name `{ml_model_enum}` and version `{version}`"
             logger.error(msg, exc_info=True)
             raise PersistenceError(msg) from e
-        else:            
+        else:
             logger.debug(f"Retrieved MLModel object: `{ml_model}`, created: `{created}`")
             return ml_model
 
-    def save(self) -> EntityPrediction:        
-        with transaction.atomic():
-            ml_model = self._get_or_create_ml_model()
-            prediction = self._create_prediction(ml_model)
-        return prediction
-    
-    def _create_prediction(self, ml_model: MLModel) -> EntityPrediction:
+    def save(self) -> EntityPrediction:
+        with record_stage(StageEnum.PERSIST):
+            ml_model_id = self.resolve_ml_model_id(self.data.ml_model_enum, self.data.version)
+            return self._create_prediction(ml_model_id)
+
+    async def asave(self) -> EntityPrediction:
+        """Async counterpart of `save()`."""
+        with record_stage(StageEnum.PERSIST):
+            ml_model_id = await self.aresolve_ml_model_id(self.data.ml_model_enum, self.data.version)
+            return await self._acreate_prediction(ml_model_id)
+
+    def unsaved(self) -> EntityPrediction:
+        """Returns the prediction as an unsaved instance, for when the write is deferred."""
+        return EntityPrediction(
+            sms_id=self.data.sms_id,
+            response_time_ms=self.data.elapsed_ms,
+            extracted_entities=self._serialize_entities(),
+            inference_path=self.data.inference_path.value,
+        )
+
+    @classmethod
+    def bulk_save(cls, prediction_data: list[EntityPredictionData]) -> list[EntityPrediction]:
+        """Saves many predictions in one transaction with a single `bulk_create`."""
+        predictions = []
+        with record_stage(StageEnum.PERSIST_BATCH), transaction.atomic():
+            for data in prediction_data:
+                prediction = cls(data).unsaved()
+                prediction.ml_model_id = cls.resolve_ml_model_id(data.ml_model_enum, data.version)
+                predictions.append(prediction)
+            try:
+                created = EntityPrediction.objects.bulk_create(predictions)
+            except DB_WRITE_EXCEPTIONS as e:
+                msg = f"Failed to bulk persist {len(predictions)} EntityPrediction rows"
+                logger.error(msg, exc_info=True)
+                ml_model_cache.clear()
+                raise PersistenceError(msg) from e
+        logger.debug(f"Bulk created {len(created)} EntityPrediction rows")
+        return created
+
+    def _create_prediction(self, ml_model_id: int) -> EntityPrediction:
         try:
             prediction = EntityPrediction.objects.create(
-                ml_model=ml_model,
+                ml_model_id=ml_model_id,
+                sms_id=self.data.sms_id,
+                response_time_ms=self.data.elapsed_ms,
+                extracted_entities=self._serialize_entities(),
+                inference_path=self.data.inference_path.value,
+            )
+        except DB_WRITE_EXCEPTIONS as e:
+            msg = f"Failed to persist EntityPrediction for sms_id `{self.data.sms_id}`"
+            logger.error(msg, exc_info=True)
+            # The cached MLModel row may be gone; re-resolve it on the next save.
+            ml_model_cache.invalidate(self.data.ml_model_enum)
+            raise PersistenceError(msg) from e
+        else:
+            logger.debug(f"Created EntityPrediction: `{prediction}`")
+            return prediction
+
+    async def _acreate_prediction(self, ml_model_id: int) -> EntityPrediction:
+        try:
+            prediction = await EntityPrediction.objects.acreate(
+                ml_model_id=ml_model_id,
                 sms_id=self.data.sms_id,
                 response_time_ms=self.data.elapsed_ms,
                 extracted_entities=self._serialize_entities(),
+                inference_path=self.data.inference_path.value,
             )
         except DB_WRITE_EXCEPTIONS as e:
             msg = f"Failed to persist EntityPrediction for sms_id `{self.data.sms_id}`"
             logger.error(msg, exc_info=True)
+            ml_model_cache.invalidate(self.data.ml_model_enum)
             raise PersistenceError(msg) from e
         else:
             logger.debug(f"Created EntityPrediction: `{prediction}`")
             return prediction
-        
+
     def _serialize_entities(self) -> list[dict[str, Any]]:
         return [asdict(ent) for ent in self.data.entities]
\ No newline at end of file
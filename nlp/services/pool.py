@@ -0,0 +1,178 @@
+import logging
+import math
+import multiprocessing
+import os
+from multiprocessing.pool import Pool
+import threading
+from .registry import model_registry
+from ..dataclasses import EntitySpan
+from ..enums import MLModelEnum
+from ..errors.inference_errors import InferenceError
+
+logger = logging.getLogger(__name__)
+
+
+def _entity_spans_for_texts(model_name: str, texts: list[str]) -> list[list[EntitySpan]]:
+    """
+    Runs inside a pool worker. The registry was populated in the parent before the
+    worker was forked, so the pipeline is inherited copy-on-write, not reloaded.
+    """
+    model = model_registry.get(MLModelEnum(model_name))
+    return [
+        [
+            EntitySpan(
+                label=ent.label_,
+                text=ent.text,
+                start=ent.start_char,
+                end=ent.end_char,
+            ) for ent in doc.ents
+        ] for doc in model.pipe(texts)
+    ]
+
+
+class InferenceProcessPool:
+    """
+    Runs spaCy inference in forked worker processes so NER is not limited to the
+    one core the GIL allows a single Django worker.
+
+    The model is loaded in the parent before forking, so workers share its memory
+    pages read-only. Workers are recycled after `max_tasks_per_child` tasks; the
+    replacements are forked from the parent again and share the same pages. When
+    the parent loads a new version of the model, the pool is restarted so the
+    workers never serve a different version than the one predictions are saved under.
+
+    A call that gets no answer within `timeout_s`, e.g. because a worker was
+    OOM-killed and its task lost, terminates the pool and forks a new one.
+
+    Raises:
+        ModelLoadError: If the model fails to load in the parent process.
+        InferenceError: If a worker fails to process a chunk of texts or does not answer in time.
+    """
+    def __init__(self, ml_model: MLModelEnum, processes: int, max_tasks_per_child: int | None, timeout_s: float):
+        self.ml_model = ml_model
+        self.processes = processes
+        self.max_tasks_per_child = max_tasks_per_child
+        self.timeout = timeout_s
+        self._pool: Pool | None = None
+        self._pid: int | None = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        # A pool inherited through a fork (e.g. from a gunicorn --preload master) has
+        # lost its handler threads, so a child process forks workers of its own.
+        if self.is_running():
+            return
+        model_registry.get(self.ml_model)
+        with self._lock:
+            if self.is_running():
+                return
+            self._pool = self._new_pool()
+            self._pid = os.getpid()
+        logger.info(
+            f"Started inference process pool for `{self.ml_model.value}` with {self.processes} workers"
+        )
+
+    def restart(self):
+        """
+        Re-forks every worker, e.g. after the parent reloaded the model. The new
+        workers are swapped in before the old ones are closed, so requests keep
+        being served; tasks already sent to the old workers finish there.
+        """
+        model_registry.get(self.ml_model)
+        with self._lock:
+            old_pool = self._pool if self._pid == os.getpid() else None
+            self._pool = self._new_pool()
+            self._pid = os.getpid()
+        logger.info(f"Restarted inference process pool for `{self.ml_model.value}`")
+        if old_pool is not None:
+            old_pool.close()
+            old_pool.join()
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+            owned = self._pid == os.getpid()
+        if pool is not None and owned:
+            pool.close()
+            pool.join()
+
+    def is_running(self) -> bool:
+        """True if this process started the pool; a pool inherited through a fork does not count."""
+        return self._pool is not None and self._pid == os.getpid()
+
+    def _replace(self, pool: Pool):
+        """Terminates a pool that stopped answering and forks a new one, unless another caller already did."""
+        with self._lock:
+            if self._pool is not pool:
+                return
+            self._pool = self._new_pool()
+            self._pid = os.getpid()
+        logger.warning(f"Replaced the unresponsive inference process pool for `{self.ml_model.value}`")
+        pool.terminate()
+        pool.join()
+
+    def _new_pool(self) -> Pool:
+        context = multiprocessing.get_context("fork")
+        return context.Pool(
+            processes=self.processes,
+            maxtasksperchild=self.max_tasks_per_child,
+        )
+
+    def entity_spans(self, texts: list[str]) -> list[list[EntitySpan]]:
+        """Splits `texts` across the workers and returns their spans in input order."""
+        if not texts:
+            return []
+        self.start()
+        pool = self._pool
+        chunk_size = math.ceil(len(texts) / self.processes)
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        try:
+            results = pool.starmap_async(  # type: ignore[union-attr]
+                _entity_spans_for_texts,
+                [(self.ml_model.value, chunk) for chunk in chunks],
+            ).get(timeout=self.timeout)
+        except multiprocessing.TimeoutError as e:
+            msg = f"Inference workers did not answer within {self.timeout}s for a chunk of {len(texts)} texts"
+            logger.error(msg)
+            self._replace(pool)  # type: ignore[arg-type]
+            raise InferenceError(msg) from e
+        except Exception as e:
+            msg = f"Inference worker failed to process a chunk of {len(texts)} texts"
+            logger.error(msg, exc_info=True)
+            raise InferenceError(msg) from e
+        return [spans for chunk_spans in results for spans in chunk_spans]
+
+
+_pools: dict[MLModelEnum, InferenceProcessPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_process_pool(
+        ml_model: MLModelEnum,
+        processes: int,
+        max_tasks_per_child: int | None,
+        timeout_s: float,
+) -> InferenceProcessPool:
+    """Returns the process-wide inference pool for `ml_model`, creating it on first use."""
+    pool = _pools.get(ml_model)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(
+                ml_model,
+                InferenceProcessPool(
+                    ml_model,
+                    processes=processes,
+                    max_tasks_per_child=max_tasks_per_child,
+                    timeout_s=timeout_s,
+                ),
+            )
+    return pool
+
+
+def restart_process_pool(ml_model: MLModelEnum) -> bool:
+    """Re-forks the workers of `ml_model`'s pool if this process runs one. Returns whether it did."""
+    pool = _pools.get(ml_model)
+    if pool is None or not pool.is_running():
+        return False
+    pool.restart()
+    return True
@@ -1,16 +1,40 @@
+from asgiref.sync import sync_to_async
+import dataclasses
 from django.conf import settings
 import logging
-from common.utils.timer import time_ms
+from pydantic import ValidationError
+from typing import Any, Callable, Optional, TypeVar
+from common.enums import StageEnum
+from common.responses.schemas import ApiErrorPayload
+from common.utils.metrics import error_count
+from common.utils.timer import atime_ms, time_ms
+from common.utils.tracing import record_span
+from resolvers.language.dataclasses import ResolvedLanguage
+from .executor import get_inference_executor, run_in_executor
+from .fastpath import fast_path
 from .infer import EntityInferenceService
 from .persist import EntityPersistenceService
-from ..dataclasses import InferredEntities
-from ..enums import MLModelEnum
+from .profiling import get_prediction_profiler
+from .routing import get_language_router
+from .scheduler import get_scheduler
+from .writebehind import get_write_behind_queue
+from ..dataclasses import InferredEntities, InvalidBatchItem
+from ..enums import InferenceBackendEnum, MLModelEnum
 from ..errors.inference_errors import ModelLoadError, InferenceError
+from ..errors.persistence_errors import PersistenceError
+from ..errors.request_errors import InvalidRequestError
 from ..models import EntityPrediction
-from ..schemas import EntityPredictionData, PredictionRequest, PredictionResponse
+from ..schemas import (
+    BatchPredictionItem,
+    BatchPredictionResponse,
+    EntityPredictionData,
+    PredictionRequest,
+    PredictionResponse,
+)
 
 
 logger = logging.getLogger(__name__)
+T = TypeVar("T")
 
 
 class EntityPredictionService:
@@ -22,28 +46,149 @@ class EntityPredictionService:
     ):
         self.request_data = request_data
         self.ml_model_enum = self._ml_model_enum(model_name)
+        self.profiling = False
 
     def predict(self) -> PredictionResponse:
-        infer_service = EntityInferenceService(ml_model=self.ml_model_enum)
-        inferred_data, elapsed_ms = time_ms(infer_service.infer, text=self.request_data.text)
-        prediction_data = self._prediction_data(inferred_data, elapsed_ms)
+        with record_span("predict"):
+            inferred_data, elapsed_ms = time_ms(self._infer, text=self.request_data.text)
+            prediction_data = self._prediction_data(self.request_data.id, inferred_data, elapsed_ms)
+            entity_prediction = self._persist(prediction_data)
+
+            return self._build_response(entity_prediction)
+
+    async def apredict(self, profile: bool = False) -> PredictionResponse:
+        """
+        Async counterpart of `predict()` for ASGI deployments. Inference runs on the
+        bounded inference executor (or the micro-batch scheduler) and persistence
+        goes through the async ORM, so the event loop is never blocked.
+
+        With `profile`, the whole of `predict()` runs on one executor thread
+        under the prediction profiler instead.
+        """
+        if profile:
+            return await run_in_executor(self.profiled, self.predict, "predict")
+        with record_span("predict"):
+            inferred_data, elapsed_ms = await atime_ms(self._ainfer, text=self.request_data.text)
+            prediction_data = self._prediction_data(self.request_data.id, inferred_data, elapsed_ms)
+            entity_prediction = await self._apersist(prediction_data)
+
+            return self._build_response(entity_prediction)
+
+    def profiled(self, fn: Callable[[], T], label: str) -> T:
+        """
+        Calls `fn` under the prediction profiler. Inference skips the micro-batch
+        scheduler and the process pool meanwhile so the spaCy call runs on the
+        profiled thread.
+        """
+        self.profiling = True
+        try:
+            return get_prediction_profiler().run(label, fn)
+        finally:
+            self.profiling = False
+
+    def _infer(self, text: str) -> InferredEntities:
+        inferred = self._fast_path(text)
+        if inferred is not None:
+            return inferred
+        return self._infer_model(text)
+
+    async def _ainfer(self, text: str) -> InferredEntities:
+        inferred = self._fast_path(text)
+        if inferred is not None:
+            return inferred
+        if settings.ML_MICROBATCH_ENABLED:
+            # Routing can load a model the first time a language is seen, so it runs off the event loop.
+            ml_model, language = await run_in_executor(self._route, text)
+            with self._scheduled_inference():
+                inferred = await self._scheduler(ml_model).ainfer(text)
+            return dataclasses.replace(inferred, language=language)
+        return await run_in_executor(self._infer_model, text)
+
+    def _infer_model(self, text: str) -> InferredEntities:
+        ml_model, language = self._route(text)
+        if settings.ML_MICROBATCH_ENABLED and not self.profiling:
+            with self._scheduled_inference():
+                inferred = self._scheduler(ml_model).infer(text)
+        else:
+            inferred = self._inference_service(ml_model).infer(text)
+        return dataclasses.replace(inferred, language=language)
+
+    def _inference_service(self, ml_model: MLModelEnum) -> EntityInferenceService:
+        if self.profiling:
+            # cProfile only sees this thread, not the pool's worker processes.
+            return EntityInferenceService(ml_model=ml_model, backend=InferenceBackendEnum.LOCAL.value)
+        return EntityInferenceService(ml_model=ml_model)
+
+    def _route(self, text: str) -> tuple[MLModelEnum, Optional[ResolvedLanguage]]:
+        """
+        The model for the language of `text`, or this service's model if none is
+        mapped, and the language if routing detected it.
+        """
+        with record_span("route"):
+            return get_language_router().route(text, default=self.ml_model_enum)
+
+    def _fast_path(self, text: str) -> Optional[InferredEntities]:
+        """
+        Answers bare keywords and templated messages without the model. A sampled
+        share of the answers is re-checked against the model in the background.
+        """
+        if not settings.ML_FAST_PATH_ENABLED:
+            return None
+        with record_span("fast_path"):
+            inferred = fast_path.classify(text, self.ml_model_enum)
+        if inferred is not None and fast_path.should_shadow(settings.ML_FAST_PATH_SHADOW_RATE):
+            get_inference_executor().submit(fast_path.shadow, inferred, self._infer_model)
+        return inferred
+
+    def _persist(self, prediction_data: EntityPredictionData) -> EntityPrediction:
         persistence_service = EntityPersistenceService(prediction_data)
-        entity_prediction = persistence_service.save()
-            
-        return self._build_response(entity_prediction)
+        if settings.ML_WRITE_BEHIND_ENABLED and get_write_behind_queue().put(prediction_data):
+            return persistence_service.unsaved()
+        return persistence_service.save()
+
+    async def _apersist(self, prediction_data: EntityPredictionData) -> EntityPrediction:
+        persistence_service = EntityPersistenceService(prediction_data)
+        if settings.ML_WRITE_BEHIND_ENABLED:
+            write_behind_queue = get_write_behind_queue()
+            # Only a full queue under the `block` policy can wait, so that case is moved off the event loop.
+            if (
+                write_behind_queue.put(prediction_data, wait=False)
+                or await sync_to_async(write_behind_queue.put, thread_sensitive=False)(prediction_data)
+            ):
+                return persistence_service.unsaved()
+        return await persistence_service.asave()
+
+    def _scheduler(self, ml_model: MLModelEnum):
+        return get_scheduler(
+            ml_model,
+            max_wait_ms=settings.ML_MICROBATCH_MAX_WAIT_MS,
+            max_batch_size=settings.ML_MICROBATCH_MAX_SIZE,
+            timeout_s=settings.ML_MICROBATCH_TIMEOUT_S,
+        )
+
+    @staticmethod
+    def _scheduled_inference():
+        """
+        Times a micro-batched inference from the caller, since the batch runs on the
+        scheduler's thread outside this request's trace. It is a span only: the
+        scheduler already observes its batches into the stage histogram.
+        """
+        return record_span(StageEnum.INFERENCE.value)
 
     def _build_response(self, prediction: EntityPrediction) -> PredictionResponse:
-        return PredictionResponse(
+        # The entities were serialized by this service, so they are not validated again.
+        return PredictionResponse.model_construct(
             entities = prediction.extracted_entities
         )
 
-    def _prediction_data(self, inferred_data: InferredEntities, elapsed_ms: int) -> EntityPredictionData:
+    def _prediction_data(self, sms_id: int, inferred_data: InferredEntities, elapsed_ms: int) -> EntityPredictionData:
         return EntityPredictionData(
-            sms_id = self.request_data.id,
+            sms_id = sms_id,
             elapsed_ms = elapsed_ms,
             version = inferred_data.version,
             ml_model_enum = inferred_data.ml_model_enum,
             entities = inferred_data.entities,
+            inference_path = inferred_data.inference_path,
         )
         
     def _ml_model_enum(self, model_name: str) -> MLModelEnum:
@@ -52,4 +197,109 @@ class EntityPredictionService:
         except ValueError as e:
             msg = f"{self.__class__.__name__} received invalid model_name: {model_name}. Is this a typo?"
             logger.error(msg, exc_info=True)
-            raise ModelLoadError(msg) from e
\ No newline at end of file
+            raise ModelLoadError(msg) from e
+
+
+class BatchEntityPredictionService(EntityPredictionService):
+    """
+    Predicts entities for many SMS in one `nlp.pipe()` pass.
+
+    Every item gets its own result in input order. Items are validated one by
+    one, so a malformed item is reported as an InvalidRequestError on its own
+    result, like inference and persistence errors, and the rest of the batch
+    still succeeds.
+    """
+    def __init__(
+            self,
+            request_data: list[Any],
+            model_name: str = settings.ML_MODEL,
+            batch_size: int = settings.ML_BATCH_SIZE,
+    ):
+        self.request_data = [self._validate_item(item) for item in request_data]
+        self.ml_model_enum = self._ml_model_enum(model_name)
+        self.batch_size = batch_size
+        self.profiling = False
+
+    def predict(self) -> BatchPredictionResponse:
+        if not self.request_data:
+            return BatchPredictionResponse(results=[])
+        with record_span("predict_batch"):
+            items = self._valid_items()
+            inferred_items, elapsed_ms = time_ms(self._infer_batch, texts=[item.text for item in items])
+            item_elapsed_ms = elapsed_ms // max(len(items), 1)
+            # Results come back in the order of the valid items, which is their order in the request.
+            inferred = iter(inferred_items)
+
+            return BatchPredictionResponse.model_construct(results=[
+                self._error_item(item, item.error) if isinstance(item, InvalidBatchItem)
+                else self._predict_item(item, next(inferred), item_elapsed_ms)
+                for item in self.request_data
+            ])
+
+    def _valid_items(self) -> list[PredictionRequest]:
+        return [item for item in self.request_data if isinstance(item, PredictionRequest)]
+
+    @staticmethod
+    def _validate_item(item: Any) -> PredictionRequest | InvalidBatchItem:
+        try:
+            return PredictionRequest.model_validate(item)
+        except ValidationError as e:
+            details = "; ".join(
+                f"{'.'.join(str(part) for part in error['loc']) or 'item'}: {error['msg']}"
+                for error in e.errors()
+            )
+            msg = f"Invalid batch item: {details}"
+            logger.error(msg)
+            item_id = item.get("id") if isinstance(item, dict) else None
+            return InvalidBatchItem(
+                id=item_id if isinstance(item_id, int) and not isinstance(item_id, bool) else None,
+                error=InvalidRequestError(msg),
+            )
+
+    def _infer_batch(self, texts: list[str]) -> list[InferredEntities | InferenceError]:
+        """
+        Runs only the texts the fast path could not answer through `nlp.pipe()`,
+        one pass per routed model.
+        """
+        results: list[InferredEntities | InferenceError | None] = [self._fast_path(text) for text in texts]
+        model_indexes: dict[MLModelEnum, list[int]] = {}
+        languages: dict[int, Optional[ResolvedLanguage]] = {}
+        for i, inferred in enumerate(results):
+            if inferred is None:
+                ml_model, languages[i] = self._route(texts[i])
+                model_indexes.setdefault(ml_model, []).append(i)
+        for ml_model, indexes in model_indexes.items():
+            infer_service = self._inference_service(ml_model)
+            model_results = infer_service.infer_batch([texts[i] for i in indexes], batch_size=self.batch_size)
+            for i, inferred in zip(indexes, model_results):
+                if not isinstance(inferred, InferenceError):
+                    inferred = dataclasses.replace(inferred, language=languages[i])
+                results[i] = inferred
+        return results  # type: ignore[return-value]
+
+    def _predict_item(
+            self,
+            item: PredictionRequest,
+            inferred: InferredEntities | InferenceError,
+            elapsed_ms: int,
+    ) -> BatchPredictionItem:
+        if isinstance(inferred, InferenceError):
+            return self._error_item(item, inferred)
+        prediction_data = self._prediction_data(item.id, inferred, elapsed_ms)
+        try:
+            entity_prediction = self._persist(prediction_data)
+        except PersistenceError as e:
+            return self._error_item(item, e)
+        return BatchPredictionItem.model_construct(
+            id=item.id,
+            success=True,
+            entities=entity_prediction.extracted_entities,
+        )
+
+    def _error_item(self, item: PredictionRequest | InvalidBatchItem, e: Exception) -> BatchPredictionItem:
+        error_count.inc(e.__class__.__name__)
+        return BatchPredictionItem(
+            id=item.id,
+            success=False,
+            error=ApiErrorPayload(type=e.__class__.__name__, msg=str(e)),
+        )
\ No newline at end of file
@@ -0,0 +1,158 @@
+import cProfile
+from datetime import datetime, timezone
+from django.conf import settings
+from django.http import HttpRequest
+import hmac
+import json
+import logging
+import os
+from pathlib import Path
+import pstats
+import random
+import threading
+import time
+from typing import Any, Callable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+T = TypeVar("T")
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_SUFFIX = ".prof"
+SUMMARY_SUFFIX = ".json"
+# Frames from these packages make up the "spaCy call" summary.
+SPACY_PACKAGES = ("spacy", "thinc")
+SUMMARY_LIMIT = 25
+
+
+def function_label(key: tuple[str, int, str]) -> str:
+    filename, lineno, name = key
+    return f"{filename}:{lineno}({name})"
+
+
+def is_spacy_frame(filename: str) -> bool:
+    parts = Path(filename).parts
+    return any(package in parts for package in SPACY_PACKAGES)
+
+
+def summarize_stats(stats: pstats.Stats, limit: int = SUMMARY_LIMIT, spacy_only: bool = False) -> list[dict[str, Any]]:
+    """The `limit` functions with the most cumulative time, as JSON-friendly dicts."""
+    rows = []
+    for key, (_, calls, total, cumulative, _) in stats.stats.items():  # type: ignore[attr-defined]
+        if spacy_only and not is_spacy_frame(key[0]):
+            continue
+        rows.append({
+            "function": function_label(key),
+            "calls": calls,
+            "total_ms": round(total * 1000, 3),
+            "cumulative_ms": round(cumulative * 1000, 3),
+        })
+    rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+    return rows[:limit]
+
+
+class PredictionProfiler:
+    """
+    Runs sampled prediction requests under cProfile.
+
+    A request is profiled when profiling is switched on for every request, when
+    it falls in the sampled share, or when it carries the `X-Profile` header
+    with the configured token. Each capture is written to `directory` as a
+    `.prof` file for pstats/snakeviz, next to a `.json` summary of the slowest
+    functions overall and within spaCy. Only the newest `max_files` captures
+    are kept.
+
+    Only one request is profiled at a time; a request that would overlap a
+    running capture is served without profiling.
+    """
+    def __init__(
+            self,
+            directory: Path,
+            enabled: bool,
+            sample_rate: float,
+            header_token: str,
+            max_files: int,
+    ):
+        self.directory = directory
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.header_token = header_token
+        self.max_files = max_files
+        self._lock = threading.Lock()
+
+    def should_profile(self, request: HttpRequest) -> bool:
+        if self.enabled:
+            return True
+        if self.header_token:
+            token = request.headers.get(PROFILE_HEADER, "")
+            if token and hmac.compare_digest(token, self.header_token):
+                return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def run(self, label: str, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Calls `fn` under the profiler and saves the capture, unless one is already running."""
+        if not self._lock.acquire(blocking=False):
+            logger.debug(f"Skipped profiling `{label}`; another capture is running")
+            return fn(*args, **kwargs)
+        try:
+            profiler = cProfile.Profile()
+            start = time.perf_counter()
+            try:
+                return profiler.runcall(fn, *args, **kwargs)
+            finally:
+                self._save(label, profiler, (time.perf_counter() - start) * 1000)
+        finally:
+            self._lock.release()
+
+    def captures(self) -> list[Path]:
+        """Saved `.prof` files, oldest first."""
+        if not self.directory.is_dir():
+            return []
+        return sorted(self.directory.glob(f"*{PROFILE_SUFFIX}"))
+
+    def _save(self, label: str, profiler: cProfile.Profile, elapsed_ms: float):
+        created = datetime.now(timezone.utc)
+        name = f"{created.strftime('%Y%m%dT%H%M%S%f')}_{label}_{os.getpid()}"
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            profile_path = self.directory / f"{name}{PROFILE_SUFFIX}"
+            profiler.dump_stats(profile_path)
+            stats = pstats.Stats(profiler)
+            summary = {
+                "label": label,
+                "created": created.isoformat(),
+                "elapsed_ms": round(elapsed_ms, 3),
+                "top": summarize_stats(stats),
+                "spacy": summarize_stats(stats, spacy_only=True),
+            }
+            (self.directory / f"{name}{SUMMARY_SUFFIX}").write_text(json.dumps(summary, indent=2) + "\n")
+            self._rotate()
+        except OSError:
+            logger.error(f"Failed to save profile `{name}` to `{self.directory}`", exc_info=True)
+            return
+        logger.info(f"Saved profile of `{label}` ({elapsed_ms:.1f}ms) to `{profile_path}`")
+
+    def _rotate(self):
+        captures = self.captures()
+        for profile_path in captures[:max(len(captures) - self.max_files, 0)]:
+            profile_path.unlink(missing_ok=True)
+            profile_path.with_suffix(SUMMARY_SUFFIX).unlink(missing_ok=True)
+
+
+_profiler: Optional[PredictionProfiler] = None
+_profiler_lock = threading.Lock()
+
+
+def get_prediction_profiler() -> PredictionProfiler:
+    """Returns the process-wide prediction profiler, configured from settings."""
+    global _profiler
+    if _profiler is None:
+        with _profiler_lock:
+            if _profiler is None:
+                _profiler = PredictionProfiler(
+                    directory=Path(settings.PROFILING_DIR),
+                    enabled=settings.PROFILING_ENABLED,
+                    sample_rate=settings.PROFILING_SAMPLE_RATE,
+                    header_token=settings.PROFILING_HEADER_TOKEN,
+                    max_files=settings.PROFILING_MAX_FILES,
+                )
+    return _profiler
@@ -0,0 +1,222 @@
+from collections import OrderedDict
+from django.conf import settings
+import logging
+import os
+from pathlib import Path
+import threading
+import spacy
+from spacy.language import Language
+from common.enums import StageEnum
+from common.utils.tracing import record_stage
+from ..enums import MLModelEnum
+from ..errors.inference_errors import ModelLoadError
+from ..signals import model_evicted, model_loaded
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """
+    Process-wide store of loaded spaCy pipelines, keyed by MLModelEnum.
+
+    Each pipeline is loaded from disk once per process and the same instance is
+    handed out to every caller. `reload()` and `evict()` allow a new model version
+    to be rolled out without restarting the worker.
+
+    Pipelines are trimmed at load time with the model's profile in
+    `ML_MODEL_PIPELINE_PROFILES`: components listed under `exclude` are never
+    loaded and those under `disable` are loaded but skipped. Only `doc.ents` is
+    read downstream, so everything but NER and what it depends on can go.
+
+    With `ML_MODEL_MEMORY_BUDGET_MB` set, the least recently used pipelines are
+    evicted once the loaded ones add up to more than the budget. Sizes are the
+    growth in resident memory measured while each pipeline loaded. The default
+    `ML_MODEL` is never evicted.
+
+    Raises:
+        ModelLoadError: If a spaCy model fails to load, or its profile disables a
+            component the pipeline does not have or would remove NER.
+    """
+    def __init__(self):
+        self._models: OrderedDict[MLModelEnum, Language] = OrderedDict()
+        self._sizes: dict[MLModelEnum, int] = {}
+        self._load_ms: dict[MLModelEnum, float] = {}
+        self._loads: dict[MLModelEnum, int] = {}
+        self._evictions: dict[MLModelEnum, int] = {}
+        self._lock = threading.RLock()
+
+    def get(self, ml_model: MLModelEnum) -> Language:
+        """Returns the shared pipeline for `ml_model`, loading it on first use."""
+        model = self._models.get(ml_model)
+        if model is not None:
+            self._touch(ml_model)
+            return model
+        with self._lock:
+            model = self._models.get(ml_model)
+            if model is not None:
+                return model
+            model = self._load(ml_model)
+            self._models[ml_model] = model
+        self._send_loaded(ml_model, model)
+        self._enforce_budget(keep=ml_model)
+        return model
+
+    def warm(self, *ml_models: MLModelEnum):
+        for ml_model in ml_models:
+            self.get(ml_model)
+
+    def reload(self, ml_model: MLModelEnum) -> Language:
+        """
+        Loads a fresh copy of `ml_model` from disk and swaps it in.
+        Requests already holding the old pipeline finish on it undisturbed.
+        """
+        model = self._load(ml_model)
+        with self._lock:
+            self._models[ml_model] = model
+            self._models.move_to_end(ml_model)
+        logger.info(f"Reloaded spaCy model `{ml_model.value}` (version `{self.version(ml_model)}`)")
+        self._send_loaded(ml_model, model)
+        return model
+
+    def evict(self, ml_model: MLModelEnum) -> bool:
+        """Drops `ml_model` from the registry. Returns False if it was not loaded."""
+        with self._lock:
+            evicted = self._models.pop(ml_model, None) is not None
+            if evicted:
+                self._sizes.pop(ml_model, None)
+                self._evictions[ml_model] = self._evictions.get(ml_model, 0) + 1
+        if evicted:
+            logger.info(f"Evicted spaCy model `{ml_model.value}`")
+            model_evicted.send(sender=self.__class__, ml_model=ml_model)
+        return evicted
+
+    def is_loaded(self, ml_model: MLModelEnum) -> bool:
+        return ml_model in self._models
+
+    def loaded(self) -> list[MLModelEnum]:
+        return list(self._models)
+
+    def version(self, ml_model: MLModelEnum) -> str:
+        return self.get(ml_model).meta.get("version", "unknown")
+
+    def stats(self) -> dict[str, dict[str, float | int | bool]]:
+        """Per-model load counts, last load time, measured size and evictions."""
+        return {
+            ml_model.value: {
+                "loaded": ml_model in self._models,
+                "loads": self._loads.get(ml_model, 0),
+                "load_ms": self._load_ms.get(ml_model, 0.0),
+                "size_mb": self._sizes.get(ml_model, 0) / (1024 * 1024),
+                "evictions": self._evictions.get(ml_model, 0),
+            }
+            for ml_model in MLModelEnum
+            if ml_model in self._loads or ml_model in self._models
+        }
+
+    def _touch(self, ml_model: MLModelEnum):
+        # Reordering races with loads and evictions on other threads, which OrderedDict does not guard against.
+        with self._lock:
+            if ml_model in self._models:
+                self._models.move_to_end(ml_model)
+
+    def _enforce_budget(self, keep: MLModelEnum):
+        budget = settings.ML_MODEL_MEMORY_BUDGET_MB * 1024 * 1024
+        if budget <= 0:
+            return
+        pinned = {keep, MLModelEnum(settings.ML_MODEL)}
+        while True:
+            with self._lock:
+                total = sum(self._sizes.get(ml_model, 0) for ml_model in self._models)
+                candidates = [ml_model for ml_model in self._models if ml_model not in pinned]
+            if total <= budget or not candidates:
+                return
+            logger.info(
+                f"Loaded spaCy models use {total / (1024 * 1024):.0f}MB of a "
+                f"{settings.ML_MODEL_MEMORY_BUDGET_MB}MB budget; evicting `{candidates[0].value}`"
+            )
+            self.evict(candidates[0])
+
+    def _send_loaded(self, ml_model: MLModelEnum, model: Language):
+        model_loaded.send(
+            sender=self.__class__,
+            ml_model=ml_model,
+            version=model.meta.get("version", "unknown"),
+        )
+
+    def _load(self, ml_model: MLModelEnum) -> Language:
+        profile = settings.ML_MODEL_PIPELINE_PROFILES.get(ml_model.value, {})
+        exclude = list(profile.get("exclude", []))
+        disable = list(profile.get("disable", []))
+        self._validate_profile(ml_model, exclude, disable)
+        rss_before = _rss_bytes()
+        with record_stage(StageEnum.MODEL_LOAD) as load_span:
+            try:
+                model = spacy.load(ml_model.value, exclude=exclude, disable=disable)
+            except Exception as e:
+                msg = f"Failed to load spaCy model from path: `{ml_model.value}`"
+                logger.error(msg, exc_info=True)
+                raise ModelLoadError(msg) from e
+
+        if "ner" not in model.pipe_names:
+            msg = f"spaCy model `{ml_model.value}` has no active `ner` component with pipeline `{model.pipe_names}`"
+            logger.error(msg)
+            raise ModelLoadError(msg)
+        self._load_ms[ml_model] = load_span.elapsed_ms
+        self._loads[ml_model] = self._loads.get(ml_model, 0) + 1
+        rss_after = _rss_bytes()
+        if rss_before is not None and rss_after is not None:
+            self._sizes[ml_model] = max(rss_after - rss_before, 0)
+        logger.info(
+            f"Loaded spaCy model `{ml_model.value}` with pipeline `{model.pipe_names}` "
+            f"in {self._load_ms[ml_model]:.0f}ms"
+        )
+        return model
+
+    def _validate_profile(self, ml_model: MLModelEnum, exclude: list[str], disable: list[str]):
+        if not exclude and not disable:
+            return
+        if "ner" in exclude or "ner" in disable:
+            msg = f"Pipeline profile for `{ml_model.value}` removes the `ner` component"
+            logger.error(msg)
+            raise ModelLoadError(msg)
+        components = self._declared_components(ml_model)
+        if components is None:
+            logger.warning(f"Could not read the pipeline of `{ml_model.value}` to validate its profile")
+            return
+        unknown_excluded = [name for name in exclude if name not in components]
+        if unknown_excluded:
+            # Excluding a component that is not there is a no-op, so it is only worth a warning.
+            logger.warning(
+                f"Pipeline profile for `{ml_model.value}` excludes components {unknown_excluded} "
+                f"that are not in its pipeline `{components}`"
+            )
+        unknown_disabled = [name for name in disable if name not in components]
+        if unknown_disabled:
+            msg = (
+                f"Pipeline profile for `{ml_model.value}` disables components {unknown_disabled} "
+                f"that are not in its pipeline `{components}`"
+            )
+            logger.error(msg)
+            raise ModelLoadError(msg)
+
+    def _declared_components(self, ml_model: MLModelEnum) -> list[str] | None:
+        """Reads the full component list from the model's meta.json without loading it."""
+        name = ml_model.value
+        try:
+            path = spacy.util.get_package_path(name) if spacy.util.is_package(name) else Path(name)
+            meta = spacy.util.get_model_meta(path)
+        except Exception:
+            return None
+        return meta.get("components") or meta.get("pipeline")
+
+
+def _rss_bytes() -> int | None:
+    """Resident memory of this process, or None where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,111 @@
+from django.conf import settings
+import logging
+from common.responses.schemas import ApiErrorPayload
+from common.utils.metrics import error_count
+from common.utils.tracing import record_span
+from resolvers.sms.resolver import SmsResolver
+from .executor import run_in_executor
+from .predict import BatchEntityPredictionService, EntityPredictionService
+from ..dataclasses import InferredEntities, InvalidBatchItem
+from ..errors.inference_errors import InferenceError
+from ..errors.resolution_errors import ResolutionError
+from ..schemas import (
+    BatchResolveItem,
+    BatchResolveResponse,
+    PredictionRequest,
+    ResolveResponse,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class SmsResolutionService(EntityPredictionService):
+    """
+    Infers the entities of an SMS once, through the same fast path, cache and
+    backend as a prediction, then resolves them into a ResolvedSmsInquiry.
+    Nothing is persisted. Every stage is timed and returned in `timings_ms`.
+
+    Raises:
+        ModelLoadError: If the spaCy model fails to load.
+        InferenceError: If the model fails during inference.
+        ResolutionError: If a resolver fails on the inferred entities.
+    """
+    def resolve(self) -> ResolveResponse:
+        with record_span("infer") as infer_span:
+            inferred = self._infer(self.request_data.text)
+        return self._resolve(self.request_data, inferred, infer_span.elapsed_ms)
+
+    async def aresolve(self) -> ResolveResponse:
+        with record_span("infer") as infer_span:
+            inferred = await self._ainfer(self.request_data.text)
+        # The resolvers are CPU-bound (gazetteer, spelling correction, matcher), so they run off the event loop too.
+        return await run_in_executor(self._resolve, self.request_data, inferred, infer_span.elapsed_ms)
+
+    def _resolve(self, item: PredictionRequest, inferred: InferredEntities, inference_ms: float) -> ResolveResponse:
+        resolver = SmsResolver(
+            msg=item.text,
+            entities=inferred.entities,
+            max_edit_distance=settings.RESOLVER_MAX_EDIT_DISTANCE,
+            doc=inferred.doc,
+            language=inferred.language,
+        )
+        try:
+            with record_span("resolve") as resolve_span:
+                inquiry = resolver.resolve_sms()
+        except Exception as e:
+            msg = f"Failed to resolve SMS `{item.id}` due to an unexpected error: {e.__class__.__name__}"
+            logger.error(msg, exc_info=True)
+            raise ResolutionError(msg) from e
+        return ResolveResponse(
+            entities=inferred.entities,
+            inquiry=inquiry,
+            timings_ms={
+                "inference": inference_ms,
+                **resolver.timings_ms,
+                "total": inference_ms + resolve_span.elapsed_ms,
+            },
+        )
+
+
+class BatchSmsResolutionService(BatchEntityPredictionService, SmsResolutionService):
+    """
+    Resolves many SMS with one `nlp.pipe()` pass over the texts the fast path
+    could not answer. Failures, including items that fail validation, are
+    reported on the failing item only.
+    """
+    def resolve(self) -> BatchResolveResponse:  # type: ignore[override]
+        if not self.request_data:
+            return BatchResolveResponse(results=[])
+        items = self._valid_items()
+        with record_span("infer_batch") as infer_span:
+            inferred_items = self._infer_batch([item.text for item in items])
+        item_inference_ms = infer_span.elapsed_ms / max(len(items), 1)
+        inferred = iter(inferred_items)
+
+        return BatchResolveResponse(results=[
+            self._failed_item(item, item.error) if isinstance(item, InvalidBatchItem)
+            else self._resolve_item(item, next(inferred), item_inference_ms)
+            for item in self.request_data
+        ])
+
+    def _resolve_item(
+            self,
+            item: PredictionRequest,
+            inferred: InferredEntities | InferenceError,
+            inference_ms: float,
+    ) -> BatchResolveItem:
+        if isinstance(inferred, InferenceError):
+            return self._failed_item(item, inferred)
+        try:
+            result = self._resolve(item, inferred, inference_ms)
+        except ResolutionError as e:
+            return self._failed_item(item, e)
+        return BatchResolveItem(id=item.id, success=True, result=result)
+
+    def _failed_item(self, item: PredictionRequest | InvalidBatchItem, e: Exception) -> BatchResolveItem:
+        error_count.inc(e.__class__.__name__)
+        return BatchResolveItem(
+            id=item.id,
+            success=False,
+            error=ApiErrorPayload(type=e.__class__.__name__, msg=str(e)),
+        )
@@ -0,0 +1,267 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from django.conf import settings
+from django.core.cache import caches
+import hashlib
+import json
+import logging
+import threading
+import time
+from ..dataclasses import EntitySpan
+from ..enums import MLModelEnum, ResultCacheBackendEnum
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class NormalizedText:
+    """
+    Lower-cased, whitespace-collapsed form of an SMS, plus the index maps needed to
+    translate entity offsets between the normalized and the original text.
+    """
+    original: str
+    text: str
+    to_original: list[int]
+    to_normalized: list[int]
+
+    @classmethod
+    def from_text(cls, original: str) -> "NormalizedText":
+        chars: list[str] = []
+        to_original: list[int] = []
+        to_normalized = [0] * (len(original) + 1)
+        pending_space = False
+        for i, char in enumerate(original):
+            if char.isspace():
+                pending_space = bool(chars)
+                to_normalized[i] = len(chars)
+                continue
+            if pending_space:
+                chars.append(" ")
+                to_original.append(i - 1)
+                pending_space = False
+            lowered = char.lower()
+            to_normalized[i] = len(chars)
+            chars.append(lowered if len(lowered) == 1 else char)
+            to_original.append(i)
+        to_normalized[len(original)] = len(chars)
+        return cls(original=original, text="".join(chars), to_original=to_original, to_normalized=to_normalized)
+
+    def normalize_span(self, entity: EntitySpan) -> tuple[str, int, int]:
+        return (
+            entity.label,
+            self.to_normalized[entity.start],
+            self.to_normalized[entity.end - 1] + 1 if entity.end > entity.start else self.to_normalized[entity.start],
+        )
+
+    def restore_span(self, label: str, start: int, end: int) -> EntitySpan:
+        original_start = self.to_original[start]
+        original_end = self.to_original[end - 1] + 1 if end > start else original_start
+        return EntitySpan(
+            label=label,
+            text=self.original[original_start:original_end],
+            start=original_start,
+            end=original_end,
+        )
+
+
+# Rough per-object overheads, used to keep the cache under its memory cap.
+_ENTRY_OVERHEAD_BYTES = 200
+_SPAN_OVERHEAD_BYTES = 120
+
+
+class PredictionResultCache:
+    """
+    In-process LRU cache of inference results keyed on normalized SMS text, model
+    name and model version.
+
+    Entries store spans as offsets into the normalized text, so a hit for a message
+    that differs only in case or whitespace is mapped back onto the caller's text.
+    Entries expire after `ttl_s` and the least recently used ones are evicted once
+    the estimated size passes `max_bytes`. Keying on the model version means a
+    version bump never serves stale results.
+    """
+    def __init__(self, max_bytes: int, ttl_s: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl_s
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[tuple[MLModelEnum, str, str], tuple[float, int, tuple]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, ml_model: MLModelEnum, version: str, normalized: NormalizedText) -> list[EntitySpan] | None:
+        key = (ml_model, version, normalized.text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return [normalized.restore_span(*span) for span in entry[2]]
+
+    def set(self, ml_model: MLModelEnum, version: str, normalized: NormalizedText, entities: list[EntitySpan]):
+        key = (ml_model, version, normalized.text)
+        spans = tuple(normalized.normalize_span(entity) for entity in entities)
+        size = _ENTRY_OVERHEAD_BYTES + len(normalized.text) + _SPAN_OVERHEAD_BYTES * len(spans)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, size, spans)
+            self._size += size
+            while self._size > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, ml_model: MLModelEnum):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == ml_model]:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self._size,
+        }
+
+    def _remove(self, key: tuple[MLModelEnum, str, str]):
+        _, size, _ = self._entries.pop(key)
+        self._size -= size
+
+
+class SharedPredictionResultCache:
+    """
+    Inference result cache stored in one of Django's CACHES, so gunicorn workers
+    (or hosts) share hits. Works with any configured backend: local-memory,
+    file-based, database or Redis.
+
+    Values are the normalized spans encoded as a compact JSON array of
+    `[label, start, end]` triples. Keys hash the normalized text so they stay
+    short and valid for every backend. Cache backend errors are logged and
+    treated as misses so a cache outage never fails a prediction.
+
+    The alias may hold other data too, so `clear()` never clears it. Entries are
+    written under a cache key version read from the alias, which `clear()` bumps;
+    older entries are never read again and expire by TTL. Each worker re-reads
+    the version at most every `generation_refresh_s`.
+    """
+    GENERATION_KEY = "prediction:generation"
+
+    def __init__(self, alias: str, ttl_s: float, generation_refresh_s: float = 5.0):
+        self.alias = alias
+        self.ttl = ttl_s
+        self.generation_refresh = generation_refresh_s
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._generation = 0
+        self._generation_expires = 0.0
+
+    def get(self, ml_model: MLModelEnum, version: str, normalized: NormalizedText) -> list[EntitySpan] | None:
+        try:
+            value = caches[self.alias].get(self._key(ml_model, version, normalized), version=self._current_generation())
+        except Exception:
+            self.errors += 1
+            logger.warning(f"Prediction cache `{self.alias}` lookup failed", exc_info=True)
+            value = None
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [normalized.restore_span(*span) for span in self._decode(value)]
+
+    def set(self, ml_model: MLModelEnum, version: str, normalized: NormalizedText, entities: list[EntitySpan]):
+        value = self._encode([normalized.normalize_span(entity) for entity in entities])
+        try:
+            caches[self.alias].set(
+                self._key(ml_model, version, normalized),
+                value,
+                timeout=self.ttl,
+                version=self._current_generation(),
+            )
+        except Exception:
+            self.errors += 1
+            logger.warning(f"Prediction cache `{self.alias}` write failed", exc_info=True)
+
+    def invalidate(self, ml_model: MLModelEnum):
+        """
+        Shared entries cannot be enumerated per model. They are keyed on the model
+        version, so a new version never reads them, and they expire by TTL.
+        """
+
+    def clear(self):
+        """Stops every worker from reading the current entries, leaving the rest of the alias alone."""
+        cache = caches[self.alias]
+        try:
+            generation = cache.incr(self.GENERATION_KEY)
+        except ValueError:
+            # Not set yet, so entries were written under generation 0.
+            generation = 1
+            cache.set(self.GENERATION_KEY, generation, timeout=None)
+        self._generation, self._generation_expires = generation, time.monotonic() + self.generation_refresh
+
+    def _current_generation(self) -> int:
+        now = time.monotonic()
+        if now >= self._generation_expires:
+            self._generation = caches[self.alias].get(self.GENERATION_KEY, 0)
+            self._generation_expires = now + self.generation_refresh
+        return self._generation
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
+
+    @staticmethod
+    def _key(ml_model: MLModelEnum, version: str, normalized: NormalizedText) -> str:
+        digest = hashlib.blake2b(normalized.text.encode(), digest_size=16).hexdigest()
+        return f"prediction:{ml_model.value}:{version}:{digest}"
+
+    @staticmethod
+    def _encode(spans: list[tuple[str, int, int]]) -> str:
+        return json.dumps(spans, separators=(",", ":"))
+
+    @staticmethod
+    def _decode(value: str) -> list[tuple[str, int, int]]:
+        return json.loads(value)
+
+
+_result_cache: PredictionResultCache | SharedPredictionResultCache | None = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> PredictionResultCache | SharedPredictionResultCache | None:
+    """Returns the process-wide result cache, or None when it is disabled in settings."""
+    global _result_cache
+    if not settings.ML_RESULT_CACHE_ENABLED:
+        return None
+    if _result_cache is None:
+        with _result_cache_lock:
+            if _result_cache is None:
+                _result_cache = _build_result_cache()
+    return _result_cache
+
+
+def _build_result_cache() -> PredictionResultCache | SharedPredictionResultCache:
+    if ResultCacheBackendEnum(settings.ML_RESULT_CACHE_BACKEND) == ResultCacheBackendEnum.SHARED:
+        return SharedPredictionResultCache(
+            alias=settings.ML_RESULT_CACHE_ALIAS,
+            ttl_s=settings.ML_RESULT_CACHE_TTL_S,
+        )
+    return PredictionResultCache(
+        max_bytes=settings.ML_RESULT_CACHE_MAX_BYTES,
+        ttl_s=settings.ML_RESULT_CACHE_TTL_S,
+    )
@@ -0,0 +1,120 @@
+from django.conf import settings
+import logging
+import threading
+import time
+from typing import Optional
+from resolvers.language.dataclasses import ResolvedLanguage
+from resolvers.language.enums import LanguageEnum
+from resolvers.language.resolver import LanguageResolver
+from .registry import model_registry
+from ..enums import MLModelEnum
+from ..errors.inference_errors import ModelLoadError
+
+logger = logging.getLogger(__name__)
+
+
+class LanguageModelRouter:
+    """
+    Picks the spaCy model for an SMS from its detected language, using the
+    LanguageEnum -> MLModelEnum mapping in `ML_LANGUAGE_MODELS`. Languages without
+    a mapping go to the caller's default model, and so does any SMS shorter than
+    `min_length` characters or whose language is identified with less than
+    `min_confidence`: a misrouted English message costs more than a foreign
+    one read by the default model.
+
+    A mapped model that fails to load is marked unavailable and its language
+    falls back to the default until the model loads again (e.g. after a reload),
+    or until `retry_seconds` have passed and a new load is attempted.
+
+    Counts requests per detected language. Detection is skipped entirely, and
+    nothing is counted, while no language is mapped. The detected language is
+    returned with the model so later stages (the SMS resolver) need not detect
+    it again.
+    """
+    def __init__(
+            self,
+            language_models: dict[str, str],
+            min_confidence: float = 0.9,
+            min_length: int = 20,
+            retry_seconds: float = 300.0,
+    ):
+        self.language_models = {
+            LanguageEnum(language): MLModelEnum(ml_model)
+            for language, ml_model in language_models.items()
+        }
+        self.min_confidence = min_confidence
+        self.min_length = min_length
+        self.retry_seconds = retry_seconds
+        self.counts = {language: 0 for language in LanguageEnum}
+        self.fallbacks = 0
+        # Unavailable model -> time.monotonic() after which loading it is retried.
+        self._unavailable: dict[MLModelEnum, float] = {}
+        self._lock = threading.Lock()
+
+    def route(self, text: str, default: MLModelEnum) -> tuple[MLModelEnum, Optional[ResolvedLanguage]]:
+        """Returns the model for `text` and its detected language, or None if detection was skipped."""
+        if not self.language_models or not isinstance(text, str):
+            return default, None
+        resolved = LanguageResolver(text).resolve()
+        with self._lock:
+            self.counts[resolved.language] += 1
+        ml_model = self.language_models.get(resolved.language, default)
+        if ml_model == default:
+            return default, resolved
+        if resolved.confidence < self.min_confidence or len(text.strip()) < self.min_length:
+            return default, resolved
+        if not self._is_available(ml_model):
+            with self._lock:
+                self.fallbacks += 1
+            return default, resolved
+        return ml_model, resolved
+
+    def mark_available(self, ml_model: MLModelEnum):
+        with self._lock:
+            self._unavailable.pop(ml_model, None)
+
+    def stats(self) -> dict[str, dict[str, int] | dict[str, str] | list[str] | int]:
+        return {
+            "languages": {language.value: count for language, count in self.counts.items()},
+            "models": {language.value: ml_model.value for language, ml_model in self.language_models.items()},
+            "unavailable": sorted(ml_model.value for ml_model in self._unavailable),
+            "fallbacks": self.fallbacks,
+        }
+
+    def _is_available(self, ml_model: MLModelEnum) -> bool:
+        """Loads `ml_model` on first use; a failure marks it unavailable for `retry_seconds`."""
+        with self._lock:
+            retry_at = self._unavailable.get(ml_model)
+        if retry_at is not None and time.monotonic() < retry_at:
+            return False
+        try:
+            model_registry.get(ml_model)
+        except ModelLoadError:
+            logger.warning(
+                f"Model `{ml_model.value}` is unavailable; routing its language to the default model "
+                f"for {self.retry_seconds:.0f}s"
+            )
+            with self._lock:
+                self._unavailable[ml_model] = time.monotonic() + self.retry_seconds
+            return False
+        self.mark_available(ml_model)
+        return True
+
+
+_router: Optional[LanguageModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_language_router() -> LanguageModelRouter:
+    """Returns the process-wide router, built from `ML_LANGUAGE_MODELS` on first use."""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = LanguageModelRouter(
+                    settings.ML_LANGUAGE_MODELS,
+                    min_confidence=settings.ML_ROUTING_MIN_CONFIDENCE,
+                    min_length=settings.ML_ROUTING_MIN_LENGTH,
+                    retry_seconds=settings.ML_ROUTING_RETRY_SECONDS,
+                )
+    return _router
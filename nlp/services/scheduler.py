@@ -0,0 +1,150 @@
+import asyncio
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+import logging
+import os
+import queue
+import threading
+import time
+from .infer import EntityInferenceService
+from ..dataclasses import InferredEntities
+from ..enums import MLModelEnum
+from ..errors.inference_errors import InferenceError
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _PendingInference:
+    text: str
+    future: Future = field(default_factory=Future)
+
+
+class MicroBatchScheduler:
+    """
+    Coalesces concurrent single-text inference calls into one `nlp.pipe()` pass.
+
+    Callers block on their own Future while a background thread collects requests
+    for up to `max_wait_ms`, or until `max_batch_size` are waiting, then runs them
+    through `EntityInferenceService.infer_batch()` together. Each caller gets back
+    its own InferredEntities, or has its own InferenceError raised.
+
+    A caller waits at most `timeout_s` for its result, so a stalled or dead
+    batch thread fails requests with an InferenceError instead of hanging them.
+    """
+    def __init__(self, ml_model: MLModelEnum, max_wait_ms: float, max_batch_size: int, timeout_s: float):
+        self.ml_model = ml_model
+        self.max_wait = max_wait_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.timeout = timeout_s
+        self._queue: queue.Queue[_PendingInference] = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+
+    def infer(self, text: str) -> InferredEntities:
+        try:
+            return self.submit(text).result(timeout=self.timeout)
+        except TimeoutError as e:
+            raise self._timeout_error() from e
+
+    async def ainfer(self, text: str) -> InferredEntities:
+        """Async counterpart of `infer()`; a caller that times out cancels its request."""
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(self.submit(text)), timeout=self.timeout)
+        except TimeoutError as e:
+            raise self._timeout_error() from e
+
+    def submit(self, text: str) -> Future:
+        self._ensure_worker()
+        pending = _PendingInference(text=text)
+        self._queue.put(pending)
+        return pending.future
+
+    def _ensure_worker(self):
+        # The worker thread does not survive a fork (e.g. gunicorn --preload), so a
+        # child process starts its own.
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run,
+                name=f"microbatch-{self.ml_model.value}",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            # Requests cancelled by a caller that timed out are dropped; the rest can no longer be cancelled.
+            batch = [pending for pending in self._collect_batch() if pending.future.set_running_or_notify_cancel()]
+            if batch:
+                self._dispatch(batch)
+
+    def _collect_batch(self) -> list[_PendingInference]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _dispatch(self, batch: list[_PendingInference]):
+        try:
+            infer_service = EntityInferenceService(ml_model=self.ml_model)
+            results = infer_service.infer_batch(
+                [pending.text for pending in batch],
+                batch_size=len(batch),
+            )
+        except Exception as e:
+            logger.error(f"Micro-batch of {len(batch)} texts failed before inference", exc_info=True)
+            for pending in batch:
+                pending.future.set_exception(e)
+            return
+
+        logger.debug(f"Ran micro-batch of {len(batch)} texts on `{self.ml_model.value}`")
+        for pending, result in zip(batch, results):
+            if isinstance(result, InferenceError):
+                pending.future.set_exception(result)
+            else:
+                pending.future.set_result(result)
+
+    def _timeout_error(self) -> InferenceError:
+        msg = f"Micro-batch scheduler for `{self.ml_model.value}` did not answer within {self.timeout}s"
+        logger.error(msg)
+        return InferenceError(msg)
+
+
+_schedulers: dict[MLModelEnum, MicroBatchScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(
+        ml_model: MLModelEnum,
+        max_wait_ms: float,
+        max_batch_size: int,
+        timeout_s: float,
+) -> MicroBatchScheduler:
+    """Returns the process-wide scheduler for `ml_model`, creating it on first use."""
+    scheduler = _schedulers.get(ml_model)
+    if scheduler is None:
+        with _schedulers_lock:
+            scheduler = _schedulers.setdefault(
+                ml_model,
+                MicroBatchScheduler(
+                    ml_model,
+                    max_wait_ms=max_wait_ms,
+                    max_batch_size=max_batch_size,
+                    timeout_s=timeout_s,
+                ),
+            )
+    return scheduler
@@ -0,0 +1,178 @@
+import atexit
+from django.conf import settings
+from django.db import close_old_connections, connections
+import logging
+import os
+import queue
+import threading
+import time
+from .persist import EntityPersistenceService
+from ..enums import BackpressurePolicyEnum
+from ..errors.persistence_errors import PersistenceError
+from ..schemas import EntityPredictionData
+
+logger = logging.getLogger(__name__)
+
+
+class PredictionWriteBehindQueue:
+    """
+    Defers EntityPrediction writes off the request path.
+
+    Predictions are put on a bounded in-memory queue and a background thread
+    writes them with `bulk_create` once `flush_size` are waiting or
+    `flush_interval_ms` has passed. When the queue is full, `policy` decides
+    whether the caller waits, the prediction is dropped, or the caller writes it
+    synchronously. Remaining items are drained at interpreter shutdown.
+    """
+    def __init__(
+            self,
+            max_size: int,
+            flush_size: int,
+            flush_interval_ms: float,
+            policy: BackpressurePolicyEnum,
+            drain_timeout_s: float,
+    ):
+        self.max_size = max_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.policy = policy
+        self.drain_timeout = drain_timeout_s
+        self.enqueued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.failed = 0
+        self._queue: queue.Queue[EntityPredictionData] = queue.Queue(maxsize=max_size)
+        self._closing = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "depth": self.depth,
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    def put(self, prediction_data: EntityPredictionData, wait: bool = True) -> bool:
+        """
+        Queues `prediction_data` for a deferred write. Returns False when the caller
+        must write it itself: the queue is shutting down, the policy is `sync`, or
+        `wait` is False and the queue is full (the backpressure policy is then not
+        applied, so async callers can retry off the event loop).
+        """
+        if self._closing.is_set():
+            return False
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(prediction_data)
+        except queue.Full:
+            if not wait:
+                return False
+            return self._apply_policy(prediction_data)
+        self._count("enqueued")
+        return True
+
+    def drain(self):
+        """Stops accepting predictions and waits for the queued ones to be written."""
+        self._closing.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            thread.join(self.drain_timeout)
+        if self.depth:
+            logger.warning(f"Write-behind queue shut down with {self.depth} predictions unwritten")
+
+    def _apply_policy(self, prediction_data: EntityPredictionData) -> bool:
+        if self.policy == BackpressurePolicyEnum.BLOCK:
+            self._queue.put(prediction_data)
+            self._count("enqueued")
+            return True
+        if self.policy == BackpressurePolicyEnum.DROP:
+            self._count("dropped")
+            logger.warning(
+                f"Write-behind queue full ({self.max_size}); dropped prediction for sms_id `{prediction_data.sms_id}`"
+            )
+            return True
+        return False
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.max_size)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="prediction-write-behind", daemon=True)
+            self._thread.start()
+            atexit.register(self.drain)
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            if batch:
+                self._flush(batch)
+            elif self._closing.is_set():
+                connections.close_all()
+                return
+
+    def _collect_batch(self) -> list[EntityPredictionData]:
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.flush_size:
+            remaining = 0 if self._closing.is_set() else deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch: list[EntityPredictionData]):
+        # Anything escaping here would end the flusher thread silently and leave the
+        # queue to fill up, so every error only fails the batch.
+        try:
+            close_old_connections()
+            EntityPersistenceService.bulk_save(batch)
+        except PersistenceError:
+            self._count("failed", len(batch))
+        except Exception:
+            logger.error(
+                f"Write-behind flush of {len(batch)} predictions failed due to an unexpected error",
+                exc_info=True,
+            )
+            self._count("failed", len(batch))
+        else:
+            self._count("flushed", len(batch))
+
+    def _count(self, counter: str, amount: int = 1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+
+_write_behind_queue: PredictionWriteBehindQueue | None = None
+_write_behind_lock = threading.Lock()
+
+
+def get_write_behind_queue() -> PredictionWriteBehindQueue:
+    """Returns the process-wide write-behind queue, configured from settings."""
+    global _write_behind_queue
+    if _write_behind_queue is None:
+        with _write_behind_lock:
+            if _write_behind_queue is None:
+                _write_behind_queue = PredictionWriteBehindQueue(
+                    max_size=settings.ML_WRITE_BEHIND_MAX_QUEUE,
+                    flush_size=settings.ML_WRITE_BEHIND_FLUSH_SIZE,
+                    flush_interval_ms=settings.ML_WRITE_BEHIND_FLUSH_INTERVAL_MS,
+                    policy=BackpressurePolicyEnum(settings.ML_WRITE_BEHIND_POLICY),
+                    drain_timeout_s=settings.ML_WRITE_BEHIND_DRAIN_TIMEOUT_S,
+                )
+    return _write_behind_queue
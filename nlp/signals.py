@@ -0,0 +1,8 @@
+from django.dispatch import Signal
+
+# Sent by the model registry with `ml_model` (MLModelEnum) and `version` (str)
+# whenever a pipeline is loaded or reloaded.
+model_loaded = Signal()
+
+# Sent by the model registry with `ml_model` (MLModelEnum) when a pipeline is evicted.
+model_evicted = Signal()
@@ -1,3 +1,959 @@
-from django.test import TestCase
+from asgiref.sync import async_to_sync
+from concurrent.futures import wait
+import dataclasses
+import io
+import itertools
+import json
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+import os
+from pathlib import Path
+import signal
+import spacy
+from spacy.language import Language
+import tempfile
+from typing import Optional
+from unittest import mock
+from common.enums import StreetNinjaEnum
+from resolvers.language.enums import LanguageEnum
+from .dataclasses import EntitySpan
+from .enums import BackpressurePolicyEnum, EntityLabelEnum, InferencePathEnum, MLModelEnum
+from .errors.inference_errors import InferenceError, ModelLoadError
+from .management.commands.bench_predict import Command as BenchPredictCommand
+from .models import EntityPrediction, MLModel
+from .schemas import EntityPredictionData, PredictionRequest
+from .services.fastpath import FastPathClassifier
+from .services.infer import EntityInferenceService
+from .services.ml_model_cache import ml_model_cache
+from .services.persist import EntityPersistenceService
+from .services.predict import BatchEntityPredictionService, EntityPredictionService
+from .services.pool import InferenceProcessPool, get_process_pool
+from .services.profiling import PredictionProfiler
+from .services.routing import LanguageModelRouter
+from .services.registry import model_registry
+from .services.result_cache import NormalizedText, PredictionResultCache, SharedPredictionResultCache
+from .services.scheduler import MicroBatchScheduler
+from .services.writebehind import PredictionWriteBehindQueue
+from .signals import model_evicted, model_loaded
 
-# Create your tests here.
+ML_MODEL = MLModelEnum.EN_STREETNINJA
+TEST_PID = os.getpid()
+
+
+@Language.component("kill_worker_on_crash")
+def kill_worker_on_crash(doc):
+    """Dies like an OOM-killed worker on the text `crash`, but only inside a pool worker."""
+    if doc.text == "crash" and os.getpid() != TEST_PID:
+        os.kill(os.getpid(), signal.SIGKILL)
+    return doc
+
+
+class StubModelEnum(StreetNinjaEnum):
+    """Stand-ins for models other than ML_MODEL, the only MLModelEnum member so far."""
+    FR = "fr_stub"
+    ES = "es_stub"
+    PT = "pt_stub"
+
+
+def ruler_pipeline(version: str = "0.0.0-test") -> Language:
+    """
+    A blank English pipeline whose `ner` component is an EntityRuler, standing in
+    for the trained model so the tests do not depend on it being installed.
+    """
+    nlp = spacy.blank("en")
+    nlp.meta["version"] = version
+    ruler = nlp.add_pipe("entity_ruler", name="ner")
+    ruler.add_patterns([  # type: ignore[attr-defined]
+        {"label": EntityLabelEnum.RESOURCE.value, "pattern": [{"LOWER": {"IN": ["shelter", "food", "bed"]}}]},
+        {"label": EntityLabelEnum.LOCATION.value, "pattern": [{"LOWER": "main"}, {"LOWER": "st"}]},
+        {"label": EntityLabelEnum.QUALIFIER.value, "pattern": [{"LOWER": "women"}, {"LOWER": "only"}]},
+    ])
+    return nlp
+
+
+class RulerModelMixin:
+    """Loads `ruler_pipeline()` into the model registry in place of ML_MODEL for each test."""
+
+    def setUp(self):
+        super().setUp()  # type: ignore[misc]
+        model_registry.evict(ML_MODEL)
+        patcher = mock.patch("nlp.services.registry.spacy.load", side_effect=lambda *args, **kwargs: ruler_pipeline())
+        patcher.start()
+        self.addCleanup(patcher.stop)  # type: ignore[attr-defined]
+        self.addCleanup(model_registry.evict, ML_MODEL)  # type: ignore[attr-defined]
+        # Loaded here rather than on a worker thread, which could not see the test's transaction.
+        model_registry.get(ML_MODEL)
+
+
+class ModelRegistryTests(RulerModelMixin, TestCase):
+
+    def receive(self, signal) -> list[dict]:
+        received: list[dict] = []
+
+        def receiver(sender, **kwargs):
+            received.append(kwargs)
+
+        signal.connect(receiver)
+        self.addCleanup(signal.disconnect, receiver)
+        return received
+
+    def test_reload_swaps_the_pipeline_and_resolves_its_ml_model(self):
+        loaded = self.receive(model_loaded)
+        old_model = model_registry.get(ML_MODEL)
+        with mock.patch("nlp.services.registry.spacy.load", side_effect=lambda *args, **kwargs: ruler_pipeline("0.0.1-test")):
+            model_registry.reload(ML_MODEL)
+
+        self.assertIsNot(model_registry.get(ML_MODEL), old_model)
+        self.assertEqual(model_registry.version(ML_MODEL), "0.0.1-test")
+        self.assertEqual([(kwargs["ml_model"], kwargs["version"]) for kwargs in loaded], [(ML_MODEL, "0.0.1-test")])
+        # The model_loaded receiver resolves the new version's MLModel row ahead of the first save.
+        ml_model = MLModel.objects.get(name=ML_MODEL.value, version="0.0.1-test")
+        self.assertEqual(ml_model_cache.get(ML_MODEL, "0.0.1-test"), ml_model.pk)
+
+    def test_evict_drops_the_pipeline_and_its_cached_state(self):
+        evicted = self.receive(model_evicted)
+        evictions = model_registry.stats()[ML_MODEL.value]["evictions"]
+        cache = PredictionResultCache(max_bytes=1024 * 1024, ttl_s=60)
+        normalized = NormalizedText.from_text("shelter")
+        cache.set(ML_MODEL, "0.0.0-test", normalized, [])
+
+        with override_settings(ML_RESULT_CACHE_ENABLED=True), mock.patch("nlp.services.result_cache._result_cache", cache):
+            self.assertTrue(model_registry.evict(ML_MODEL))
+            self.assertFalse(model_registry.evict(ML_MODEL))
+
+        self.assertEqual([kwargs["ml_model"] for kwargs in evicted], [ML_MODEL])
+        self.assertFalse(model_registry.is_loaded(ML_MODEL))
+        self.assertIsNone(ml_model_cache.get(ML_MODEL, "0.0.0-test"))
+        self.assertIsNone(cache.get(ML_MODEL, "0.0.0-test", normalized))
+
+        model_registry.get(ML_MODEL)
+        self.assertEqual(model_registry.stats()[ML_MODEL.value]["evictions"], evictions + 1)
+
+
+@mock.patch("nlp.services.registry.ModelRegistry._declared_components", return_value=["tok2vec", "tagger", "parser", "ner"])
+class PipelineProfileTests(TestCase):
+
+    def setUp(self):
+        model_registry.evict(ML_MODEL)
+        self.addCleanup(model_registry.evict, ML_MODEL)
+        patcher = mock.patch("nlp.services.registry.spacy.load", side_effect=lambda *args, **kwargs: ruler_pipeline())
+        self.load = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def load_with(self, profile: dict):
+        with override_settings(ML_MODEL_PIPELINE_PROFILES={ML_MODEL.value: profile}):
+            return model_registry.get(ML_MODEL)
+
+    def test_the_profile_is_passed_to_spacy(self, declared_components):
+        self.load_with({"exclude": ["tagger", "parser"], "disable": ["tok2vec"]})
+        self.load.assert_called_once_with(ML_MODEL.value, exclude=["tagger", "parser"], disable=["tok2vec"])
+
+    def test_a_profile_without_ner_is_rejected_before_loading(self, declared_components):
+        for profile in ({"exclude": ["ner"]}, {"disable": ["ner"]}):
+            with self.subTest(profile=profile), self.assertRaises(ModelLoadError), self.assertLogs("nlp.services.registry", "ERROR"):
+                self.load_with(profile)
+        self.load.assert_not_called()
+        self.assertFalse(model_registry.is_loaded(ML_MODEL))
+
+    def test_unknown_components_fail_only_when_disabled(self, declared_components):
+        with self.assertRaises(ModelLoadError), self.assertLogs("nlp.services.registry", "ERROR"):
+            self.load_with({"disable": ["textcat"]})
+        self.load.assert_not_called()
+
+        with self.assertLogs("nlp.services.registry", "WARNING") as logs:
+            self.load_with({"exclude": ["textcat"]})
+        self.assertIn("['textcat']", logs.output[0])
+        self.assertTrue(model_registry.is_loaded(ML_MODEL))
+
+    def test_a_loaded_pipeline_must_still_run_ner(self, declared_components):
+        self.load.side_effect = lambda *args, **kwargs: spacy.blank("en")
+        with self.assertRaises(ModelLoadError), self.assertLogs("nlp.services.registry", "ERROR"):
+            self.load_with({})
+
+
+@override_settings(ML_MODEL_MEMORY_BUDGET_MB=190)
+class ModelMemoryBudgetTests(RulerModelMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        for ml_model in StubModelEnum:
+            self.addCleanup(model_registry.evict, ml_model)
+        # Every load grows resident memory by 60MB.
+        patcher = mock.patch("nlp.services.registry._rss_bytes", side_effect=itertools.count(0, 60 * 1024 * 1024))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        model_registry._sizes[ML_MODEL] = 60 * 1024 * 1024
+
+    def test_the_least_recently_used_model_is_evicted_past_the_budget(self):
+        evicted = []
+
+        def receiver(sender, ml_model, **kwargs):
+            evicted.append(ml_model)
+
+        model_evicted.connect(receiver)
+        self.addCleanup(model_evicted.disconnect, receiver)
+
+        model_registry.get(StubModelEnum.FR)
+        model_registry.get(StubModelEnum.ES)
+        model_registry.get(StubModelEnum.FR)
+        model_registry.get(StubModelEnum.PT)
+
+        self.assertEqual(evicted, [StubModelEnum.ES])
+        self.assertEqual(model_registry.loaded(), [ML_MODEL, StubModelEnum.FR, StubModelEnum.PT])
+
+    def test_the_default_and_the_model_just_loaded_are_never_evicted(self):
+        with override_settings(ML_MODEL_MEMORY_BUDGET_MB=1):
+            model_registry.get(StubModelEnum.FR)
+            self.assertEqual(model_registry.loaded(), [ML_MODEL, StubModelEnum.FR])
+            model_registry.get(StubModelEnum.ES)
+        self.assertEqual(model_registry.loaded(), [ML_MODEL, StubModelEnum.ES])
+
+
+class LanguageModelRouterTests(RulerModelMixin, TestCase):
+
+    FRENCH = "je cherche un lit pour ce soir"
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(model_registry.evict, StubModelEnum.FR)
+        with mock.patch("nlp.services.routing.MLModelEnum", StubModelEnum):
+            self.router = LanguageModelRouter({"fr": StubModelEnum.FR.value}, min_confidence=0.9, min_length=20)
+
+    def test_confident_long_messages_go_to_their_languages_model(self):
+        ml_model, language = self.router.route(self.FRENCH, default=ML_MODEL)
+        self.assertEqual((ml_model, language.language), (StubModelEnum.FR, LanguageEnum.FRENCH))  # type: ignore[union-attr]
+
+        for text in ("merci beaucoup", "I need a bed for tonight near main street"):
+            with self.subTest(text=text):
+                self.assertEqual(self.router.route(text, default=ML_MODEL)[0], ML_MODEL)
+        self.assertEqual(self.router.stats()["languages"]["fr"], 1)  # type: ignore[index]
+
+    def test_nothing_is_detected_while_no_language_is_mapped(self):
+        router = LanguageModelRouter({})
+        self.assertEqual(router.route(self.FRENCH, default=ML_MODEL), (ML_MODEL, None))
+        self.assertEqual(sum(router.stats()["languages"].values()), 0)  # type: ignore[union-attr]
+
+    def test_an_unavailable_model_falls_back_until_it_loads(self):
+        with mock.patch("nlp.services.registry.spacy.load", side_effect=OSError) as load, \
+                self.assertLogs("nlp.services", "WARNING"):
+            self.assertEqual(self.router.route(self.FRENCH, default=ML_MODEL)[0], ML_MODEL)
+            self.assertEqual(self.router.route(self.FRENCH, default=ML_MODEL)[0], ML_MODEL)
+        self.assertEqual(load.call_count, 1)
+        self.assertEqual((self.router.stats()["fallbacks"], self.router.stats()["unavailable"]), (2, ["fr_stub"]))
+
+        self.router.mark_available(StubModelEnum.FR)
+        self.assertEqual(self.router.route(self.FRENCH, default=ML_MODEL)[0], StubModelEnum.FR)
+        self.assertEqual(self.router.stats()["unavailable"], [])
+
+
+@override_settings(METRICS_ALLOWED_IPS=[], METRICS_TOKEN="metrics-token")
+class ModelsApiTests(RulerModelMixin, TestCase):
+
+    def test_models_needs_the_metrics_credentials(self):
+        self.assertEqual(self.client.get("/api/nlp/models").status_code, 401)
+
+        response = self.client.get("/api/nlp/models", headers={"Authorization": "Bearer metrics-token"})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()["payload"]["data"]
+        self.assertTrue(data["models"][ML_MODEL.value]["loaded"])
+        self.assertIn("routing", data)
+
+
+class BatchPredictionApiTests(RulerModelMixin, TestCase):
+
+    def test_invalid_items_fail_in_their_own_result(self):
+        response = self.client.post(
+            "/api/nlp/predict/batch",
+            data=[
+                {"text": "need a shelter", "id": 1},
+                {"text": 5, "id": 2},
+                {"id": "x"},
+                "food near main st",
+                {"text": "food near main st", "id": 5},
+            ],
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["payload"]["data"]["results"]
+        self.assertEqual([(result["id"], result["success"]) for result in results], [
+            (1, True), (2, False), (None, False), (None, False), (5, True),
+        ])
+        self.assertEqual([entity["text"] for entity in results[4]["entities"]], ["food", "main st"])
+        self.assertEqual({result["error"]["type"] for result in results[1:4]}, {"InvalidRequestError"})
+        self.assertIn("text", results[1]["error"]["msg"])
+        self.assertEqual(sorted(EntityPrediction.objects.values_list("sms_id", flat=True)), [1, 5])
+
+    def test_invalid_items_fail_in_their_own_resolve_result(self):
+        response = self.client.post(
+            "/api/nlp/resolve/batch",
+            data=[{"text": "need a shelter", "id": 1}, {"id": 2}],
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        first, second = response.json()["payload"]["data"]["results"]
+        self.assertEqual(first["result"]["inquiry"]["resource"]["resource"], "SHELTER")
+        self.assertEqual((second["id"], second["success"], second["error"]["type"]), (2, False, "InvalidRequestError"))
+
+
+class SmsResolutionApiTests(RulerModelMixin, TestCase):
+
+    def route_languages(self):
+        """Maps French to the default model, so routing detects each language and keeps ML_MODEL."""
+        router = LanguageModelRouter({"fr": ML_MODEL.value}, min_length=0)
+        patcher = mock.patch("nlp.services.predict.get_language_router", return_value=router)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_resolve_returns_the_inquiry_without_persisting(self):
+        response = self.client.post(
+            "/api/nlp/resolve",
+            data={"text": "women only shelter near main st", "id": 1},
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()["payload"]["data"]
+        self.assertEqual([entity["text"] for entity in data["entities"]], ["women only", "shelter", "main st"])
+        inquiry = data["inquiry"]
+        self.assertEqual(
+            (inquiry["language"]["language"], inquiry["resource"]["resource"], inquiry["location"]["normalized"]),
+            ("en", "SHELTER", "main st"),
+        )
+        self.assertEqual(inquiry["params"]["params"], {"gender": "women"})
+        self.assertLessEqual({"inference", "language", "resource", "location", "qualifier", "total"}, set(data["timings_ms"]))
+        self.assertFalse(EntityPrediction.objects.exists())
+
+    def test_resolve_reuses_the_language_detected_by_routing(self):
+        self.route_languages()
+        with mock.patch("resolvers.sms.resolver.LanguageResolver") as language_resolver:
+            response = self.client.post(
+                "/api/nlp/resolve",
+                data={"text": "je cherche un lit pour ce soir", "id": 1},
+                content_type="application/json",
+            )
+
+        language_resolver.assert_not_called()
+        data = response.json()["payload"]["data"]
+        self.assertEqual(data["inquiry"]["language"]["language"], "fr")
+        self.assertNotIn("language", data["timings_ms"])
+
+    def test_resolve_batch_resolves_each_item_in_order(self):
+        self.route_languages()
+        with mock.patch("resolvers.sms.resolver.LanguageResolver") as language_resolver:
+            response = self.client.post(
+                "/api/nlp/resolve/batch",
+                data=[
+                    {"text": "je cherche un lit pour ce soir", "id": 1},
+                    {"text": "food near main st", "id": 2},
+                ],
+                content_type="application/json",
+            )
+
+        language_resolver.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        first, second = response.json()["payload"]["data"]["results"]
+        self.assertEqual((first["id"], first["success"], first["result"]["inquiry"]["language"]["language"]), (1, True, "fr"))
+        self.assertEqual(
+            (second["id"], second["result"]["inquiry"]["resource"]["resource"], second["result"]["inquiry"]["location"]["normalized"]),
+            (2, "FOOD", "main st"),
+        )
+        self.assertFalse(EntityPrediction.objects.exists())
+
+
+class MicroBatchSchedulerTests(RulerModelMixin, TestCase):
+
+    def test_concurrent_requests_run_as_one_batch(self):
+        scheduler = MicroBatchScheduler(ML_MODEL, max_wait_ms=1000, max_batch_size=3, timeout_s=10)
+        texts = ["need a shelter", "food near main st", "women only please"]
+        with mock.patch.object(
+                EntityInferenceService,
+                "infer_batch",
+                autospec=True,
+                side_effect=EntityInferenceService.infer_batch,
+        ) as infer_batch:
+            futures = [scheduler.submit(text) for text in texts]
+            wait(futures, timeout=10)
+
+        self.assertEqual(infer_batch.call_count, 1)
+        results = [future.result() for future in futures]
+        self.assertEqual([result.text for result in results], texts)
+        self.assertEqual(
+            [[entity.text for entity in result.entities] for result in results],
+            [["shelter"], ["food", "main st"], ["women only"]],
+        )
+
+    def test_a_failed_text_only_fails_its_own_caller(self):
+        scheduler = MicroBatchScheduler(ML_MODEL, max_wait_ms=1000, max_batch_size=2, timeout_s=10)
+        bad, good = scheduler.submit(None), scheduler.submit("a bed tonight")  # type: ignore[arg-type]
+
+        with self.assertRaises(InferenceError):
+            bad.result(timeout=10)
+        self.assertEqual([entity.label for entity in good.result(timeout=10).entities], ["RESOURCE"])
+
+    def test_a_lone_request_is_sent_after_max_wait(self):
+        scheduler = MicroBatchScheduler(ML_MODEL, max_wait_ms=5, max_batch_size=32, timeout_s=10)
+        result = scheduler.infer("shelter")
+        self.assertEqual(result.version, "0.0.0-test")
+        self.assertEqual(result.ml_model_enum, ML_MODEL)
+
+    def test_callers_give_up_on_a_stalled_scheduler(self):
+        scheduler = MicroBatchScheduler(ML_MODEL, max_wait_ms=5, max_batch_size=32, timeout_s=0.05)
+        # No batch thread, as if it had died.
+        with mock.patch.object(scheduler, "_ensure_worker"):
+            with self.assertRaises(InferenceError):
+                scheduler.infer("shelter")
+            with self.assertRaises(InferenceError):
+                async_to_sync(scheduler.ainfer)("shelter")
+
+    def test_a_cancelled_request_does_not_stop_the_batch(self):
+        scheduler = MicroBatchScheduler(ML_MODEL, max_wait_ms=200, max_batch_size=32, timeout_s=10)
+        abandoned = scheduler.submit("food")
+        self.assertTrue(abandoned.cancel())
+
+        self.assertEqual([entity.text for entity in scheduler.infer("shelter").entities], ["shelter"])
+        self.assertEqual([entity.text for entity in scheduler.infer("bed").entities], ["bed"])
+
+
+class AsyncPredictionTests(RulerModelMixin, TestCase):
+
+    async def test_apredict_persists_through_the_async_orm(self):
+        service = EntityPredictionService(PredictionRequest(text="food near main st", id=7))
+        response = await service.apredict()
+
+        self.assertEqual([entity["text"] for entity in response.entities], ["food", "main st"])
+        prediction = await EntityPrediction.objects.select_related("ml_model").aget(sms_id=7)
+        self.assertEqual((prediction.ml_model.name, prediction.ml_model.version), (ML_MODEL.value, "0.0.0-test"))
+
+    @override_settings(ML_MICROBATCH_ENABLED=True)
+    async def test_apredict_awaits_the_micro_batch_scheduler(self):
+        service = EntityPredictionService(PredictionRequest(text="need a shelter", id=8))
+        with mock.patch.object(MicroBatchScheduler, "ainfer", autospec=True, side_effect=MicroBatchScheduler.ainfer) as ainfer:
+            response = await service.apredict()
+
+        self.assertEqual(ainfer.call_args.args[1:], ("need a shelter",))
+        self.assertEqual([entity["text"] for entity in response.entities], ["shelter"])
+
+    @override_settings(ML_WRITE_BEHIND_ENABLED=True)
+    async def test_apersist_only_waits_for_the_queue_off_the_event_loop(self):
+        service = EntityPredictionService(PredictionRequest(text="shelter", id=9))
+        data = prediction_data(9)
+        write_behind = mock.Mock()
+        with mock.patch("nlp.services.predict.get_write_behind_queue", return_value=write_behind):
+            # Full without waiting, then room once waited for: the prediction is queued.
+            write_behind.put.side_effect = [False, True]
+            queued = await service._apersist(data)
+            self.assertEqual(write_behind.put.call_args_list, [mock.call(data, wait=False), mock.call(data)])
+            self.assertIsNone(queued.pk)
+            self.assertFalse(await EntityPrediction.objects.aexists())
+
+            # Refused both times (the `sync` policy): the prediction is written inline.
+            write_behind.put.side_effect = [False, False]
+            saved = await service._apersist(data)
+        self.assertTrue(await EntityPrediction.objects.filter(pk=saved.pk, sms_id=9).aexists())
+
+
+class InferenceProcessPoolTests(RulerModelMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.pool = get_process_pool(ML_MODEL, processes=2, max_tasks_per_child=None, timeout_s=30)
+        self.addCleanup(self.pool.close)
+
+    def test_spans_come_back_in_input_order(self):
+        texts = ["shelter", "nothing here", "food near main st", "bed"]
+        spans = self.pool.entity_spans(texts)
+        self.assertEqual(
+            [[entity.text for entity in entities] for entities in spans],
+            [["shelter"], [], ["food", "main st"], ["bed"]],
+        )
+
+    def test_reloading_the_model_restarts_the_workers(self):
+        self.pool.start()
+        old_pool = self.pool._pool
+
+        model_registry.reload(ML_MODEL)
+
+        self.assertIsNot(self.pool._pool, old_pool)
+        self.assertEqual([entity.text for entity in self.pool.entity_spans(["shelter"])[0]], ["shelter"])
+
+    def test_a_forked_process_starts_its_own_workers(self):
+        # As under gunicorn --preload: the pool was started before the worker forked.
+        self.pool.start()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                # Tasks sent to an inherited pool are never picked up, so a hang fails the test.
+                signal.alarm(30)
+                inherited = self.pool.is_running()
+                spans = self.pool.entity_spans(["shelter"])
+                os._exit(0 if not inherited and spans[0][0].text == "shelter" else 1)
+            finally:
+                os._exit(2)
+
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        self.assertTrue(self.pool.is_running())
+
+    def test_a_killed_worker_fails_the_call_and_the_pool_is_rebuilt(self):
+        model_registry.get(ML_MODEL).add_pipe("kill_worker_on_crash")
+        pool = InferenceProcessPool(ML_MODEL, processes=1, max_tasks_per_child=None, timeout_s=2)
+        self.addCleanup(pool.close)
+        pool.start()
+        old_pool = pool._pool
+
+        # The worker dies mid-chunk and its task is never answered.
+        with self.assertRaises(InferenceError):
+            pool.entity_spans(["shelter", "crash"])
+
+        self.assertIsNot(pool._pool, old_pool)
+        self.assertEqual([entity.text for entity in pool.entity_spans(["shelter"])[0]], ["shelter"])
+
+
+def prediction_data(sms_id: int) -> EntityPredictionData:
+    return EntityPredictionData(
+        sms_id=sms_id,
+        elapsed_ms=3,
+        version="0.0.0-test",
+        ml_model_enum=ML_MODEL,
+        entities=[EntitySpan(label=EntityLabelEnum.RESOURCE.value, text="shelter", start=0, end=7)],
+    )
+
+
+class PredictionWriteBehindQueueTests(TransactionTestCase):
+    # The rows are written by the queue's own thread, so they must be committed to be seen.
+
+    def setUp(self):
+        # MLModel ids cached by an earlier test point at rows flushed since.
+        ml_model_cache.clear()
+
+    def write_behind_queue(self, **kwargs) -> PredictionWriteBehindQueue:
+        options = {
+            "max_size": 100,
+            "flush_size": 2,
+            "flush_interval_ms": 10,
+            "policy": BackpressurePolicyEnum.SYNC,
+            "drain_timeout_s": 10,
+            **kwargs,
+        }
+        return PredictionWriteBehindQueue(**options)
+
+    def test_queued_predictions_are_written_by_drain(self):
+        write_behind = self.write_behind_queue()
+        for sms_id in range(5):
+            self.assertTrue(write_behind.put(prediction_data(sms_id)))
+        write_behind.drain()
+
+        self.assertEqual(sorted(EntityPrediction.objects.values_list("sms_id", flat=True)), list(range(5)))
+        self.assertEqual(write_behind.stats()["flushed"], 5)
+        self.assertFalse(write_behind.put(prediction_data(5)))
+
+    def test_an_unexpected_flush_error_fails_only_its_batch(self):
+        bulk_save = EntityPersistenceService.bulk_save
+        calls = []
+
+        def fail_first_batch(batch):
+            calls.append(batch)
+            if len(calls) == 1:
+                raise RuntimeError("connection reset")
+            return bulk_save(batch)
+
+        write_behind = self.write_behind_queue(flush_size=1)
+        with mock.patch.object(EntityPersistenceService, "bulk_save", side_effect=fail_first_batch):
+            write_behind.put(prediction_data(1))
+            write_behind.put(prediction_data(2))
+            write_behind.drain()
+
+        self.assertEqual(write_behind.stats()["failed"], 1)
+        self.assertEqual(write_behind.stats()["flushed"], 1)
+        self.assertEqual(list(EntityPrediction.objects.values_list("sms_id", flat=True)), [2])
+
+    def test_a_full_queue_applies_the_backpressure_policy(self):
+        for policy, expected in ((BackpressurePolicyEnum.DROP, True), (BackpressurePolicyEnum.SYNC, False)):
+            with self.subTest(policy=policy):
+                write_behind = self.write_behind_queue(max_size=1, policy=policy)
+                # No flusher thread, so the queue stays full.
+                with mock.patch.object(write_behind, "_ensure_worker"):
+                    self.assertTrue(write_behind.put(prediction_data(1)))
+                    self.assertEqual(write_behind.put(prediction_data(2)), expected)
+                    self.assertFalse(write_behind.put(prediction_data(3), wait=False))
+                self.assertEqual(write_behind.stats()["dropped"], 1 if policy == BackpressurePolicyEnum.DROP else 0)
+
+
+class MLModelCacheTests(TestCase):
+
+    def setUp(self):
+        ml_model_cache.clear()
+        self.addCleanup(ml_model_cache.clear)
+
+    def test_a_resolved_model_is_saved_by_foreign_key_alone(self):
+        first = EntityPersistenceService(prediction_data(1)).save()
+        self.assertEqual(ml_model_cache.get(ML_MODEL, "0.0.0-test"), first.ml_model_id)
+
+        with self.assertNumQueries(1):
+            second = EntityPersistenceService(prediction_data(2)).save()
+        self.assertEqual(second.ml_model_id, first.ml_model_id)
+
+    def test_invalidate_drops_every_version_of_the_model(self):
+        ml_model_cache.set(ML_MODEL, "1.0.0", 1)
+        ml_model_cache.set(ML_MODEL, "1.1.0", 2)
+        ml_model_cache.invalidate(ML_MODEL)
+        self.assertIsNone(ml_model_cache.get(ML_MODEL, "1.0.0"))
+        self.assertIsNone(ml_model_cache.get(ML_MODEL, "1.1.0"))
+
+
+class RenameEnumNamesMigrationTests(TransactionTestCase):
+    before = [("nlp", "0008_entityprediction_ml_model")]
+    after = [("nlp", "0009_alter_mlmodel_name")]
+
+    def setUp(self):
+        apps = self.migrate(self.before)
+        self.addCleanup(self.migrate, None)
+        self.MLModel = apps.get_model("nlp", "MLModel")
+        self.EntityPrediction = apps.get_model("nlp", "EntityPrediction")
+
+    @staticmethod
+    def migrate(targets):
+        executor = MigrationExecutor(connection)
+        targets = targets or executor.loader.graph.leaf_nodes("nlp")
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def predict_with(self, ml_model) -> int:
+        return self.EntityPrediction.objects.create(
+            sms_id=1, ml_model=ml_model, extracted_entities=[], response_time_ms=1,
+        ).pk
+
+    def test_rows_are_renamed_to_the_value_or_merged_into_it(self):
+        current = self.MLModel.objects.create(name="en_streetninja", version="1.0")
+        merged = self.MLModel.objects.create(name="MLModelEnum.EN_STREETNINJA", version="1.0")
+        merged_prediction = self.predict_with(merged)
+
+        apps = self.migrate(self.after)
+
+        MLModel = apps.get_model("nlp", "MLModel")
+        EntityPrediction = apps.get_model("nlp", "EntityPrediction")
+        self.assertEqual(list(MLModel.objects.values_list("pk", "name", "version")), [(current.pk, "en_streetninja", "1.0")])
+        self.assertEqual(EntityPrediction.objects.get(pk=merged_prediction).ml_model_id, current.pk)
+
+    def test_an_old_version_is_renamed(self):
+        current = self.MLModel.objects.create(name="en_streetninja", version="1.0")
+        renamed = self.MLModel.objects.create(name="MLModelEnum.EN_STREETNINJA", version="0.9")
+
+        apps = self.migrate(self.after)
+
+        self.assertEqual(
+            sorted(apps.get_model("nlp", "MLModel").objects.values_list("pk", "name", "version")),
+            [(current.pk, "en_streetninja", "1.0"), (renamed.pk, "en_streetninja", "0.9")],
+        )
+
+    def test_an_unknown_member_fails_the_migration(self):
+        unknown = self.MLModel.objects.create(name="MLModelEnum.FR_STREETNINJA", version="1.0")
+
+        with self.assertRaisesMessage(ValueError, "MLModelEnum.FR_STREETNINJA"):
+            self.migrate(self.after)
+
+        self.assertTrue(self.MLModel.objects.filter(pk=unknown.pk, name="MLModelEnum.FR_STREETNINJA").exists())
+        # Lets the cleanup migrate forward again.
+        unknown.delete()
+
+
+class PredictionResultCacheTests(RulerModelMixin, TestCase):
+
+    def test_a_hit_maps_spans_onto_the_callers_text(self):
+        cache = PredictionResultCache(max_bytes=1024 * 1024, ttl_s=60)
+        first = NormalizedText.from_text("food near main st")
+        cache.set(ML_MODEL, "1", first, [EntitySpan(label="LOCATION", text="main st", start=10, end=17)])
+
+        second = NormalizedText.from_text("  FOOD   near Main  St ")
+        self.assertEqual(second.text, first.text)
+        [entity] = cache.get(ML_MODEL, "1", second)  # type: ignore[misc]
+        self.assertEqual((entity.text, entity.start, entity.end), ("Main  St", 14, 22))
+        self.assertIsNone(cache.get(ML_MODEL, "2", second))
+
+    def test_entries_expire_and_are_evicted_past_max_bytes(self):
+        cache = PredictionResultCache(max_bytes=1024 * 1024, ttl_s=0)
+        normalized = NormalizedText.from_text("shelter")
+        cache.set(ML_MODEL, "1", normalized, [])
+        self.assertIsNone(cache.get(ML_MODEL, "1", normalized))
+
+        cache = PredictionResultCache(max_bytes=500, ttl_s=60)
+        texts = [NormalizedText.from_text(text) for text in ("shelter", "food", "bed")]
+        for normalized in texts:
+            cache.set(ML_MODEL, "1", normalized, [])
+        self.assertIsNone(cache.get(ML_MODEL, "1", texts[0]))
+        self.assertEqual(cache.get(ML_MODEL, "1", texts[2]), [])
+        self.assertGreater(cache.stats()["evictions"], 0)
+
+    @override_settings(ML_RESULT_CACHE_ENABLED=True, ML_RESULT_CACHE_BACKEND="local")
+    def test_inference_skips_the_model_on_a_hit(self):
+        cache = PredictionResultCache(max_bytes=1024 * 1024, ttl_s=60)
+        infer_service = EntityInferenceService(ML_MODEL, backend="local")
+        with mock.patch("nlp.services.result_cache._result_cache", cache), \
+                mock.patch.object(infer_service, "_run_model", wraps=infer_service._run_model) as run_model:
+            infer_service.infer("need a shelter")
+            inferred = infer_service.infer("Need a SHELTER")
+
+        self.assertEqual(run_model.call_count, 1)
+        self.assertEqual([entity.text for entity in inferred.entities], ["SHELTER"])
+        self.assertEqual(cache.stats()["hits"], 1)
+
+
+class SharedPredictionResultCacheTests(TestCase):
+
+    def setUp(self):
+        self.addCleanup(caches["predictions"].clear)
+        self.normalized = NormalizedText.from_text("food near main st")
+        self.entities = [EntitySpan(label="LOCATION", text="main st", start=10, end=17)]
+
+    def test_workers_share_hits(self):
+        SharedPredictionResultCache("predictions", ttl_s=60).set(ML_MODEL, "1", self.normalized, self.entities)
+        other_worker = SharedPredictionResultCache("predictions", ttl_s=60)
+        self.assertEqual(other_worker.get(ML_MODEL, "1", self.normalized), self.entities)
+        self.assertIsNone(other_worker.get(ML_MODEL, "2", self.normalized))
+        self.assertEqual((other_worker.hits, other_worker.misses), (1, 1))
+
+    def test_backend_errors_count_as_misses(self):
+        cache = SharedPredictionResultCache("predictions", ttl_s=60)
+        backend = caches["predictions"]
+        with mock.patch.object(backend, "get", side_effect=ConnectionError), \
+                mock.patch.object(backend, "set", side_effect=ConnectionError), \
+                self.assertLogs("nlp.services.result_cache", "WARNING"):
+            cache.set(ML_MODEL, "1", self.normalized, self.entities)
+            self.assertIsNone(cache.get(ML_MODEL, "1", self.normalized))
+        self.assertEqual((cache.errors, cache.misses), (2, 1))
+
+    def test_clear_only_drops_prediction_entries(self):
+        caches["predictions"].set("unrelated", "kept")
+        cache = SharedPredictionResultCache("predictions", ttl_s=60)
+        other_worker = SharedPredictionResultCache("predictions", ttl_s=60, generation_refresh_s=0)
+        cache.set(ML_MODEL, "1", self.normalized, self.entities)
+        self.assertEqual(other_worker.get(ML_MODEL, "1", self.normalized), self.entities)
+
+        cache.clear()
+        self.assertIsNone(cache.get(ML_MODEL, "1", self.normalized))
+        self.assertIsNone(other_worker.get(ML_MODEL, "1", self.normalized))
+        self.assertEqual(caches["predictions"].get("unrelated"), "kept")
+
+        cache.set(ML_MODEL, "1", self.normalized, self.entities)
+        self.assertEqual(other_worker.get(ML_MODEL, "1", self.normalized), self.entities)
+
+
+class FastPathClassifierTests(RulerModelMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.fast_path = FastPathClassifier()
+
+    def spans(self, text: str) -> Optional[list[tuple[str, str, int, int]]]:
+        inferred = self.fast_path.classify(text, ML_MODEL)
+        if inferred is None:
+            return None
+        self.assertEqual(
+            (inferred.version, inferred.ml_model_enum, inferred.inference_path),
+            ("0.0.0-test", ML_MODEL, InferencePathEnum.FAST_PATH),
+        )
+        return [(entity.label, entity.text, entity.start, entity.end) for entity in inferred.entities]
+
+    def test_keywords_and_street_templates_are_answered(self):
+        self.assertEqual(self.spans("FOOD"), [("RESOURCE", "FOOD", 0, 4)])
+        self.assertEqual(self.spans("SHELTER!"), [("RESOURCE", "SHELTER", 0, 7)])
+        self.assertEqual(
+            self.spans("shelter 222 Main St"),
+            [("RESOURCE", "shelter", 0, 7), ("LOCATION", "222 Main St", 8, 19)],
+        )
+        for text, location in (
+                ("food near main and hastings", "main and hastings"),
+                ("wifi @ hastings st", "hastings st"),
+                ("bed at 100 block of e hastings st", "100 block of e hastings st"),
+                ("toilet near 4th ave and burrard", "4th ave and burrard"),
+        ):
+            with self.subTest(text=text):
+                self.assertEqual(self.spans(text)[1][1], location)  # type: ignore[index]
+
+    def test_anything_but_a_known_street_goes_to_the_model(self):
+        # Each of these was once answered by the fast path with a bogus LOCATION.
+        for text in (
+                "food at 5pm", "Shelter 4 women", "meals on wheels", "food in 10 minutes", "bed for 2",
+                "wifi at the library", "shelter on sunday", "help on the way", "food bank",
+        ):
+            with self.subTest(text=text):
+                self.assertIsNone(self.spans(text))
+        self.assertEqual(self.fast_path.stats()[InferencePathEnum.MODEL.value], 9)
+        self.assertEqual(self.fast_path.stats()[InferencePathEnum.FAST_PATH.value], 0)
+
+    def test_shadowing_counts_agreement_with_the_model(self):
+        inferred = self.fast_path.classify("shelter 222 Main St", ML_MODEL)
+        self.fast_path.shadow(inferred, lambda text: inferred)  # type: ignore[arg-type]
+        with self.assertLogs("nlp.services.fastpath", "WARNING"):
+            self.fast_path.shadow(inferred, lambda text: dataclasses.replace(inferred, entities=inferred.entities[:1]))  # type: ignore[arg-type]
+        self.assertEqual((self.fast_path.shadow_agreed, self.fast_path.shadow_disagreed), (1, 1))
+
+    @override_settings(ML_FAST_PATH_ENABLED=True, ML_WRITE_BEHIND_ENABLED=False, ML_MICROBATCH_ENABLED=False)
+    def test_predictions_record_their_path_under_the_model_version(self):
+        for sms_id, text in ((1, "FOOD"), (2, "is there food tonight")):
+            EntityPredictionService(PredictionRequest(text=text, id=sms_id)).predict()
+
+        predictions = EntityPrediction.objects.select_related("ml_model").order_by("sms_id")
+        self.assertEqual(
+            [(prediction.inference_path, prediction.ml_model.version) for prediction in predictions],
+            [(InferencePathEnum.FAST_PATH.value, "0.0.0-test"), (InferencePathEnum.MODEL.value, "0.0.0-test")],
+        )
+
+
+class BenchPredictCommandTests(RulerModelMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        self.corpus = self.directory / "corpus.jsonl"
+        self.corpus.write_text("\n".join(json.dumps({"text": text}) for text in ("need a shelter", "food near main st")))
+
+    def bench(self, **options) -> str:
+        stdout = io.StringIO()
+        # Resolving persists nothing, so no worker thread writes to the test's database.
+        call_command(
+            "bench_predict", corpus=self.corpus, endpoint="resolve", requests=4, warmup=0, stdout=stdout, **options,
+        )
+        return stdout.getvalue()
+
+    def test_runs_are_saved_and_compared(self):
+        output = self.directory / "run.json"
+        self.bench(persist=True, output=output)
+        results = json.loads(output.read_text())
+        self.assertEqual((results["sms"], results["calls"], results["errors"]), (4, 4, 0))
+        self.assertIn("resolve", results["stages_ms"])
+
+        self.assertIn(f"Compared with {output}", self.bench(persist=True, compare=output))
+
+    def test_a_regression_past_the_limit_fails(self):
+        baseline = self.directory / "baseline.json"
+        baseline.write_text(json.dumps({
+            "throughput_sms_per_s": 100.0,
+            "latency_ms": {"p50": 10.0},
+            "stages_ms": {"infer": {"mean": 1.0}},
+        }))
+        command = BenchPredictCommand(stdout=io.StringIO())
+
+        # Stage timings are reported but never fail a run.
+        command._compare(
+            {"throughput_sms_per_s": 95.0, "latency_ms": {"p50": 10.5}, "stages_ms": {"infer": {"mean": 9.0}}},
+            baseline,
+            10,
+        )
+        with self.assertRaisesMessage(CommandError, "throughput_sms_per_s -50.0%"):
+            command._compare({"throughput_sms_per_s": 50.0, "latency_ms": {"p50": 5.0}, "stages_ms": {}}, baseline, 10)
+        with self.assertRaisesMessage(CommandError, "latency_ms.p50 +20.0%"):
+            command._compare({"throughput_sms_per_s": 100.0, "latency_ms": {"p50": 12.0}, "stages_ms": {}}, baseline, 10)
+        with self.assertRaisesMessage(CommandError, "Could not read baseline"):
+            command._compare({"stages_ms": {}}, self.directory / "missing.json", 10)
+
+    def test_runs_use_a_test_database_unless_persisting(self):
+        with mock.patch.object(BenchPredictCommand, "_setup_test_database", return_value=["test databases"]) as setup, \
+                mock.patch("nlp.management.commands.bench_predict.teardown_databases") as teardown:
+            self.bench()
+            setup.assert_called_once_with()
+            teardown.assert_called_once_with(["test databases"], verbosity=0)
+
+            with mock.patch.object(BenchPredictCommand, "_run", side_effect=RuntimeError), self.assertRaises(RuntimeError):
+                self.bench()
+            self.assertEqual(teardown.call_count, 2)
+
+            self.bench(persist=True)
+            self.assertEqual((setup.call_count, teardown.call_count), (2, 2))
+
+
+class PredictionProfilerTests(RulerModelMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.profiler = self.make_profiler(Path(directory.name))
+        patcher = mock.patch("nlp.services.predict.get_prediction_profiler", return_value=self.profiler)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def make_profiler(directory: Path, **options) -> PredictionProfiler:
+        return PredictionProfiler(**{
+            "directory": directory, "enabled": False, "sample_rate": 0, "header_token": "profile-token", "max_files": 10,
+            **options,
+        })
+
+    def test_requests_are_sampled_or_picked_by_token(self):
+        factory = RequestFactory()
+        self.assertFalse(self.profiler.should_profile(factory.post("/")))
+        self.assertFalse(self.profiler.should_profile(factory.post("/", headers={"X-Profile": "wrong-token"})))
+        self.assertTrue(self.profiler.should_profile(factory.post("/", headers={"X-Profile": "profile-token"})))
+        self.assertFalse(self.make_profiler(self.profiler.directory, header_token="").should_profile(
+            factory.post("/", headers={"X-Profile": ""}),
+        ))
+        self.assertTrue(self.make_profiler(self.profiler.directory, enabled=True).should_profile(factory.post("/")))
+
+        sampled = self.make_profiler(self.profiler.directory, sample_rate=0.5)
+        with mock.patch("nlp.services.profiling.random.random", side_effect=[0.4, 0.6]):
+            self.assertEqual([sampled.should_profile(factory.post("/")) for _ in range(2)], [True, False])
+
+    def test_captures_are_saved_with_a_summary_and_rotated(self):
+        profiler = self.make_profiler(self.profiler.directory, max_files=2)
+        for _ in range(3):
+            self.assertEqual(profiler.run("predict", sum, [1, 2]), 3)
+
+        captures = profiler.captures()
+        self.assertEqual(len(captures), 2)
+        summaries = [path.with_suffix(".json") for path in captures]
+        self.assertEqual(sorted(self.profiler.directory.iterdir()), sorted([*captures, *summaries]))
+        summary = json.loads(captures[-1].with_suffix(".json").read_text())
+        self.assertEqual(summary["label"], "predict")
+        self.assertTrue(summary["top"])
+
+    def test_an_overlapping_request_is_not_captured(self):
+        captures = []
+        self.profiler.run("outer", lambda: captures.append(self.profiler.run("inner", lambda: "served")))
+        self.assertEqual(captures, ["served"])
+        [capture] = self.profiler.captures()
+        self.assertIn("_outer_", capture.name)
+
+    @override_settings(ML_MICROBATCH_ENABLED=True, ML_WRITE_BEHIND_ENABLED=False)
+    def test_profiled_inference_runs_on_the_profiled_thread(self):
+        with mock.patch("nlp.services.predict.EntityInferenceService", wraps=EntityInferenceService) as infer_service, \
+                mock.patch("nlp.services.predict.get_scheduler") as get_scheduler:
+            service = EntityPredictionService(PredictionRequest(text="need a shelter", id=1))
+            response = service.profiled(service.predict, "predict")
+            batch_service = BatchEntityPredictionService([{"text": "food near main st", "id": 2}])
+            batch_response = batch_service.profiled(batch_service.predict, "predict_batch")
+
+        # Neither the micro-batch scheduler's thread nor a pool worker, whatever ML_INFERENCE_BACKEND says.
+        get_scheduler.assert_not_called()
+        self.assertEqual([call.kwargs["backend"] for call in infer_service.call_args_list], ["local", "local"])
+        self.assertEqual([entity["text"] for entity in response.entities], ["shelter"])
+        [batch_item] = batch_response.results
+        self.assertEqual([entity["text"] for entity in batch_item.entities], ["food", "main st"])  # type: ignore[union-attr]
+        spacy_rows = [json.loads(path.with_suffix(".json").read_text())["spacy"] for path in self.profiler.captures()]
+        self.assertTrue(all(spacy_rows))
+
+    def test_the_profiles_command_lists_and_aggregates_captures(self):
+        self.profiler.run("predict", sum, [1, 2])
+        self.profiler.run("predict_batch", sum, [3, 4])
+
+        with mock.patch("nlp.management.commands.profiles.get_prediction_profiler", return_value=self.profiler):
+            stdout = io.StringIO()
+            call_command("profiles", "list", stdout=stdout)
+            labels = [line.split("label=")[1].split()[0] for line in stdout.getvalue().splitlines()]
+            self.assertEqual(labels, ["predict", "predict_batch"])
+
+            stdout = io.StringIO()
+            call_command("profiles", "aggregate", "--label", "predict_batch", "--json", stdout=stdout)
+            aggregate = json.loads(stdout.getvalue())
+            self.assertEqual(aggregate["profiles"], 1)
+            self.assertTrue(any("sum" in row["function"] for row in aggregate["functions"]))
+
+            with self.assertRaisesMessage(CommandError, "No profiles found"):
+                call_command("profiles", "list", "--label", "resolve")
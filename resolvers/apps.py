@@ -1,6 +1,29 @@
+import logging
 from django.apps import AppConfig
 
+logger = logging.getLogger(__name__)
+
 
 class ResolversConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "resolvers"
+
+    def ready(self):
+        from django.conf import settings
+        from pathlib import Path
+        from .location.spatial import spatial_index
+
+        resources_path = settings.SPATIAL_RESOURCES_PATH
+        spatial_index.configure(
+            path=Path(settings.SPATIAL_INDEX_PATH),
+            resources_path=Path(resources_path) if resources_path else None,
+        )
+        try:
+            # A fresh index is only stat()ed here; workers then map the same file.
+            spatial_index.build()
+        except OSError:
+            logger.error(
+                f"Could not write spatial index `{settings.SPATIAL_INDEX_PATH}`; "
+                "it will be compiled in memory on first use instead.",
+                exc_info=True,
+            )
@@ -4,4 +4,5 @@ from .enums import LanguageEnum
 
 @dataclass
 class ResolvedLanguage:
-    language: LanguageEnum
\ No newline at end of file
+    language: LanguageEnum
+    confidence: float = 1.0
@@ -0,0 +1,218 @@
+from collections import Counter
+import json
+import math
+from pathlib import Path
+import re
+import threading
+from typing import Iterator, Optional
+from .enums import LanguageEnum
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+PROFILES_PATH = DATA_DIR / "profiles.json"
+# One `<language code>.txt` per language, one sample message per line.
+CORPUS_DIR = DATA_DIR / "corpus"
+NGRAM_ORDERS = (1, 2, 3)
+DEFAULT_TOP_K = 300
+
+DEFAULT_LANGUAGE = LanguageEnum.ENGLISH
+# Shorter text is not scored: a street name or a single word like "detox" carries
+# too few n-grams to tell languages apart and is assumed to be DEFAULT_LANGUAGE.
+MIN_WORDS = 2
+MIN_LETTERS = 8
+# Log-likelihood margin, in nats, between the two best languages at which the
+# confidence reaches 1 - 1/e.
+MARGIN_SCALE = 20.0
+
+# Unicode blocks that identify a language on their own.
+_SCRIPT_RANGES: dict[LanguageEnum, tuple[tuple[int, int], ...]] = {
+    LanguageEnum.PUNJABI: ((0x0A00, 0x0A7F),),  # Gurmukhi
+    LanguageEnum.CHINESE: ((0x3400, 0x4DBF), (0x4E00, 0x9FFF), (0xF900, 0xFAFF)),  # Han
+}
+
+
+def _script_class(ranges: tuple[tuple[int, int], ...]) -> str:
+    return "".join(f"{chr(low)}-{chr(high)}" for low, high in ranges)
+
+
+_SCRIPT_PATTERN = re.compile(f"[{''.join(_script_class(ranges) for ranges in _SCRIPT_RANGES.values())}]")
+# Words for the script check: a Han character is a word of its own, a run of
+# Gurmukhi is one word, and so is any other run of letters.
+_SCRIPT_WORD_PATTERN = re.compile(
+    f"[{_script_class(_SCRIPT_RANGES[LanguageEnum.CHINESE])}]"
+    f"|[{_script_class(_SCRIPT_RANGES[LanguageEnum.PUNJABI])}]+"
+    r"|[^\W\d_]+"
+)
+_SCRIPT_MIN_SHARE = 0.5
+
+
+def fold_text(text: str) -> str:
+    """Lower-cases `text` and turns every run of non-letters into a single space."""
+    chars: list[str] = []
+    for char in text.lower():
+        if char.isalpha():
+            chars.append(char)
+        elif chars and chars[-1] != " ":
+            chars.append(" ")
+    return "".join(chars).strip()
+
+
+def char_ngrams(text: str, orders: tuple[int, ...] = NGRAM_ORDERS) -> Iterator[str]:
+    """Yields the character n-grams of the folded text, padded so word edges count."""
+    padded = f" {fold_text(text)} "
+    for n in orders:
+        for i in range(len(padded) - n + 1):
+            ngram = padded[i:i + n]
+            if ngram.strip():
+                yield ngram
+
+
+def load_corpus(directory: Path = CORPUS_DIR) -> dict[LanguageEnum, list[str]]:
+    """Reads the sample messages of every language that has a file in `directory`."""
+    samples = {}
+    for language in LanguageEnum:
+        path = directory / f"{language.value}.txt"
+        if path.is_file():
+            lines = path.read_text(encoding="utf-8").splitlines()
+            samples[language] = [line for line in lines if line.strip()]
+    return samples
+
+
+def build_profiles(samples: dict[LanguageEnum, list[str]], top_k: int = DEFAULT_TOP_K) -> dict:
+    """
+    Builds the profiles file contents from sample texts per language: the log
+    probability of each language's `top_k` most frequent n-grams, and one floor
+    for n-grams outside a profile.
+
+    The floor is shared and set by the largest sample, so a language with little
+    sample text (or another script) is not favoured for n-grams it has never seen.
+    """
+    languages = {}
+    largest_total = 0
+    for language, texts in samples.items():
+        counts = Counter(ngram for text in texts for ngram in char_ngrams(text))
+        total = sum(counts.values()) + len(counts)
+        largest_total = max(largest_total, total)
+        languages[language.value] = {
+            ngram: round(math.log((count + 1) / total), 3)
+            for ngram, count in counts.most_common(top_k)
+        }
+    return {
+        "orders": list(NGRAM_ORDERS),
+        "floor": round(math.log(1 / largest_total), 3),
+        "languages": languages,
+    }
+
+
+class LanguageIdentifier:
+    """
+    Dependency-free language identification for SMS.
+
+    Text whose words are mostly Gurmukhi or Han is identified by a Unicode
+    script check alone. Text with fewer than `min_words` words or `min_letters`
+    letters is assumed to be `default_language`, with zero confidence. Anything
+    else is scored with a naive Bayes model over character 1- to 3-grams, using
+    per-language profiles built from the bundled corpus (see the
+    `build_language_profiles` command). The profiles are merged into one table
+    of n-gram -> log probability per language, so each n-gram of a message
+    costs a single dict lookup.
+
+    Confidence comes from the log-likelihood margin between the best and the
+    second-best language rather than the posterior, which saturates near 1 on
+    a handful of n-grams.
+    """
+    def __init__(
+            self,
+            path: Path = PROFILES_PATH,
+            default_language: LanguageEnum = DEFAULT_LANGUAGE,
+            min_words: int = MIN_WORDS,
+            min_letters: int = MIN_LETTERS,
+            margin_scale: float = MARGIN_SCALE,
+    ):
+        self.path = path
+        self.default_language = default_language
+        self.min_words = min_words
+        self.min_letters = min_letters
+        self.margin_scale = margin_scale
+        self._languages: list[LanguageEnum] = []
+        self._floors: tuple[float, ...] = ()
+        self._table: Optional[dict[str, tuple[float, ...]]] = None
+        self._orders: tuple[int, ...] = NGRAM_ORDERS
+        self._lock = threading.Lock()
+
+    def identify(self, text: str) -> tuple[LanguageEnum, float]:
+        """Returns the most likely language of `text` and its confidence in [0, 1]."""
+        script_language = self._script_language(text)
+        if script_language is not None:
+            language = max(script_language, key=script_language.__getitem__)
+            return language, script_language[language]
+
+        if self._too_short(text):
+            return self.default_language, 0.0
+        scores = self._scores(text)
+        (best, language), (second, _) = sorted(zip(scores, self._languages), key=lambda pair: pair[0], reverse=True)[:2]
+        return language, 1 - math.exp(-(best - second) / self.margin_scale)
+
+    def probabilities(self, text: str) -> dict[LanguageEnum, float]:
+        """The posterior probability of each language, without the length check."""
+        script_language = self._script_language(text)
+        if script_language is not None:
+            return script_language
+
+        scores = self._scores(text)
+        best = max(scores)
+        weights = [math.exp(score - best) for score in scores]
+        total = sum(weights)
+        return {language: weight / total for language, weight in zip(self._languages, weights)}
+
+    def _too_short(self, text: str) -> bool:
+        words = fold_text(text).split()
+        return len(words) < self.min_words or sum(map(len, words)) < self.min_letters
+
+    def _scores(self, text: str) -> list[float]:
+        """The log likelihood of `text` under each language, in `self._languages` order."""
+        table = self._load()
+        rows = [table.get(ngram, self._floors) for ngram in char_ngrams(text, self._orders)]
+        if not rows:
+            return [0.0] * len(self._languages)
+        return [sum(column) for column in zip(*rows)]
+
+    def _script_language(self, text: str) -> Optional[dict[LanguageEnum, float]]:
+        """Identifies text where most words are written in a script only one language uses."""
+        if _SCRIPT_PATTERN.search(text) is None:
+            return None
+        words = _SCRIPT_WORD_PATTERN.findall(text)
+        script_counts = dict.fromkeys(_SCRIPT_RANGES, 0)
+        for word in words:
+            code_point = ord(word[0])
+            for language, ranges in _SCRIPT_RANGES.items():
+                if any(low <= code_point <= high for low, high in ranges):
+                    script_counts[language] += 1
+                    break
+        language = max(script_counts, key=script_counts.__getitem__)
+        share = script_counts[language] / len(words)
+        if share < _SCRIPT_MIN_SHARE:
+            return None
+        rest = (1 - share) / (len(LanguageEnum) - 1)
+        return {other: share if other == language else rest for other in LanguageEnum}
+
+    def _load(self) -> dict[str, tuple[float, ...]]:
+        if self._table is None:
+            with self._lock:
+                if self._table is None:
+                    self._build()
+        return self._table  # type: ignore[return-value]
+
+    def _build(self):
+        with open(self.path, encoding="utf-8") as f:
+            profiles = json.load(f)
+        languages = [LanguageEnum(value) for value in profiles["languages"]]
+        floors = [profiles["floor"]] * len(languages)
+        table: dict[str, list[float]] = {}
+        for i, language in enumerate(languages):
+            for ngram, log_probability in profiles["languages"][language.value].items():
+                table.setdefault(ngram, list(floors))[i] = log_probability
+        self._languages, self._floors, self._orders = languages, tuple(floors), tuple(profiles["orders"])
+        self._table = {ngram: tuple(row) for ngram, row in table.items()}
+
+
+language_identifier = LanguageIdentifier()
@@ -1,12 +1,21 @@
 from ..base_resolver import BaseResolver
 from .dataclasses import ResolvedLanguage
 from .enums import LanguageEnum
+from .identifier import language_identifier
 
 class LanguageResolver(BaseResolver):
+    """
+    Identifies the language of an SMS with the character n-gram identifier.
+    When no language reaches `min_confidence` (e.g. a bare number or a short
+    street name), English is assumed, with zero confidence unless English was
+    the identifier's own, uncertain, pick.
+    """
+    def __init__(self, msg: str, min_confidence: float = 0.5):
+        super().__init__(msg)
+        self.min_confidence = min_confidence
 
     def resolve(self) -> ResolvedLanguage:
-        """Currently only support for English language """
-        return ResolvedLanguage(
-            language=LanguageEnum.ENGLISH,
-        )    
-    
\ No newline at end of file
+        language, confidence = language_identifier.identify(self.msg)
+        if confidence < self.min_confidence and language != LanguageEnum.ENGLISH:
+            language, confidence = LanguageEnum.ENGLISH, 0.0
+        return ResolvedLanguage(language=language, confidence=confidence)
@@ -0,0 +1,33 @@
+"""
+Micro-benchmark for the location parser.
+
+    python -m resolvers.location.bench
+"""
+import itertools
+from common.utils.bench import measure_throughput
+from .resolver import LocationResolver
+
+SAMPLE_SPANS = [
+    "222 Main St",
+    "100 block of E Hastings",
+    "main & hastings",
+    "E Hastings St at Carrall",
+    "w 4th ave and burrard st",
+    "corner of granville and robson",
+    "#5-1234 Commercial Dr",
+    "Science World",
+    "hastngs and comercial",
+]
+
+
+def main(n: int = 50_000):
+    spans = list(itertools.islice(itertools.cycle(SAMPLE_SPANS), n))
+    result = measure_throughput(LocationResolver.resolve_span, spans)
+    print(
+        f"LocationResolver.resolve_span: {result['per_second']:,.0f} spans/s "
+        f"({result['mean_us']:.2f} us/span over {result['calls']:,} spans)"
+    )
+
+
+if __name__ == "__main__":
+    main()
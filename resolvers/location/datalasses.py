@@ -1,7 +1,53 @@
-from dataclasses import dataclass
-from .enums import LocationType
+from dataclasses import dataclass, field
+from typing import Optional
+from .enums import LocationType, StreetDirectionEnum, StreetSuffixEnum
+
+
+@dataclass
+class StreetComponents:
+    name: str
+    direction: Optional[StreetDirectionEnum] = None
+    suffix: Optional[StreetSuffixEnum] = None
+
+    @property
+    def normalized(self) -> str:
+        parts = [
+            self.direction.value if self.direction else None,
+            self.name,
+            self.suffix.value if self.suffix else None,
+        ]
+        return " ".join(part for part in parts if part)
+
+
+@dataclass
+class StreetCorrection:
+    original: str
+    corrected: str
+    distance: int
+
 
 @dataclass
 class ResolvedLocation:
     location_text: str
-    location_type: LocationType
\ No newline at end of file
+    location_type: LocationType
+    normalized: str = ""
+    number: Optional[int] = None
+    is_block: bool = False
+    streets: list[StreetComponents] = field(default_factory=list)
+    corrections: list[StreetCorrection] = field(default_factory=list)
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+
+
+@dataclass(frozen=True)
+class GazetteerEntry:
+    name: str
+    location_type: LocationType
+
+
+@dataclass
+class GazetteerMatch:
+    entry: GazetteerEntry
+    text: str
+    start: int
+    end: int
@@ -4,6 +4,7 @@ from common.enums import StreetNinjaEnum
 class LocationType(StreetNinjaEnum):
     ADDRESS = "address"
     INTERSECTION = "intersection"
+    STREET = "street"
     LANDMARK = "landmark"
     NEIGHBORHOOD = "neighborhood"
 
@@ -14,6 +15,11 @@ class RegexEnum(StreetNinjaEnum):
     def regex_string(cls) -> str:
         return "|".join(cls.values)
 
+    @property
+    def canonical(self) -> "RegexEnum":
+        """Collapses long/short spellings onto one member, e.g. NORTH_LONG -> NORTH."""
+        return type(self)[self.name.removesuffix("_LONG").removesuffix("_SHORT")]
+
 
 class StreetDirectionEnum(RegexEnum):
     NORTH = "n"
@@ -0,0 +1,207 @@
+from collections import deque
+import json
+import logging
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Generic, Iterator, Optional, TypeVar
+from .datalasses import GazetteerEntry, GazetteerMatch
+from .enums import LocationType
+
+logger = logging.getLogger(__name__)
+T = TypeVar("T")
+
+GAZETTEER_PATH = Path(__file__).resolve().parent / "data" / "gazetteer.json"
+
+
+def fold_text(text: str, symbols: str = "") -> tuple[str, list[int]]:
+    """
+    Lower-cases `text`, turns punctuation into spaces and collapses whitespace, so
+    "St. Paul's" and "st pauls" compare equal. Returns the folded text and, for
+    each folded character, its index in the original text.
+
+    Characters in `symbols` are kept as words of their own, so with "+" both
+    "55+" and "55 +" fold to "55 +" while "55" stays a different word.
+    """
+    chars: list[str] = []
+    offsets: list[int] = []
+    for i, char in enumerate(text):
+        if char == "'":
+            continue
+        if char.isalnum():
+            lowered = char.lower()
+            chars.append(lowered if len(lowered) == 1 else char)
+            offsets.append(i)
+        elif char in symbols:
+            if chars and chars[-1] != " ":
+                chars.append(" ")
+                offsets.append(i)
+            chars.extend((char, " "))
+            offsets.extend((i, i))
+        elif chars and chars[-1] != " ":
+            chars.append(" ")
+            offsets.append(i)
+    if chars and chars[-1] == " ":
+        chars.pop()
+        offsets.pop()
+    return "".join(chars), offsets
+
+
+class AhoCorasickAutomaton(Generic[T]):
+    """
+    Multi-pattern string matcher. Finds every occurrence of every pattern in a
+    single pass over the text, in time linear in the text length plus the number
+    of matches.
+    """
+    def __init__(self, patterns: dict[str, T]):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._output: list[list[tuple[int, T]]] = [[]]
+        for pattern, value in patterns.items():
+            if pattern:
+                self._add(pattern, value)
+        self._build_failure_links()
+
+    def iter_matches(self, text: str) -> Iterator[tuple[int, int, T]]:
+        """Yields (start, end, value) for every pattern occurrence in `text`."""
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, value in self._output[state]:
+                yield i + 1 - length, i + 1, value
+
+    def _add(self, pattern: str, value: T):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((len(pattern), value))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+
+class Gazetteer:
+    """
+    In-memory lookup of Vancouver landmarks and neighborhoods, loaded from a JSON
+    data file of `{"name", "type", "aliases", "ambiguous"}` records.
+
+    Every name and alias is compiled into one Aho-Corasick automaton, so a single
+    pass over a message finds all known place names. The file's mtime is checked
+    at most every `reload_interval_s`, and a changed file is recompiled and swapped
+    in without a restart. A file that fails to load leaves the previous automaton
+    in place.
+
+    Ambiguous names are everyday words ("kits", "sunset", "the library") that
+    only mean the place when the model tagged them as the whole LOCATION span.
+    They resolve through `lookup()` but are left out of the automaton, so
+    `find_all()` never matches them inside longer text.
+    """
+    def __init__(self, path: Path = GAZETTEER_PATH, reload_interval_s: float = 5.0):
+        self.path = path
+        self.reload_interval = reload_interval_s
+        self._automaton: Optional[AhoCorasickAutomaton[GazetteerEntry]] = None
+        self._aliases: dict[str, GazetteerEntry] = {}
+        self._mtime: Optional[float] = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def lookup(self, text: str) -> Optional[GazetteerEntry]:
+        """Returns the entry whose name or an alias is exactly `text`."""
+        self._maybe_reload()
+        return self._aliases.get(fold_text(text)[0])
+
+    def find_all(self, text: str) -> list[GazetteerMatch]:
+        """
+        Returns the known place names in `text` as whole-word, non-overlapping
+        matches, preferring the leftmost and then the longest.
+        """
+        automaton = self._maybe_reload()
+        if automaton is None:
+            return []
+        folded, offsets = fold_text(text)
+        candidates = sorted(
+            (
+                (start, end, entry)
+                for start, end, entry in automaton.iter_matches(folded)
+                if (start == 0 or folded[start - 1] == " ") and (end == len(folded) or folded[end] == " ")
+            ),
+            key=lambda match: (match[0], match[0] - match[1]),
+        )
+        matches: list[GazetteerMatch] = []
+        last_end = 0
+        for start, end, entry in candidates:
+            if start < last_end:
+                continue
+            original_start, original_end = offsets[start], offsets[end - 1] + 1
+            matches.append(GazetteerMatch(
+                entry=entry,
+                text=text[original_start:original_end],
+                start=original_start,
+                end=original_end,
+            ))
+            last_end = end
+        return matches
+
+    def reload(self):
+        """Recompiles the gazetteer from its data file."""
+        mtime = os.stat(self.path).st_mtime
+        try:
+            aliases, ambiguous = self._read_aliases()
+        finally:
+            # A broken file is not retried until it changes again.
+            self._mtime = mtime
+        self._aliases, self._automaton = {**aliases, **ambiguous}, AhoCorasickAutomaton(aliases)
+        logger.info(f"Loaded gazetteer `{self.path}` with {len(aliases)} names and {len(ambiguous)} ambiguous names")
+
+    def _maybe_reload(self) -> Optional[AhoCorasickAutomaton[GazetteerEntry]]:
+        now = time.monotonic()
+        if now < self._next_check:
+            return self._automaton
+        with self._lock:
+            if now < self._next_check:
+                return self._automaton
+            self._next_check = now + self.reload_interval
+            try:
+                if os.stat(self.path).st_mtime != self._mtime:
+                    self.reload()
+            except (OSError, ValueError, KeyError, TypeError):
+                logger.error(f"Failed to load gazetteer `{self.path}`; keeping the previous version", exc_info=True)
+        return self._automaton
+
+    def _read_aliases(self) -> tuple[dict[str, GazetteerEntry], dict[str, GazetteerEntry]]:
+        """Returns the folded names safe to search for and the span-only ambiguous ones."""
+        with open(self.path, encoding="utf-8") as f:
+            records = json.load(f)
+        aliases: dict[str, GazetteerEntry] = {}
+        ambiguous: dict[str, GazetteerEntry] = {}
+        for record in records:
+            entry = GazetteerEntry(name=record["name"], location_type=LocationType(record["type"]))
+            for alias in record.get("ambiguous", []):
+                ambiguous[fold_text(alias)[0]] = entry
+            for alias in [record["name"], *record.get("aliases", [])]:
+                folded = fold_text(alias)[0]
+                if folded not in ambiguous:
+                    aliases[folded] = entry
+        return aliases, ambiguous
+
+
+gazetteer = Gazetteer()
@@ -0,0 +1,138 @@
+import re
+from typing import Optional
+from .datalasses import ResolvedLocation, StreetComponents, StreetCorrection
+from .enums import LocationType, StreetDirectionEnum, StreetSuffixEnum
+from .streets import StreetNameIndex
+
+# Every pattern is compiled once, at import time, from the street enums.
+_DIRECTION = rf"(?:{StreetDirectionEnum.regex_string()})"
+_SUFFIX = rf"(?:{StreetSuffixEnum.regex_string()})"
+_WORD = r"(?:\d+(?:st|nd|rd|th)|[a-z][a-z'-]*)"
+
+
+def _street(prefix: str, suffix_required: bool = False) -> str:
+    suffix = rf"\s+(?P<{prefix}suffix>{_SUFFIX})"
+    return (
+        rf"(?:(?P<{prefix}dir>{_DIRECTION})\s+)?"
+        rf"(?P<{prefix}name>{_WORD}(?:\s+{_WORD})*?)"
+        rf"{suffix if suffix_required else f'(?:{suffix})?'}"
+        rf"(?:\s+(?P<{prefix}postdir>{_DIRECTION}))?"
+    )
+
+
+BLOCK_PATTERN = re.compile(
+    rf"^(?:the\s+)?(?P<number>\d{{1,5}})\s+(?:block|blk)(?:\s+of)?\s+{_street('a_')}$"
+)
+ADDRESS_PATTERN = re.compile(
+    rf"^(?:(?:#|unit\s*)?\w{{1,5}}\s*-\s*)?(?P<number>\d{{1,6}})[a-z]?\s+{_street('a_')}$"
+)
+INTERSECTION_PATTERN = re.compile(
+    rf"^(?:(?:the\s+)?corner\s+of\s+)?{_street('a_')}"
+    rf"\s*(?:&|@|\+|/|\band\b|\bat\b|\bx\b)\s*"
+    rf"{_street('b_')}$"
+)
+# A bare street needs its suffix ("main st"); a lone word is more likely a landmark.
+STREET_PATTERN = re.compile(rf"^{_street('a_', suffix_required=True)}$")
+# Leading words the model often keeps in the span: "near main and hastings".
+_PREPOSITION_PATTERN = re.compile(
+    r"^(?:(?:near|at|by|on|in|around|outside|behind|across from|close to|next to|off)\s+)+"
+)
+_CLEANUP_PATTERN = re.compile(r"[.,;!?()\"]+")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_location_text(text: str) -> str:
+    text = _CLEANUP_PATTERN.sub(" ", text.lower())
+    return _WHITESPACE_PATTERN.sub(" ", text).strip()
+
+
+def parse_location(
+        text: str,
+        street_index: Optional[StreetNameIndex] = None,
+        max_edit_distance: Optional[int] = None,
+) -> Optional[ResolvedLocation]:
+    """
+    Parses a LOCATION span into an address, block, intersection or a bare street
+    with its suffix, after dropping leading prepositions ("near", "at", ...).
+    Returns None if the span matches none of them (e.g. a landmark name).
+
+    With a `street_index`, misspelled street names are replaced by their
+    canonical spelling and each change is recorded in `corrections`.
+    """
+    cleaned = _PREPOSITION_PATTERN.sub("", normalize_location_text(text))
+    corrections: list[StreetCorrection] = []
+
+    match = BLOCK_PATTERN.match(cleaned)
+    if match:
+        street = _street_components(match, "a_", street_index, max_edit_distance, corrections)
+        return ResolvedLocation(
+            location_text=text,
+            location_type=LocationType.ADDRESS,
+            normalized=f"{match['number']} block {street.normalized}",
+            number=int(match["number"]),
+            is_block=True,
+            streets=[street],
+            corrections=corrections,
+        )
+
+    match = ADDRESS_PATTERN.match(cleaned)
+    if match:
+        street = _street_components(match, "a_", street_index, max_edit_distance, corrections)
+        return ResolvedLocation(
+            location_text=text,
+            location_type=LocationType.ADDRESS,
+            normalized=f"{match['number']} {street.normalized}",
+            number=int(match["number"]),
+            streets=[street],
+            corrections=corrections,
+        )
+
+    match = INTERSECTION_PATTERN.match(cleaned)
+    if match:
+        streets = [
+            _street_components(match, "a_", street_index, max_edit_distance, corrections),
+            _street_components(match, "b_", street_index, max_edit_distance, corrections),
+        ]
+        return ResolvedLocation(
+            location_text=text,
+            location_type=LocationType.INTERSECTION,
+            normalized=" & ".join(street.normalized for street in streets),
+            streets=streets,
+            corrections=corrections,
+        )
+
+    match = STREET_PATTERN.match(cleaned)
+    if match:
+        street = _street_components(match, "a_", street_index, max_edit_distance, corrections)
+        return ResolvedLocation(
+            location_text=text,
+            location_type=LocationType.STREET,
+            normalized=street.normalized,
+            streets=[street],
+            corrections=corrections,
+        )
+
+    return None
+
+
+def _street_components(
+        match: re.Match,
+        prefix: str,
+        street_index: Optional[StreetNameIndex],
+        max_edit_distance: Optional[int],
+        corrections: list[StreetCorrection],
+) -> StreetComponents:
+    direction = match[f"{prefix}dir"] or match[f"{prefix}postdir"]
+    suffix = match[f"{prefix}suffix"]
+    name = match[f"{prefix}name"]
+    # Numbered avenues ("4th") are never misspellings of a named street.
+    if street_index is not None and not name[0].isdigit():
+        correction = street_index.correct(name, max_edit_distance)
+        if correction is not None and correction.distance > 0:
+            corrections.append(correction)
+            name = correction.corrected
+    return StreetComponents(
+        name=name,
+        direction=StreetDirectionEnum(direction).canonical if direction else None,  # type: ignore[arg-type]
+        suffix=StreetSuffixEnum(suffix).canonical if suffix else None,  # type: ignore[arg-type]
+    )
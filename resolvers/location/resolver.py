@@ -0,0 +1,77 @@
+from typing import Optional
+from nlp.dataclasses import EntitySpan
+from nlp.enums import EntityLabelEnum
+from ..base_resolver import BaseResolver
+from .datalasses import GazetteerEntry, ResolvedLocation
+from .gazetteer import gazetteer
+from .parser import parse_location
+from .spatial import spatial_index
+from .streets import DEFAULT_MAX_EDIT_DISTANCE, street_index
+
+
+class LocationResolver(BaseResolver):
+    """
+    Turns the LOCATION entity of an SMS into a ResolvedLocation with its
+    LocationType and normalized components.
+
+    Spans are parsed as an address, block or intersection first and otherwise
+    looked up in the landmark/neighborhood gazetteer. When the model found no
+    usable LOCATION entity, the rest of the message (text outside every entity
+    span) is scanned with the gazetteer.
+    Misspelled street names within `max_edit_distance` edits of a known street
+    are corrected, and the corrections are kept on the result. Coordinates are
+    filled in from the offline spatial index when the place is in its dataset.
+    """
+    def __init__(
+            self,
+            msg: str,
+            entities: Optional[list[EntitySpan]] = None,
+            max_edit_distance: int = DEFAULT_MAX_EDIT_DISTANCE,
+    ):
+        super().__init__(msg)
+        self.entities = entities or []
+        self.max_edit_distance = max_edit_distance
+
+    def resolve(self) -> Optional[ResolvedLocation]:
+        for span in self._location_spans():
+            resolved = self.resolve_span(span.text, self.max_edit_distance)
+            if resolved is not None:
+                return resolved
+        return self._resolve_from_gazetteer()
+
+    @classmethod
+    def resolve_span(cls, text: str, max_edit_distance: int = DEFAULT_MAX_EDIT_DISTANCE) -> Optional[ResolvedLocation]:
+        parsed = parse_location(text, street_index, max_edit_distance)
+        if parsed is not None:
+            return cls._with_coordinates(parsed)
+        entry = gazetteer.lookup(text)
+        if entry is None:
+            matches = gazetteer.find_all(text)
+            entry = matches[0].entry if matches else None
+        return cls._with_coordinates(cls._from_gazetteer_entry(text, entry)) if entry else None
+
+    def _resolve_from_gazetteer(self) -> Optional[ResolvedLocation]:
+        for match in gazetteer.find_all(self.msg):
+            # Text the model tagged as something else ("hygiene kits" as a RESOURCE) is not a place.
+            if any(match.start < span.end and span.start < match.end for span in self.entities):
+                continue
+            return self._with_coordinates(self._from_gazetteer_entry(match.text, match.entry))
+        return None
+
+    @staticmethod
+    def _with_coordinates(location: ResolvedLocation) -> ResolvedLocation:
+        coordinates = spatial_index.locate(location)
+        if coordinates is not None:
+            location.lat, location.lon = coordinates
+        return location
+
+    @staticmethod
+    def _from_gazetteer_entry(text: str, entry: GazetteerEntry) -> ResolvedLocation:
+        return ResolvedLocation(
+            location_text=text,
+            location_type=entry.location_type,
+            normalized=entry.name,
+        )
+
+    def _location_spans(self) -> list[EntitySpan]:
+        return [span for span in self.entities if span.label == EntityLabelEnum.LOCATION.value]
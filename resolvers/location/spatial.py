@@ -0,0 +1,352 @@
+import csv
+import heapq
+import logging
+import math
+import mmap
+import os
+from pathlib import Path
+import struct
+import tempfile
+import threading
+from typing import Iterator, Optional
+from ..resource.dataclasses import NearbyResource
+from ..resource.enums import ResourceEnum
+from .datalasses import ResolvedLocation
+from .enums import LocationType
+from .gazetteer import fold_text
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+PLACES_PATH = DATA_DIR / "places.csv"
+
+_MAGIC = b"NBSP"
+_FORMAT_VERSION = 2
+# magic, version, cell size, min lat, min lon, rows, cols, place count, point count,
+# then the byte offsets of the place table, point table, cell table and string blob,
+# and the offset and length in the blob of the resources CSV path it was built from.
+_HEADER = struct.Struct("<4sIdddIIIIIIIIIH")
+# key offset, key length, lat, lon
+_PLACE = struct.Struct("<IHdd")
+# resource offset, resource length, name offset, name length, lat, lon
+_POINT = struct.Struct("<IHIHdd")
+_CELL = struct.Struct("<I")
+
+_EARTH_RADIUS_M = 6_371_000.0
+_METERS_PER_DEGREE = math.pi * _EARTH_RADIUS_M / 180
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (
+        math.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    )
+    return 2 * _EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def place_key(location_type: LocationType, name: str) -> str:
+    """Builds the place table key; intersections are keyed on their sorted street names."""
+    if location_type == LocationType.INTERSECTION:
+        name = " & ".join(sorted(part.strip() for part in name.split("&")))
+    return f"{location_type.value}:{fold_text(name)[0]}"
+
+
+class SpatialIndex:
+    """
+    Offline coordinates for resolved locations and k-nearest queries over
+    resource points, so "nearest shelter" needs no call to another service.
+
+    Built from two CSVs: the bundled `places.csv` (`kind,key,lat,lon` for
+    landmarks, neighborhoods, intersections and hundred blocks) and the
+    operator's `resources_path` (`resource,name,lat,lon`). No resource points
+    ship with the repo; without `resources_path`, `nearest()` finds nothing.
+    The CSVs are compiled into one binary file at `path` holding a sorted place
+    table and a uniform lat/lon grid of resource points, which is memory-mapped
+    read-only: worker startup does no parsing and every worker on a host shares
+    the same page-cache pages.
+
+    The file is written by `build()`, at startup or with `manage.py
+    build_spatial_index`, never while serving. If it is missing or stale when
+    first used, or no `path` is configured, the index is compiled into private
+    memory instead.
+    """
+    def __init__(
+            self,
+            path: Optional[Path] = None,
+            places_path: Path = PLACES_PATH,
+            resources_path: Optional[Path] = None,
+            cell_size_deg: float = 0.005,
+    ):
+        self.path = path
+        self.places_path = places_path
+        self.resources_path = resources_path
+        self.cell_size = cell_size_deg
+        self._buffer: Optional[mmap.mmap | bytes] = None
+        self._header: tuple = ()
+        self._lock = threading.Lock()
+
+    def configure(self, path: Optional[Path], resources_path: Optional[Path]):
+        """Points the index at new files; the next lookup maps or compiles them."""
+        with self._lock:
+            self.path = path
+            self.resources_path = resources_path
+            self._buffer = None
+            self._header = ()
+
+    def build(self, force: bool = False) -> bool:
+        """Compiles the index file if it is missing or stale. Returns whether it was written."""
+        if self.path is None or not (force or self.is_stale()):
+            return False
+        self.rebuild()
+        return True
+
+    def locate(self, location: ResolvedLocation) -> Optional[tuple[float, float]]:
+        """Returns the (lat, lon) of a resolved location, or None if it is not in the dataset."""
+        for key in self._location_keys(location):
+            coordinates = self.lookup(key)
+            if coordinates is not None:
+                return coordinates
+        return None
+
+    def lookup(self, key: str) -> Optional[tuple[float, float]]:
+        """Binary search of the place table for a key built with `place_key()`."""
+        buffer = self._load()
+        places_offset, strings_offset = self._header[9], self._header[12]
+        target = key.encode()
+        low, high = 0, self._header[7]
+        while low < high:
+            middle = (low + high) // 2
+            key_offset, key_length, lat, lon = _PLACE.unpack_from(buffer, places_offset + middle * _PLACE.size)
+            start = strings_offset + key_offset
+            candidate = buffer[start:start + key_length]
+            if candidate == target:
+                return lat, lon
+            if candidate < target:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def nearest(
+            self,
+            lat: float,
+            lon: float,
+            k: int = 5,
+            resource: Optional[ResourceEnum] = None,
+    ) -> list[NearbyResource]:
+        """
+        Returns up to `k` resource points closest to (lat, lon), nearest first,
+        optionally only those of one ResourceEnum.
+
+        Grid rings are searched outwards from the query's cell and the search stops
+        once no unvisited ring can hold a point closer than the current k-th best.
+        """
+        buffer = self._load()
+        _, _, cell_size, min_lat, min_lon, rows, cols, _, _, _, points_offset, cells_offset, strings_offset, *_ = self._header
+        if k <= 0 or not rows:
+            return []
+        wanted = resource.value.encode() if resource else None
+        row = math.floor((lat - min_lat) / cell_size)
+        col = math.floor((lon - min_lon) / cell_size)
+        # A grid step is narrowest east-west at the grid's highest latitude.
+        max_abs_lat = max(abs(min_lat), abs(min_lat + rows * cell_size))
+        step_m = cell_size * _METERS_PER_DEGREE * math.cos(math.radians(min(max_abs_lat, 89.0)))
+
+        best: list[tuple[float, int]] = []  # max-heap of (-distance, point index)
+        first_ring = max(0 - row, row - (rows - 1), 0 - col, col - (cols - 1), 0)
+        last_ring = max(row, rows - 1 - row, col, cols - 1 - col)
+        for ring in range(first_ring, last_ring + 1):
+            if len(best) == k and (ring - 1) * step_m > -best[0][0]:
+                break
+            for cell in self._ring_cells(row, col, ring, rows, cols):
+                start, end = (
+                    _CELL.unpack_from(buffer, cells_offset + cell * _CELL.size)[0],
+                    _CELL.unpack_from(buffer, cells_offset + (cell + 1) * _CELL.size)[0],
+                )
+                for i in range(start, end):
+                    resource_offset, resource_length, _, _, point_lat, point_lon = _POINT.unpack_from(
+                        buffer, points_offset + i * _POINT.size,
+                    )
+                    if wanted is not None:
+                        value_start = strings_offset + resource_offset
+                        if buffer[value_start:value_start + resource_length] != wanted:
+                            continue
+                    distance = haversine_m(lat, lon, point_lat, point_lon)
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance, i))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, i))
+        return [self._nearby_resource(buffer, i, -distance) for distance, i in sorted(best, reverse=True)]
+
+    def rebuild(self):
+        """Compiles the CSVs into the binary index file, replacing it atomically."""
+        if self.path is None:
+            raise ValueError("SpatialIndex has no path to write to")
+        data = self._compile()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        logger.info(f"Compiled spatial index `{self.path}` ({len(data)} bytes)")
+
+    def _load(self) -> mmap.mmap | bytes:
+        if self._buffer is None:
+            with self._lock:
+                if self._buffer is None:
+                    self._buffer = self._open()
+                    self._header = _HEADER.unpack_from(self._buffer, 0)
+        return self._buffer
+
+    def _open(self) -> mmap.mmap | bytes:
+        if self.path is None:
+            return self._compile()
+        if self.is_stale():
+            logger.warning(f"Spatial index `{self.path}` is missing or stale; compiling it in memory")
+            return self._compile()
+        try:
+            with open(self.path, "rb") as f:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except OSError:
+            logger.error(f"Failed to map spatial index `{self.path}`; compiling it in memory", exc_info=True)
+            return self._compile()
+
+    def is_stale(self) -> bool:
+        """True if the index file is missing, of an older format, or older than a source CSV."""
+        if self.path is None:
+            return True
+        try:
+            index_mtime = os.stat(self.path).st_mtime
+            with open(self.path, "rb") as f:
+                header = f.read(_HEADER.size)
+        except FileNotFoundError:
+            return True
+        if len(header) < _HEADER.size or _HEADER.unpack(header)[:2] != (_MAGIC, _FORMAT_VERSION):
+            return True
+        *_, strings_offset, source_offset, source_length = _HEADER.unpack(header)
+        with open(self.path, "rb") as f:
+            f.seek(strings_offset + source_offset)
+            if f.read(source_length).decode() != self._resources_source():
+                return True
+        sources = [self.places_path] + ([self.resources_path] if self.resources_path else [])
+        return any(os.stat(source).st_mtime > index_mtime for source in sources)
+
+    def _resources_source(self) -> str:
+        return str(self.resources_path.resolve()) if self.resources_path else ""
+
+    def _compile(self) -> bytes:
+        strings = bytearray()
+        string_offsets: dict[str, tuple[int, int]] = {}
+
+        def intern(value: str) -> tuple[int, int]:
+            if value not in string_offsets:
+                encoded = value.encode()
+                string_offsets[value] = (len(strings), len(encoded))
+                strings.extend(encoded)
+            return string_offsets[value]
+
+        places: dict[str, tuple[float, float]] = {}
+        with open(self.places_path, newline="", encoding="utf-8") as f:
+            for record in csv.DictReader(f):
+                places[place_key(LocationType(record["kind"]), record["key"])] = (float(record["lat"]), float(record["lon"]))
+        place_table = bytearray()
+        for key in sorted(places, key=str.encode):
+            place_table.extend(_PLACE.pack(*intern(key), *places[key]))
+
+        points = []
+        if self.resources_path is not None:
+            with open(self.resources_path, newline="", encoding="utf-8") as f:
+                points = [
+                    (ResourceEnum(record["resource"]).value, record["name"], float(record["lat"]), float(record["lon"]))
+                    for record in csv.DictReader(f)
+                ]
+        if points:
+            min_lat = min(point[2] for point in points)
+            min_lon = min(point[3] for point in points)
+            rows = math.floor((max(point[2] for point in points) - min_lat) / self.cell_size) + 1
+            cols = math.floor((max(point[3] for point in points) - min_lon) / self.cell_size) + 1
+        else:
+            min_lat = min_lon = 0.0
+            rows = cols = 0
+
+        def cell_of(point: tuple[str, str, float, float]) -> int:
+            row = min(math.floor((point[2] - min_lat) / self.cell_size), rows - 1)
+            col = min(math.floor((point[3] - min_lon) / self.cell_size), cols - 1)
+            return row * cols + col
+
+        points.sort(key=cell_of)
+        point_table = bytearray()
+        cell_starts = [0] * (rows * cols + 1)
+        for point in points:
+            cell_starts[cell_of(point) + 1] += 1
+            point_table.extend(_POINT.pack(*intern(point[0]), *intern(point[1]), point[2], point[3]))
+        for cell in range(rows * cols):
+            cell_starts[cell + 1] += cell_starts[cell]
+        cell_table = b"".join(_CELL.pack(start) for start in cell_starts)
+
+        places_offset = _HEADER.size
+        points_offset = places_offset + len(place_table)
+        cells_offset = points_offset + len(point_table)
+        strings_offset = cells_offset + len(cell_table)
+        header = _HEADER.pack(
+            _MAGIC, _FORMAT_VERSION, self.cell_size, min_lat, min_lon, rows, cols, len(places), len(points),
+            places_offset, points_offset, cells_offset, strings_offset, *intern(self._resources_source()),
+        )
+        return header + bytes(place_table) + bytes(point_table) + cell_table + bytes(strings)
+
+    def _nearby_resource(self, buffer: mmap.mmap | bytes, i: int, distance: float) -> NearbyResource:
+        points_offset, strings_offset = self._header[10], self._header[12]
+        resource_offset, resource_length, name_offset, name_length, lat, lon = _POINT.unpack_from(
+            buffer, points_offset + i * _POINT.size,
+        )
+        return NearbyResource(
+            resource=ResourceEnum(self._string(buffer, strings_offset + resource_offset, resource_length)),
+            name=self._string(buffer, strings_offset + name_offset, name_length),
+            lat=lat,
+            lon=lon,
+            distance_m=distance,
+        )
+
+    @staticmethod
+    def _string(buffer: mmap.mmap | bytes, start: int, length: int) -> str:
+        return bytes(buffer[start:start + length]).decode()
+
+    @staticmethod
+    def _ring_cells(row: int, col: int, ring: int, rows: int, cols: int) -> Iterator[int]:
+        """Yields the in-grid cells whose Chebyshev distance from (row, col) is exactly `ring`."""
+        if ring == 0:
+            if 0 <= row < rows and 0 <= col < cols:
+                yield row * cols + col
+            return
+        first_col, last_col = max(col - ring, 0), min(col + ring, cols - 1)
+        for edge_row in (row - ring, row + ring):
+            if 0 <= edge_row < rows:
+                for c in range(first_col, last_col + 1):
+                    yield edge_row * cols + c
+        for edge_col in (col - ring, col + ring):
+            if 0 <= edge_col < cols:
+                for r in range(max(row - ring + 1, 0), min(row + ring - 1, rows - 1) + 1):
+                    yield r * cols + edge_col
+
+    @staticmethod
+    def _location_keys(location: ResolvedLocation) -> list[str]:
+        if location.location_type in (LocationType.LANDMARK, LocationType.NEIGHBORHOOD):
+            return [place_key(location.location_type, location.normalized)]
+        if location.location_type == LocationType.INTERSECTION:
+            return [place_key(LocationType.INTERSECTION, " & ".join(street.name for street in location.streets))]
+        if location.number is None or not location.streets:
+            return []
+        street = location.streets[0]
+        block = location.number // 100 * 100
+        keys = [place_key(LocationType.ADDRESS, f"{block} block {street.name}")]
+        if street.direction is not None:
+            keys.insert(0, place_key(LocationType.ADDRESS, f"{block} block {street.direction.value} {street.name}"))
+        return keys
+
+
+spatial_index = SpatialIndex()
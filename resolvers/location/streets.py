@@ -0,0 +1,135 @@
+import logging
+from pathlib import Path
+import threading
+from typing import Iterator, Optional
+from .datalasses import StreetCorrection
+
+logger = logging.getLogger(__name__)
+
+STREETS_PATH = Path(__file__).resolve().parent / "data" / "streets.txt"
+DEFAULT_MAX_EDIT_DISTANCE = 2
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Optimal string alignment distance between `a` and `b`: insertions, deletions,
+    substitutions and adjacent transpositions each cost 1. Gives up early and
+    returns `max_distance + 1` once the distance is known to exceed `max_distance`.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous_previous: list[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+def _deletes(word: str, max_distance: int) -> Iterator[str]:
+    """Yields `word` and every string reachable from it by up to `max_distance` deletions."""
+    seen = {word}
+    frontier = [word]
+    yield word
+    for _ in range(max_distance):
+        next_frontier = []
+        for variant in frontier:
+            for i in range(len(variant)):
+                deleted = variant[:i] + variant[i + 1:]
+                if deleted not in seen:
+                    seen.add(deleted)
+                    next_frontier.append(deleted)
+                    yield deleted
+        frontier = next_frontier
+
+
+class StreetNameIndex:
+    """
+    Spelling correction for street names, built once from a plain-text list of
+    canonical names (one per line, `#` starts a comment).
+
+    Uses a SymSpell-style deletion dictionary: every name is indexed under each
+    string reachable from it by up to `max_distance` deletions. A misspelling is
+    corrected by generating its own deletions and looking them up, so only a
+    handful of candidates are ever compared instead of the whole street list.
+
+    Short names are easy to mistake for one another ("oak" and "ash" are two
+    edits apart), so the allowed distance shrinks with the length of the input.
+    """
+    def __init__(self, path: Path = STREETS_PATH, max_distance: int = DEFAULT_MAX_EDIT_DISTANCE):
+        self.path = path
+        self.max_distance = max_distance
+        self._names: Optional[frozenset[str]] = None
+        self._deletes: dict[str, list[str]] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, name: str) -> bool:
+        """True if `name` is exactly a canonical street name."""
+        return name in self._load()
+
+    def correct(self, name: str, max_distance: Optional[int] = None) -> Optional[StreetCorrection]:
+        """
+        Returns the closest canonical street to `name`, or None if there is none
+        within the allowed distance. An exact match is returned with distance 0.
+        `max_distance` can lower, but not raise, the distance the index was built for.
+        """
+        names = self._load()
+        if name in names:
+            return StreetCorrection(original=name, corrected=name, distance=0)
+        limit = self._allowed_distance(name, max_distance)
+        if limit == 0:
+            return None
+
+        candidates: set[str] = set()
+        for variant in _deletes(name, limit):
+            candidates.update(self._deletes.get(variant, ()))
+        best: Optional[tuple[int, int, str]] = None
+        for candidate in candidates:
+            distance = edit_distance(name, candidate, limit)
+            if distance > limit:
+                continue
+            rank = (distance, abs(len(candidate) - len(name)), candidate)
+            if best is None or rank < best:
+                best = rank
+        if best is None:
+            return None
+        return StreetCorrection(original=name, corrected=best[2], distance=best[0])
+
+    def reload(self):
+        """Rebuilds the index from the street list."""
+        with open(self.path, encoding="utf-8") as f:
+            names = frozenset(
+                line.strip().lower() for line in f
+                if line.strip() and not line.lstrip().startswith("#")
+            )
+        deletes: dict[str, list[str]] = {}
+        for name in names:
+            for variant in _deletes(name, self.max_distance):
+                deletes.setdefault(variant, []).append(name)
+        self._names, self._deletes = names, deletes
+        logger.info(f"Loaded street index `{self.path}` with {len(names)} names and {len(deletes)} deletions")
+
+    def _load(self) -> frozenset[str]:
+        if self._names is None:
+            with self._lock:
+                if self._names is None:
+                    self.reload()
+        return self._names  # type: ignore[return-value]
+
+    def _allowed_distance(self, name: str, max_distance: Optional[int]) -> int:
+        limit = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        if len(name) <= 3:
+            return 0
+        if len(name) <= 5:
+            return min(limit, 1)
+        return limit
+
+
+street_index = StreetNameIndex()
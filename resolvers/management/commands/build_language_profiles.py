@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+import json
+from pathlib import Path
+from resolvers.language.identifier import (
+    CORPUS_DIR,
+    DEFAULT_TOP_K,
+    PROFILES_PATH,
+    build_profiles,
+    load_corpus,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the language identifier's n-gram profiles from the sample messages in "
+        "resolvers/language/data/corpus/<language code>.txt. Run after editing the corpus "
+        "and commit the regenerated profiles.json."
+    )
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument("--corpus", type=Path, default=CORPUS_DIR, help="Directory of <language code>.txt files.")
+        parser.add_argument("--output", type=Path, default=PROFILES_PATH, help="Profiles file to write.")
+        parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K, help="N-grams kept per language.")
+
+    def handle(self, *args, **options):
+        samples = load_corpus(options["corpus"])
+        if not samples:
+            raise CommandError(f"No corpus files found in `{options['corpus']}`")
+        profiles = build_profiles(samples, top_k=options["top_k"])
+        with open(options["output"], "w", encoding="utf-8") as f:
+            json.dump(profiles, f, ensure_ascii=False, separators=(",", ":"))
+            f.write("\n")
+        counts = ", ".join(f"{language.value}={len(texts)}" for language, texts in samples.items())
+        self.stdout.write(f"Wrote {options['output']} from {counts} sample messages")
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandParser
+from resolvers.location.spatial import spatial_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Compiles places.csv and SPATIAL_RESOURCES_PATH into the spatial index at "
+        "SPATIAL_INDEX_PATH, e.g. as a deploy step. Startup only rebuilds a stale index."
+    )
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument("--force", action="store_true", help="Rebuild even if the index is up to date.")
+
+    def handle(self, *args, **options):
+        if spatial_index.build(force=options["force"]):
+            self.stdout.write(f"Wrote spatial index {spatial_index.path}")
+        else:
+            self.stdout.write(f"Spatial index {spatial_index.path} is up to date")
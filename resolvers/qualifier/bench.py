@@ -0,0 +1,41 @@
+"""
+Micro-benchmark for the qualifier resolver.
+
+    python -m resolvers.qualifier.bench
+"""
+import itertools
+from common.utils.bench import measure_throughput
+from nlp.dataclasses import EntitySpan
+from nlp.enums import EntityLabelEnum
+from .resolver import QualifierResolver
+
+SAMPLE_MESSAGES = [
+    "women only shelter near main and hastings",
+    "need a bed tonight, I have my dog",
+    "shelter no dogs",
+    "food bank open now",
+    "wheelchair accessible washroom downtown",
+    "somewhere to sleep with my kids, pets not allowed is fine",
+    "free meal for seniors",
+    "youth shelter",
+    "FOOD",
+]
+
+
+def resolve(msg: str):
+    # As if the model tagged the whole message, so every qualifier in it is resolved.
+    span = EntitySpan(label=EntityLabelEnum.QUALIFIER.value, text=msg, start=0, end=len(msg))
+    return QualifierResolver(msg, [span]).resolve()
+
+
+def main(n: int = 50_000):
+    messages = list(itertools.islice(itertools.cycle(SAMPLE_MESSAGES), n))
+    result = measure_throughput(resolve, messages)
+    print(
+        f"QualifierResolver.resolve: {result['per_second']:,.0f} messages/s "
+        f"({result['mean_us']:.2f} us/message over {result['calls']:,} messages)"
+    )
+
+
+if __name__ == "__main__":
+    main()
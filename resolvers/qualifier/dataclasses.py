@@ -5,3 +5,19 @@ from .enums import ParamKeyEnum, ParamValueEnum
 @dataclass
 class ParamDict:
     params: dict[ParamKeyEnum, ParamValueEnum]
+
+
+@dataclass(frozen=True)
+class QualifierEntry:
+    key: ParamKeyEnum
+    value: ParamValueEnum
+
+
+@dataclass
+class QualifierMatch:
+    key: ParamKeyEnum
+    value: ParamValueEnum
+    text: str
+    start: int
+    end: int
+    negated: bool
@@ -10,6 +10,13 @@ class ParamKeyEnum(ParamEnum):
     """
     Defines the keys used in the resource filter query's kwargs dict
     """
+    GENDER = "gender"
+    AGE_GROUP = "age_group"
+    PETS_ALLOWED = "pets_allowed"
+    WHEELCHAIR_ACCESSIBLE = "wheelchair_accessible"
+    OPEN_NOW = "open_now"
+    FAMILIES_ALLOWED = "families_allowed"
+    FREE = "free"
 
 class ParamValueEnum(ParamEnum):
     """Defines the possible values for filtering parameters."""
@@ -18,4 +25,26 @@ class ParamValueEnum(ParamEnum):
 
 class BooleanParamValue(ParamValueEnum):
     TRUE = True
-    FALSE = False
\ No newline at end of file
+    FALSE = False
+
+
+class GenderParamValue(ParamValueEnum):
+    WOMEN = "women"
+    MEN = "men"
+
+
+class AgeGroupParamValue(ParamValueEnum):
+    YOUTH = "youth"
+    SENIOR = "senior"
+
+
+# The value enum each key takes; the qualifier table is validated against it.
+PARAM_VALUE_TYPES: dict[ParamKeyEnum, type[ParamValueEnum]] = {
+    ParamKeyEnum.GENDER: GenderParamValue,
+    ParamKeyEnum.AGE_GROUP: AgeGroupParamValue,
+    ParamKeyEnum.PETS_ALLOWED: BooleanParamValue,
+    ParamKeyEnum.WHEELCHAIR_ACCESSIBLE: BooleanParamValue,
+    ParamKeyEnum.OPEN_NOW: BooleanParamValue,
+    ParamKeyEnum.FAMILIES_ALLOWED: BooleanParamValue,
+    ParamKeyEnum.FREE: BooleanParamValue,
+}
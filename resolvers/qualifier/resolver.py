@@ -0,0 +1,39 @@
+from typing import Optional
+from nlp.dataclasses import EntitySpan
+from nlp.enums import EntityLabelEnum
+from ..base_resolver import BaseResolver
+from .dataclasses import ParamDict, QualifierMatch
+from .table import qualifier_table
+
+
+class QualifierResolver(BaseResolver):
+    """
+    Turns the qualifiers of an SMS ("women only", "no dogs", "open now") into
+    the ParamDict that filters the resource query.
+
+    The message is scanned once with the qualifier table, and only matches
+    overlapping a QUALIFIER entity found by the model count, so a house number
+    or a street name elsewhere in the message is never read as a qualifier.
+    Without QUALIFIER entities there are no params. A key mentioned twice keeps
+    its last value.
+    """
+    def __init__(self, msg: str, entities: Optional[list[EntitySpan]] = None):
+        super().__init__(msg)
+        self.entities = entities or []
+
+    def resolve(self) -> Optional[ParamDict]:
+        matches = self._matches()
+        if not matches:
+            return None
+        return ParamDict(params={match.key: match.value for match in matches})
+
+    def _matches(self) -> list[QualifierMatch]:
+        spans = [span for span in self.entities if span.label == EntityLabelEnum.QUALIFIER.value]
+        if not spans:
+            return []
+        # The whole message is scanned so a negation cue outside the span still applies.
+        matches = qualifier_table.find_all(self.msg)
+        return [
+            match for match in matches
+            if any(match.start < span.end and span.start < match.end for span in spans)
+        ]
@@ -0,0 +1,143 @@
+from enum import Enum
+import json
+import logging
+from pathlib import Path
+import threading
+from typing import Optional
+from ..location.gazetteer import AhoCorasickAutomaton, fold_text
+from .dataclasses import QualifierEntry, QualifierMatch
+from .enums import PARAM_VALUE_TYPES, BooleanParamValue, ParamKeyEnum, ParamValueEnum
+
+logger = logging.getLogger(__name__)
+
+QUALIFIERS_PATH = Path(__file__).resolve().parent / "data" / "qualifiers.json"
+# Kept through folding so "55+" is not matched by the house number in "55 main st".
+SYMBOLS = "+"
+
+
+class NegationCue(Enum):
+    PREFIX = "prefix"  # "no dogs", "without kids"
+    SUFFIX = "suffix"  # "dogs not allowed"
+
+
+def _param_value(key: ParamKeyEnum, raw: str) -> ParamValueEnum:
+    value_type = PARAM_VALUE_TYPES[key]
+    if value_type is BooleanParamValue:
+        if raw not in ("true", "false"):
+            raise ValueError(f"`{raw}` is not a boolean value for qualifier `{key.value}`")
+        return BooleanParamValue(raw == "true")
+    return value_type(raw)
+
+
+class QualifierTable:
+    """
+    Finds qualifiers ("women only", "pets ok", "open now") in an SMS and maps each
+    to a typed ParamKeyEnum -> ParamValueEnum pair.
+
+    Built once from a JSON data file of
+    `{"negation": {"prefix": [cues], "suffix": [cues]}, "qualifiers": {"<key>": {"<value>": [phrases]}}}`.
+    Every phrase and negation cue is compiled into one Aho-Corasick automaton, so
+    a single pass over the message finds them all.
+
+    A cue directly before a qualifier ("no dogs") or directly after it ("dogs not
+    allowed") negates it. A negated boolean qualifier takes the opposite value;
+    other negated qualifiers ("no men") say nothing about the wanted value and
+    are dropped.
+    """
+    def __init__(self, path: Path = QUALIFIERS_PATH):
+        self.path = path
+        self._automaton: Optional[AhoCorasickAutomaton[QualifierEntry | NegationCue]] = None
+        self._lock = threading.Lock()
+
+    def find_all(self, text: str) -> list[QualifierMatch]:
+        """
+        Returns the qualifiers in `text` as whole-word, non-overlapping matches,
+        preferring the leftmost and then the longest, in message order.
+        """
+        automaton = self._load()
+        folded, offsets = fold_text(text, SYMBOLS)
+        candidates = sorted(
+            (
+                (start, end, value)
+                for start, end, value in automaton.iter_matches(folded)
+                if (start == 0 or folded[start - 1] == " ") and (end == len(folded) or folded[end] == " ")
+            ),
+            key=lambda match: (match[0], match[0] - match[1]),
+        )
+        tokens: list[tuple[int, int, QualifierEntry | NegationCue]] = []
+        last_end = 0
+        for start, end, value in candidates:
+            if start < last_end:
+                continue
+            tokens.append((start, end, value))
+            last_end = end
+
+        matches: list[QualifierMatch] = []
+        for i, (start, end, entry) in enumerate(tokens):
+            if isinstance(entry, NegationCue):
+                continue
+            negated = (
+                self._is_adjacent_cue(tokens, i - 1, NegationCue.PREFIX, end=start)
+                or self._is_adjacent_cue(tokens, i + 1, NegationCue.SUFFIX, start=end)
+            )
+            value = entry.value
+            if negated:
+                if not isinstance(value, BooleanParamValue):
+                    continue
+                value = BooleanParamValue(not value.value)
+            original_start, original_end = offsets[start], offsets[end - 1] + 1
+            matches.append(QualifierMatch(
+                key=entry.key,
+                value=value,
+                text=text[original_start:original_end],
+                start=original_start,
+                end=original_end,
+                negated=negated,
+            ))
+        return matches
+
+    @staticmethod
+    def _is_adjacent_cue(
+            tokens: list[tuple[int, int, QualifierEntry | NegationCue]],
+            index: int,
+            cue: NegationCue,
+            start: Optional[int] = None,
+            end: Optional[int] = None,
+    ) -> bool:
+        """Whether `tokens[index]` is a `cue` separated from the qualifier by one space."""
+        if not 0 <= index < len(tokens):
+            return False
+        cue_start, cue_end, value = tokens[index]
+        if value is not cue:
+            return False
+        if end is not None:
+            return cue_end + 1 == end
+        return cue_start == start + 1  # type: ignore[operator]
+
+    def _load(self) -> AhoCorasickAutomaton[QualifierEntry | NegationCue]:
+        if self._automaton is None:
+            with self._lock:
+                if self._automaton is None:
+                    self._automaton = self._build()
+        return self._automaton
+
+    def _build(self) -> AhoCorasickAutomaton[QualifierEntry | NegationCue]:
+        with open(self.path, encoding="utf-8") as f:
+            records = json.load(f)
+        patterns: dict[str, QualifierEntry | NegationCue] = {}
+        for cue in NegationCue:
+            for phrase in records["negation"][cue.value]:
+                patterns[fold_text(phrase, SYMBOLS)[0]] = cue
+        qualifier_count = 0
+        for raw_key, values in records["qualifiers"].items():
+            key = ParamKeyEnum(raw_key)
+            for raw_value, phrases in values.items():
+                entry = QualifierEntry(key=key, value=_param_value(key, raw_value))
+                for phrase in phrases:
+                    patterns[fold_text(phrase, SYMBOLS)[0]] = entry
+                    qualifier_count += 1
+        logger.info(f"Loaded qualifier table `{self.path}` with {qualifier_count} phrases")
+        return AhoCorasickAutomaton(patterns)
+
+
+qualifier_table = QualifierTable()
@@ -1,7 +1,18 @@
 from dataclasses import dataclass
-from .enums import ResourceEnum
+from .enums import ResourceEnum, ResourceSourceEnum
 
 
 @dataclass
 class ResolvedResource:
-    resource: ResourceEnum
\ No newline at end of file
+    resource: ResourceEnum
+    source: ResourceSourceEnum
+    text: str
+
+
+@dataclass
+class NearbyResource:
+    resource: ResourceEnum
+    name: str
+    lat: float
+    lon: float
+    distance_m: float
@@ -7,4 +7,11 @@ class ResourceEnum(StreetNinjaEnum):
     WATER = "WATER"
     TOILET = "TOILET"
     WIFI = "WIFI"
-    HELP = "HELP"
\ No newline at end of file
+    HELP = "HELP"
+
+
+class ResourceSourceEnum(StreetNinjaEnum):
+    """How a ResolvedResource was found, from most to least confident."""
+    TABLE = "table"  # a RESOURCE entity whose whole text is in the synonym table
+    MODEL = "model"  # a RESOURCE entity containing a known phrase, found by the phrase matcher
+    MATCHER = "matcher"  # no usable RESOURCE entity; the phrase matcher found one in the message
@@ -0,0 +1,68 @@
+from spacy.tokens import Doc, Span
+from typing import Optional
+from nlp.dataclasses import EntitySpan
+from nlp.enums import EntityLabelEnum
+from ..base_resolver import BaseResolver
+from .dataclasses import ResolvedResource
+from .enums import ResourceEnum, ResourceSourceEnum
+from .synonyms import get_phrase_matcher, synonym_table
+
+
+class ResourceResolver(BaseResolver):
+    """
+    Turns the RESOURCE entity of an SMS ("somewhere to sleep", "bathroom") into
+    a ResolvedResource.
+
+    Each RESOURCE span is looked up whole in the synonym table first, then
+    searched for a known phrase with the PhraseMatcher. When neither resolves,
+    or the model found no RESOURCE entity, the matcher scans the whole message.
+    The result records which of these found it.
+
+    Given the Doc the entities were inferred from, the matcher runs over its
+    tokens instead of tokenizing the text again.
+    """
+    def __init__(self, msg: str, entities: Optional[list[EntitySpan]] = None, doc: Optional[Doc] = None):
+        super().__init__(msg)
+        self.entities = entities or []
+        # Offsets of the entities index into the Doc only if it was made from this message.
+        self.doc = doc if doc is not None and doc.text == msg else None
+
+    def resolve(self) -> Optional[ResolvedResource]:
+        spans = self._resource_spans()
+        for span in spans:
+            resource = synonym_table.lookup(span.text)
+            if resource is not None:
+                return ResolvedResource(resource=resource, source=ResourceSourceEnum.TABLE, text=span.text)
+        for span in spans:
+            resolved = self._match(self._tokens(span.text, span.start, span.end), ResourceSourceEnum.MODEL)
+            if resolved is not None:
+                return resolved
+        return self._match(self._tokens(self.msg, 0, len(self.msg)), ResourceSourceEnum.MATCHER)
+
+    def _tokens(self, text: str, start: int, end: int) -> Doc | Span:
+        """The inference Doc's tokens for `text` at [start, end), or `text` freshly tokenized."""
+        if self.doc is not None:
+            tokens = self.doc.char_span(start, end, alignment_mode="expand")
+            if tokens is not None:
+                return tokens
+        nlp, _ = get_phrase_matcher()
+        return nlp.make_doc(text)
+
+    @staticmethod
+    def _match(tokens: Doc | Span, source: ResourceSourceEnum) -> Optional[ResolvedResource]:
+        """Returns the leftmost, then longest, synonym in `tokens`."""
+        nlp, matcher = get_phrase_matcher()
+        matches = matcher(tokens)
+        if not matches:
+            return None
+        match_id, start, end = min(matches, key=lambda match: (match[1], match[1] - match[2]))
+        # Matches index into the Doc, also when `tokens` is a Span of it.
+        doc = tokens.doc if isinstance(tokens, Span) else tokens
+        return ResolvedResource(
+            resource=ResourceEnum(nlp.vocab.strings[match_id]),
+            source=source,
+            text=doc[start:end].text,
+        )
+
+    def _resource_spans(self) -> list[EntitySpan]:
+        return [span for span in self.entities if span.label == EntityLabelEnum.RESOURCE.value]
@@ -0,0 +1,110 @@
+import json
+import logging
+from pathlib import Path
+import re
+import threading
+from typing import Optional
+import spacy
+from spacy.language import Language
+from spacy.matcher import PhraseMatcher
+from .enums import ResourceEnum
+
+logger = logging.getLogger(__name__)
+
+SYNONYMS_PATH = Path(__file__).resolve().parent / "data" / "synonyms.json"
+
+_NON_WORD_PATTERN = re.compile(r"[^\w\s-]+")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+_DETERMINERS = frozenset({"a", "an", "the", "some", "any", "my"})
+
+
+def normalize_phrase(text: str) -> str:
+    text = _NON_WORD_PATTERN.sub(" ", text.lower())
+    return _WHITESPACE_PATTERN.sub(" ", text).strip()
+
+
+def fold_phrase(text: str) -> str:
+    """
+    Cheap stand-in for lemmatization, which the NER-only pipeline does not run:
+    drops leading determiners and a plural `s` from the last word, so
+    "some beds" and "bed" share a key.
+    """
+    words = normalize_phrase(text).split(" ")
+    while len(words) > 1 and words[0] in _DETERMINERS:
+        words.pop(0)
+    last = words[-1]
+    if len(last) > 3 and last.endswith("s") and not last.endswith("ss"):
+        words[-1] = last[:-1]
+    return " ".join(words)
+
+
+class SynonymTable:
+    """
+    Maps free-text resource phrasings ("somewhere to sleep", "washroom") to a
+    ResourceEnum with one dict lookup. Built once from a JSON data file of
+    `{"synonyms": {"<ResourceEnum value>": [phrases]}, "ambiguous": {...}}`;
+    every phrase is stored under both its normalized and its folded form.
+
+    Ambiguous phrases are generic words ("crash", "emergency", "library") that
+    only mean the resource when the model tagged them as the whole RESOURCE
+    span. They resolve through `lookup()`, which callers apply to RESOURCE
+    spans, but are left out of `phrases()` and so of the PhraseMatcher, which
+    searches inside spans and whole messages.
+    """
+    def __init__(self, path: Path = SYNONYMS_PATH):
+        self.path = path
+        self._phrases: Optional[dict[ResourceEnum, list[str]]] = None
+        self._table: dict[str, ResourceEnum] = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, text: str) -> Optional[ResourceEnum]:
+        self._load()
+        return self._table.get(normalize_phrase(text)) or self._table.get(fold_phrase(text))
+
+    def phrases(self) -> dict[ResourceEnum, list[str]]:
+        """The unambiguous phrases, safe to match anywhere in a message."""
+        return self._load()
+
+    def _load(self) -> dict[ResourceEnum, list[str]]:
+        if self._phrases is None:
+            with self._lock:
+                if self._phrases is None:
+                    self._build()
+        return self._phrases  # type: ignore[return-value]
+
+    def _build(self):
+        with open(self.path, encoding="utf-8") as f:
+            records = json.load(f)
+        phrases = {ResourceEnum(resource): values for resource, values in records["synonyms"].items()}
+        ambiguous = {ResourceEnum(resource): values for resource, values in records.get("ambiguous", {}).items()}
+        table: dict[str, ResourceEnum] = {}
+        for resource in ResourceEnum:
+            for phrase in [resource.value, *phrases.get(resource, []), *ambiguous.get(resource, [])]:
+                table.setdefault(normalize_phrase(phrase), resource)
+                table.setdefault(fold_phrase(phrase), resource)
+        self._table, self._phrases = table, phrases
+        logger.info(f"Loaded resource synonym table `{self.path}` with {len(table)} keys")
+
+
+synonym_table = SynonymTable()
+
+_phrase_matcher: Optional[tuple[Language, PhraseMatcher]] = None
+_phrase_matcher_lock = threading.Lock()
+
+
+def get_phrase_matcher() -> tuple[Language, PhraseMatcher]:
+    """
+    Returns the process-wide PhraseMatcher over every synonym, matching on the
+    LOWER attribute, with the blank tokenizer pipeline used to build its patterns.
+    Built on first use; the match ids are the ResourceEnum values.
+    """
+    global _phrase_matcher
+    if _phrase_matcher is None:
+        with _phrase_matcher_lock:
+            if _phrase_matcher is None:
+                nlp = spacy.blank("en")
+                matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
+                for resource, phrases in synonym_table.phrases().items():
+                    matcher.add(resource.value, list(nlp.tokenizer.pipe(phrases)))
+                _phrase_matcher = nlp, matcher
+    return _phrase_matcher
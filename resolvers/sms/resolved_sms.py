@@ -10,6 +10,6 @@ from ..qualifier.dataclasses import ParamDict
 class ResolvedSmsInquiry:
     msg: str
     language: ResolvedLanguage
-    resource: ResolvedResource
-    location: ResolvedLocation
+    resource: Optional[ResolvedResource] = field(default=None)
+    location: Optional[ResolvedLocation] = field(default=None)
     params: Optional[ParamDict] = field(default=None)
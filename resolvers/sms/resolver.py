@@ -1,6 +1,63 @@
+from spacy.tokens import Doc
+from typing import Callable, Optional, TypeVar
+from common.utils.tracing import record_span
+from nlp.dataclasses import EntitySpan
+from ..language.dataclasses import ResolvedLanguage
+from ..language.resolver import LanguageResolver
+from ..location.resolver import LocationResolver
+from ..location.streets import DEFAULT_MAX_EDIT_DISTANCE
+from ..qualifier.resolver import QualifierResolver
+from ..resource.resolver import ResourceResolver
 from .resolved_sms import ResolvedSmsInquiry
 
+T = TypeVar("T")
+
+
 class SmsResolver:
-    
+    """
+    Runs every resolver over one SMS and the entities inferred for it, so the
+    model runs once and each resolver reads the same spans instead of
+    re-tokenizing the message. When the model ran in this process, its Doc is
+    passed along too and the resource matcher reuses its tokens. Likewise a
+    language already detected while routing the SMS is used as is.
+
+    The time each stage took is kept in `timings_ms`, keyed by stage name.
+    """
+    def __init__(
+            self,
+            msg: str,
+            entities: Optional[list[EntitySpan]] = None,
+            max_edit_distance: int = DEFAULT_MAX_EDIT_DISTANCE,
+            doc: Optional[Doc] = None,
+            language: Optional[ResolvedLanguage] = None,
+    ):
+        self.msg = msg
+        self.entities = entities or []
+        self.max_edit_distance = max_edit_distance
+        self.doc = doc
+        self.language = language
+        self.timings_ms: dict[str, float] = {}
+
     def resolve_sms(self) -> ResolvedSmsInquiry:
-        ...
\ No newline at end of file
+        language = self.language
+        if language is None:
+            language = self._timed("language", LanguageResolver(self.msg).resolve)
+        resource = self._timed("resource", ResourceResolver(self.msg, self.entities, self.doc).resolve)
+        location = self._timed(
+            "location",
+            LocationResolver(self.msg, self.entities, max_edit_distance=self.max_edit_distance).resolve,
+        )
+        params = self._timed("qualifier", QualifierResolver(self.msg, self.entities).resolve)
+        return ResolvedSmsInquiry(
+            msg=self.msg,
+            language=language,
+            resource=resource,
+            location=location,
+            params=params,
+        )
+
+    def _timed(self, stage: str, fn: Callable[[], T]) -> T:
+        with record_span(f"resolve_{stage}") as span:
+            result = fn()
+        self.timings_ms[stage] = span.elapsed_ms
+        return result
@@ -1,3 +1,269 @@
-from django.test import TestCase
+from django.test import SimpleTestCase
+from nlp.dataclasses import EntitySpan
+from nlp.enums import EntityLabelEnum
+import json
+import os
+from pathlib import Path
+import tempfile
+from typing import Optional
+from .language.dataclasses import ResolvedLanguage
+from .language.enums import LanguageEnum
+from .language.identifier import PROFILES_PATH, build_profiles, language_identifier, load_corpus
+from .language.resolver import LanguageResolver
+from .location.datalasses import ResolvedLocation
+from .location.enums import LocationType, StreetDirectionEnum, StreetSuffixEnum
+from .location.gazetteer import Gazetteer, gazetteer
+from .location.parser import parse_location
+from .location.resolver import LocationResolver
+from .location.spatial import SpatialIndex, haversine_m, place_key
+from .location.streets import street_index
+from .qualifier.enums import AgeGroupParamValue, BooleanParamValue, GenderParamValue, ParamKeyEnum
+from .qualifier.resolver import QualifierResolver
+from .qualifier.table import qualifier_table
+from .resource.enums import ResourceEnum, ResourceSourceEnum
+from .resource.resolver import ResourceResolver
 
-# Create your tests here.
+RESOURCES_PATH = Path(__file__).resolve().parent / "fixtures" / "resources.csv"
+
+
+class ParseLocationTests(SimpleTestCase):
+
+    def assertParsed(self, text: str, location_type: LocationType, normalized: str):
+        location = parse_location(text, street_index)
+        self.assertIsNotNone(location, text)
+        self.assertEqual((location.location_type, location.normalized), (location_type, normalized))  # type: ignore[union-attr]
+
+    def test_intersections(self):
+        self.assertParsed("main and hastings", LocationType.INTERSECTION, "main & hastings")
+        self.assertParsed("close to 4th ave and burrard", LocationType.INTERSECTION, "4th ave & burrard")
+
+    def test_addresses_and_blocks(self):
+        location = parse_location("222 Main St.")
+        self.assertEqual((location.normalized, location.number, location.is_block), ("222 main st", 222, False))  # type: ignore[union-attr]
+
+        location = parse_location("100 block of E Hastings St")
+        self.assertEqual((location.normalized, location.number, location.is_block), ("100 block e hastings st", 100, True))  # type: ignore[union-attr]
+        [street] = location.streets  # type: ignore[union-attr]
+        self.assertEqual((street.direction, street.suffix), (StreetDirectionEnum.EAST, StreetSuffixEnum.STREET))
+
+    def test_leading_prepositions_are_dropped(self):
+        self.assertParsed("near Main & Hastings", LocationType.INTERSECTION, "main & hastings")
+        self.assertParsed("at 60 w cordova", LocationType.ADDRESS, "60 w cordova")
+
+    def test_a_bare_street_needs_its_suffix(self):
+        self.assertParsed("on granville street", LocationType.STREET, "granville st")
+        self.assertIsNone(parse_location("granville"))
+        self.assertIsNone(parse_location("oppenheimer park"))
+
+    def test_misspelled_street_names_are_corrected(self):
+        location = parse_location("near Hastngs and Main", street_index)
+        self.assertEqual(location.normalized, "hastings & main")  # type: ignore[union-attr]
+        self.assertEqual([(fix.original, fix.corrected) for fix in location.corrections], [("hastngs", "hastings")])  # type: ignore[union-attr]
+
+
+class GazetteerTests(SimpleTestCase):
+
+    def test_finds_whole_word_names_preferring_the_longest(self):
+        [match] = gazetteer.find_all("shelter in the DTES tonight")
+        self.assertEqual((match.entry.name, match.text, match.start, match.end), ("Downtown Eastside", "DTES", 15, 19))
+
+        [match] = gazetteer.find_all("bed in downtown eastside")
+        self.assertEqual(match.entry.name, "Downtown Eastside")
+
+        [match] = gazetteer.find_all("near oppenheimer park")
+        self.assertEqual((match.entry.location_type, match.start, match.end), (LocationType.LANDMARK, 5, 21))
+
+        self.assertEqual(gazetteer.find_all("gastownish"), [])
+
+    def test_lookup_matches_a_folded_name_or_alias(self):
+        self.assertEqual(gazetteer.lookup("Downtown  East-Side").name, "Downtown Eastside")  # type: ignore[union-attr]
+        self.assertIsNone(gazetteer.lookup("downtown eastside please"))
+
+    def test_a_changed_file_is_reloaded_and_a_broken_one_ignored(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "gazetteer.json"
+
+            def write(content: str, mtime: int):
+                path.write_text(content, encoding="utf-8")
+                os.utime(path, (mtime, mtime))
+
+            places = Gazetteer(path, reload_interval_s=0)
+            write(json.dumps([{"name": "Crab Park", "type": "landmark"}]), 1)
+            self.assertEqual(places.lookup("crab park").name, "Crab Park")  # type: ignore[union-attr]
+
+            write(json.dumps([{"name": "Crab Park", "type": "landmark", "aliases": ["portside park"]}]), 2)
+            self.assertEqual(places.lookup("portside park").name, "Crab Park")  # type: ignore[union-attr]
+
+            write("[{", 3)
+            with self.assertLogs("resolvers.location.gazetteer", "ERROR"):
+                self.assertEqual(places.lookup("portside park").name, "Crab Park")  # type: ignore[union-attr]
+
+    def test_ambiguous_names_only_resolve_as_a_whole_span(self):
+        for text, name in (("kits", "Kitsilano"), ("Sunset", "Sunset"), ("the library", "Vancouver Public Library Central Branch")):
+            with self.subTest(text=text):
+                self.assertEqual(gazetteer.lookup(text).name, name)  # type: ignore[union-attr]
+                self.assertEqual(gazetteer.find_all(f"meet me at {text}"), [])
+        [match] = gazetteer.find_all("sleeping at sunset beach")
+        self.assertEqual(match.entry.name, "Sunset Beach")
+
+
+def entity_span(msg: str, text: str, label: EntityLabelEnum) -> EntitySpan:
+    start = msg.index(text)
+    return EntitySpan(label=label.value, text=text, start=start, end=start + len(text))
+
+
+class LocationResolverTests(SimpleTestCase):
+
+    def test_the_message_fallback_ignores_everyday_words(self):
+        for msg in ("need hygiene kits", "anything open past sunset", "wifi at the library", "going downtown"):
+            with self.subTest(msg=msg):
+                self.assertIsNone(LocationResolver(msg).resolve())
+
+    def test_the_message_fallback_skips_text_tagged_as_another_entity(self):
+        msg = "where is insite"
+        self.assertEqual(LocationResolver(msg).resolve().normalized, "Insite")  # type: ignore[union-attr]
+        self.assertIsNone(LocationResolver(msg, [entity_span(msg, "insite", EntityLabelEnum.RESOURCE)]).resolve())
+
+        msg = "need hygiene kits near oppenheimer park"
+        location = LocationResolver(msg, [entity_span(msg, "hygiene kits", EntityLabelEnum.RESOURCE)]).resolve()
+        self.assertEqual(location.normalized, "Oppenheimer Park")  # type: ignore[union-attr]
+
+    def test_a_location_span_resolves_an_ambiguous_name(self):
+        msg = "wifi at the library"
+        location = LocationResolver(msg, [entity_span(msg, "the library", EntityLabelEnum.LOCATION)]).resolve()
+        self.assertEqual(location.normalized, "Vancouver Public Library Central Branch")  # type: ignore[union-attr]
+
+
+class SpatialIndexTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "spatial.idx"
+        self.index = SpatialIndex(self.path, resources_path=RESOURCES_PATH)
+
+    def test_nearest_matches_a_brute_force_search(self):
+        self.assertTrue(self.index.build())
+        lat, lon = self.index.lookup(place_key(LocationType.INTERSECTION, "hastings & main"))  # type: ignore[misc]
+
+        for resource in (None, ResourceEnum.SHELTER):
+            with self.subTest(resource=resource):
+                nearby = self.index.nearest(lat, lon, k=3, resource=resource)
+                points = [
+                    point for point in SpatialIndex(resources_path=RESOURCES_PATH).nearest(lat, lon, k=100)
+                    if resource is None or point.resource == resource
+                ]
+                expected = sorted(points, key=lambda point: haversine_m(lat, lon, point.lat, point.lon))[:3]
+                # Several fixture points share coordinates, so ties may come back in either order.
+                self.assertEqual([point.distance_m for point in nearby], [point.distance_m for point in expected])
+                self.assertTrue(resource is None or all(point.resource == resource for point in nearby))
+
+    def test_locates_places_and_hundred_blocks(self):
+        location = ResolvedLocation(location_text="dtes", location_type=LocationType.NEIGHBORHOOD, normalized="Downtown Eastside")
+        self.assertEqual(self.index.locate(location), (49.2810, -123.0980))
+        self.assertEqual(self.index.locate(parse_location("156 E Hastings St")), (49.2812, -123.0990))  # type: ignore[arg-type]
+        self.assertIsNone(self.index.locate(parse_location("99 main st")))  # type: ignore[arg-type]
+
+    def test_the_file_is_stale_until_built_from_the_same_sources(self):
+        self.assertTrue(self.index.is_stale())
+        self.index.build()
+        self.assertFalse(self.index.is_stale())
+        self.assertFalse(self.index.build())
+
+        self.index.configure(self.path, resources_path=None)
+        self.assertTrue(self.index.is_stale())
+        self.assertEqual(self.index.nearest(49.28, -123.10), [])
+        self.assertTrue(self.index.build())
+
+
+class LanguageIdentifierTests(SimpleTestCase):
+
+    def test_short_or_ambiguous_texts_default_to_english(self):
+        # Each of these was once confidently identified as another language.
+        for text in ("pets ok", "detox", "granville", "nalox", "222 main"):
+            with self.subTest(text=text):
+                self.assertEqual(language_identifier.identify(text), (LanguageEnum.ENGLISH, 0.0))
+
+    def test_identifies_each_language(self):
+        for text, language in (
+                ("I need a bed for tonight near main street", LanguageEnum.ENGLISH),
+                ("je cherche un lit pour ce soir", LanguageEnum.FRENCH),
+                ("mo nilo ounjẹ", LanguageEnum.YORUBA),
+                ("我需要住的地方", LanguageEnum.CHINESE),
+                ("ਮੈਨੂੰ ਭੋਜਨ ਚਾਹੀਦਾ ਹੈ", LanguageEnum.PUNJABI),
+        ):
+            with self.subTest(text=text):
+                identified, confidence = language_identifier.identify(text)
+                self.assertEqual(identified, language)
+                self.assertGreater(confidence, 0.9)
+
+    def test_the_resolver_falls_back_to_english_below_min_confidence(self):
+        language, confidence = language_identifier.identify("merci beaucoup")
+        self.assertEqual(language, LanguageEnum.FRENCH)
+        self.assertLess(confidence, 0.5)
+        self.assertEqual(
+            LanguageResolver("merci beaucoup").resolve(),
+            ResolvedLanguage(language=LanguageEnum.ENGLISH, confidence=0.0),
+        )
+
+    def test_bundled_profiles_match_the_bundled_corpus(self):
+        with open(PROFILES_PATH, encoding="utf-8") as f:
+            self.assertEqual(build_profiles(load_corpus()), json.load(f))
+
+
+def qualifier_span(msg: str, text: str) -> EntitySpan:
+    return entity_span(msg, text, EntityLabelEnum.QUALIFIER)
+
+
+class QualifierTests(SimpleTestCase):
+
+    def test_house_numbers_are_not_ages(self):
+        for text in ("shelter near 60 w cordova", "food at 65 e hastings", "food near 55 main st"):
+            with self.subTest(text=text):
+                self.assertEqual(qualifier_table.find_all(text), [])
+        [match] = qualifier_table.find_all("shelter 55+ tonight")
+        self.assertEqual((match.value, match.text), (AgeGroupParamValue.SENIOR, "55+"))
+
+    def test_a_negation_cue_flips_the_value(self):
+        msg = "women only shelter, no dogs"
+        params = QualifierResolver(msg, [qualifier_span(msg, "women only"), qualifier_span(msg, "dogs")]).resolve()
+        self.assertEqual(params.params, {  # type: ignore[union-attr]
+            ParamKeyEnum.GENDER: GenderParamValue.WOMEN,
+            ParamKeyEnum.PETS_ALLOWED: BooleanParamValue.FALSE,
+        })
+
+    def test_only_matches_inside_qualifier_entities_count(self):
+        msg = "women only shelter near 60 w cordova, dogs ok"
+        self.assertIsNone(QualifierResolver(msg).resolve())
+        params = QualifierResolver(msg, [qualifier_span(msg, "women only")]).resolve()
+        self.assertEqual(params.params, {ParamKeyEnum.GENDER: GenderParamValue.WOMEN})  # type: ignore[union-attr]
+
+
+class ResourceResolverTests(SimpleTestCase):
+
+    def resolve(self, msg: str, *spans: str) -> Optional[tuple[ResourceEnum, ResourceSourceEnum, str]]:
+        resolved = ResourceResolver(msg, [entity_span(msg, text, EntityLabelEnum.RESOURCE) for text in spans]).resolve()
+        return None if resolved is None else (resolved.resource, resolved.source, resolved.text)
+
+    def test_spans_resolve_whole_then_by_contained_phrase(self):
+        self.assertEqual(self.resolve("I need some beds", "some beds"), (ResourceEnum.SHELTER, ResourceSourceEnum.TABLE, "some beds"))
+        self.assertEqual(
+            self.resolve("somewhere with a hot meal please", "somewhere with a hot meal"),
+            (ResourceEnum.FOOD, ResourceSourceEnum.MODEL, "hot meal"),
+        )
+        self.assertEqual(
+            self.resolve("need the emergency shelter"),
+            (ResourceEnum.SHELTER, ResourceSourceEnum.MATCHER, "emergency shelter"),
+        )
+
+    def test_ambiguous_synonyms_only_resolve_as_a_whole_span(self):
+        self.assertEqual(self.resolve("can I crash somewhere", "crash"), (ResourceEnum.SHELTER, ResourceSourceEnum.TABLE, "crash"))
+        self.assertEqual(self.resolve("at the library", "library"), (ResourceEnum.WIFI, ResourceSourceEnum.TABLE, "library"))
+        self.assertIsNone(self.resolve("can I crash somewhere"))
+        self.assertIsNone(self.resolve("a crash pad tonight", "crash pad"))
+        self.assertEqual(self.resolve("wifi at the library"), (ResourceEnum.WIFI, ResourceSourceEnum.MATCHER, "wifi"))
+
+    def test_unrelated_text_does_not_resolve(self):
+        for msg in ("my phone died", "thanks so much", "emergency!!", "bedroom bedbug foodie"):
+            with self.subTest(msg=msg):
+                self.assertIsNone(self.resolve(msg))